@@ -0,0 +1,187 @@
+# app/aggregates.py
+
+"""
+Aggregati materializzati per i KPI della dashboard e per /stats.
+
+La tabella agg_stats tiene, per ogni ambito, conteggio, somme dei punteggi
+per dominio e distribuzione delle classi di rischio:
+
+- ("total", "")           tutte le valutazioni
+- ("day", "YYYY-MM-DD")   valutazioni di un giorno
+- ("company", nome)       valutazioni di un'azienda (solo con nome)
+
+Lo scrittore delle valutazioni aggiorna gli aggregati nella stessa
+transazione che inserisce il batch, quindi le letture costano una riga
+(o una riga per giorno) qualunque sia il numero di valutazioni salvate.
+Le medie si ricavano da somme e conteggio.
+
+Ricostruzione da zero (es. dopo modifiche manuali al DB):
+
+    python -m app.aggregates rebuild
+"""
+
+import sqlite3
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Punteggi sommati, nell'ordine delle colonne sum_* di agg_stats
+AGG_METRICS: Tuple[str, ...] = (
+    "final_score",
+    "ai_risk",
+    "gdpr_risk",
+    "operational_risk",
+    "urgency_risk",
+)
+
+# Classi di rischio contate, nell'ordine delle colonne n_* di agg_stats
+AGG_RISK_CLASSES: Tuple[str, ...] = ("Low", "Medium", "High", "Critical")
+
+# Valutazione da aggiungere: (created_at, company_name, risk_class, metriche...)
+AggRow = Tuple[str, Optional[str], str, float, float, float, float, float]
+
+_VALUE_COLUMNS: Tuple[str, ...] = (
+    "assessments",
+    *(f"sum_{m}" for m in AGG_METRICS),
+    *(f"n_{c.lower()}" for c in AGG_RISK_CLASSES),
+)
+
+_UPSERT_SQL = (
+    f"INSERT INTO agg_stats (scope, key, {', '.join(_VALUE_COLUMNS)}) "
+    f"VALUES (?, ?, {', '.join('?' * len(_VALUE_COLUMNS))}) "
+    "ON CONFLICT (scope, key) DO UPDATE SET "
+    + ", ".join(f"{c} = {c} + excluded.{c}" for c in _VALUE_COLUMNS)
+)
+
+
+def _deltas(rows: Sequence[AggRow]) -> Dict[Tuple[str, str], List[float]]:
+    deltas: Dict[Tuple[str, str], List[float]] = {}
+    width = len(_VALUE_COLUMNS)
+    for created_at, company_name, risk_class, *scores in rows:
+        values = [1, *scores, *(int(risk_class == c) for c in AGG_RISK_CLASSES)]
+        keys = [("total", ""), ("day", created_at[:10])]
+        if company_name:
+            keys.append(("company", company_name))
+        for key in keys:
+            acc = deltas.get(key)
+            if acc is None:
+                acc = deltas[key] = [0] * width
+            for i, value in enumerate(values):
+                acc[i] += value
+    return deltas
+
+
+def update_aggregates(conn: sqlite3.Connection, rows: Sequence[AggRow]) -> None:
+    """
+    Aggiunge un batch di nuove valutazioni agli aggregati. Va chiamata
+    dentro la transazione che inserisce le valutazioni.
+    """
+    if not rows:
+        return
+    conn.executemany(
+        _UPSERT_SQL,
+        [(scope, key, *values) for (scope, key), values in _deltas(rows).items()],
+    )
+
+
+def _accumulate(conn: sqlite3.Connection, where: str, params: Sequence) -> None:
+    # Aggrega in SQL le valutazioni selezionate e le somma agli aggregati
+    values = ", ".join(
+        [
+            "COUNT(*)",
+            *(f"SUM({m})" for m in AGG_METRICS),
+            *(f"SUM(risk_class = '{c}')" for c in AGG_RISK_CLASSES),
+        ]
+    )
+    for scope, key, extra in (
+        ("total", "''", ""),
+        ("day", "substr(created_at, 1, 10)", ""),
+        ("company", "company_name", " AND company_name IS NOT NULL AND company_name != ''"),
+    ):
+        conn.execute(
+            f"""
+            INSERT INTO agg_stats (scope, key, {', '.join(_VALUE_COLUMNS)})
+            SELECT '{scope}', {key}, {values}
+            FROM assessments
+            WHERE {where}{extra}
+            GROUP BY 2
+            ON CONFLICT (scope, key) DO UPDATE SET
+            {', '.join(f"{c} = {c} + excluded.{c}" for c in _VALUE_COLUMNS)}
+            """,
+            params,
+        )
+
+
+def backfill_aggregates(conn: sqlite3.Connection, first_id: int, last_id: int) -> None:
+    """Passo di backfill (app.migrations): aggiunge un intervallo di id."""
+    _accumulate(conn, "id BETWEEN ? AND ?", (first_id, last_id))
+
+
+def rebuild_aggregates(conn: sqlite3.Connection) -> None:
+    """Ricalcola tutti gli aggregati dalle valutazioni, in un'unica transazione."""
+    # BEGIN IMMEDIATE: nessuna scrittura concorrente tra cancellazione e ricalcolo
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM agg_stats")
+        _accumulate(conn, "1", ())
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+# -------------------------------------------------
+# Lettura
+# -------------------------------------------------
+
+
+@dataclass(frozen=True)
+class AggregateStats:
+    key: str
+    assessments: int
+    averages: Dict[str, float]
+    risk_classes: Dict[str, int]
+
+
+def _to_stats(row: Sequence) -> AggregateStats:
+    key, count, *values = row
+    n = len(AGG_METRICS)
+    return AggregateStats(
+        key=key,
+        assessments=count,
+        averages={m: (s / count if count else 0.0) for m, s in zip(AGG_METRICS, values[:n])},
+        risk_classes=dict(zip(AGG_RISK_CLASSES, values[n:])),
+    )
+
+
+_SELECT_SQL = f"SELECT key, {', '.join(_VALUE_COLUMNS)} FROM agg_stats"
+
+
+def select_stats(conn: sqlite3.Connection, scope: str = "total", key: str = "") -> AggregateStats:
+    """Aggregati di un ambito (vuoti se non ci sono valutazioni)."""
+    row = conn.execute(f"{_SELECT_SQL} WHERE scope = ? AND key = ?", (scope, key)).fetchone()
+    if row is None:
+        row = (key, 0, *([0.0] * len(AGG_METRICS)), *([0] * len(AGG_RISK_CLASSES)))
+    return _to_stats(row)
+
+
+def select_daily_stats(conn: sqlite3.Connection, days: int = 90) -> List[AggregateStats]:
+    """Aggregati degli ultimi `days` giorni con valutazioni, in ordine di data."""
+    rows = conn.execute(
+        f"{_SELECT_SQL} WHERE scope = 'day' ORDER BY key DESC LIMIT ?", (days,)
+    ).fetchall()
+    return [_to_stats(row) for row in reversed(rows)]
+
+
+if __name__ == "__main__":
+    from .db import flush_assessments, init_db, pooled_connection
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command != "rebuild":
+        sys.exit("Uso: python -m app.aggregates rebuild")
+    init_db()
+    flush_assessments()
+    with pooled_connection() as conn:
+        rebuild_aggregates(conn)
+        total = select_stats(conn)
+    print(f"Aggregati ricostruiti: {total.assessments} valutazioni.")
@@ -0,0 +1,101 @@
+# app/answers.py
+
+"""
+Codifica delle risposte per la tabella normalizzata assessment_answers.
+
+Ogni campo del vocabolario di app.rules ha una colonna INTEGER:
+- campi a scelta singola: il codice di encode_value (0 = valore assente o
+  fuori vocabolario)
+- campi a scelta multipla: la bitmask di encode_multi
+
+La colonna è NULL se il campo non era presente nel questionario. Tutto ciò
+che i codici non bastano a ricostruire esattamente (chiavi fuori vocabolario,
+valori sconosciuti, liste in un ordine diverso da quello canonico) finisce
+in extra_json, così decode_answers(encode_answers(a)) == a per qualunque
+questionario serializzabile in JSON.
+
+I codici dipendono dall'ordine dei valori in app.rules: aggiungere valori in
+coda è sicuro, riordinarli o rimuoverli richiede una migrazione dei dati.
+"""
+
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .rules import (
+    FIELD_VALUES,
+    MULTI_FIELDS,
+    decode_multi,
+    decode_value,
+    encode_multi,
+    encode_value,
+)
+
+# Colonne della tabella assessment_answers (oltre ad assessment_id ed extra_json)
+ANSWER_COLUMNS: Tuple[str, ...] = tuple(FIELD_VALUES) + tuple(MULTI_FIELDS)
+
+_NORMALIZED = set(ANSWER_COLUMNS)
+
+INSERT_ANSWERS_SQL = (
+    "INSERT INTO assessment_answers (assessment_id, "
+    + ", ".join(ANSWER_COLUMNS)
+    + ", extra_json) VALUES ("
+    + ", ".join("?" * (len(ANSWER_COLUMNS) + 2))
+    + ")"
+)
+
+
+def _encode_field(field: str, value: Any) -> Tuple[int, bool]:
+    """Ritorna (codice, esatto): esatto se il codice basta a ricostruire value."""
+    if field in MULTI_FIELDS:
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            return 0, False
+        mask = encode_multi(field, value)
+        return mask, decode_multi(field, mask) == value
+    if value is None:
+        return 0, True
+    if not isinstance(value, str):
+        return 0, False
+    code = encode_value(field, value)
+    return code, code != 0
+
+
+def encode_answers(answers: Dict[str, Any]) -> Tuple[Tuple[Optional[int], ...], Optional[str]]:
+    """
+    Converte un questionario in (codici nell'ordine di ANSWER_COLUMNS,
+    extra_json oppure None).
+    """
+    codes = []
+    extra: Dict[str, Any] = {}
+    for field in ANSWER_COLUMNS:
+        if field not in answers:
+            codes.append(None)
+            continue
+        value = answers[field]
+        code, exact = _encode_field(field, value)
+        codes.append(code)
+        if not exact:
+            extra[field] = value
+    for key, value in answers.items():
+        if key not in _NORMALIZED:
+            extra[key] = value
+    return tuple(codes), (json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def decode_answers(codes: Sequence[Optional[int]], extra_json: Optional[str]) -> Dict[str, Any]:
+    """Inverso di encode_answers."""
+    answers: Dict[str, Any] = {}
+    for field, code in zip(ANSWER_COLUMNS, codes):
+        if code is None:
+            continue
+        if field in MULTI_FIELDS:
+            answers[field] = decode_multi(field, code)
+        else:
+            answers[field] = decode_value(field, code)
+    if extra_json:
+        answers.update(json.loads(extra_json))
+    return answers
+
+
+def answer_labels(field: str) -> Dict[int, Optional[str]]:
+    """Codice -> valore per un campo a scelta singola (0 -> None)."""
+    return {0: None, **{i + 1: value for i, value in enumerate(FIELD_VALUES[field])}}
@@ -0,0 +1,186 @@
+# app/batch.py
+
+"""
+Scoring in batch per l'endpoint /assess/batch.
+
+Il corpo della richiesta può essere un array JSON oppure NDJSON (un oggetto
+per riga). L'event loop legge il corpo e lo divide in elementi (l'array
+viene parsato in un thread); parsing delle righe NDJSON, validazione e
+scoring avvengono per chunk nel pool di processi (o in un thread, se il
+parallelismo è disattivato). Le risposte vengono restituite in NDJSON, nello
+stesso ordine dell'input, man mano che i chunk sono pronti.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Tuple, Union
+
+from pydantic import ValidationError
+
+from .scoring_cache import compute_risk_cached
+from .serialization import result_to_json
+from .validation import assessment_validator
+from .workers import WORKER_PROCESSES, submit_to_pool
+
+# Numero di valutazioni inviate a un worker in un colpo solo
+BATCH_CHUNK_SIZE = 256
+
+# Elemento di un chunk: valore JSON già parsato (array) oppure riga NDJSON
+# ancora da parsare; un valore JSON non è mai bytes
+ChunkItem = Union[Any, bytes]
+
+
+class BatchFormatError(ValueError):
+    """Il corpo della richiesta non è né un array JSON né NDJSON valido."""
+
+
+def _dump_line(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+
+
+def score_chunk(start: int, chunk: List[ChunkItem]) -> List[bytes]:
+    """
+    Parsa, valida e valuta un chunk (eseguito nei worker del pool). start è
+    l'indice nel batch del primo elemento, per le righe di errore.
+    """
+    return [_score_item(start + offset, item) for offset, item in enumerate(chunk)]
+
+
+def _score_item(index: int, item: ChunkItem) -> bytes:
+    if isinstance(item, bytes):
+        try:
+            item = json.loads(item)
+        except ValueError as exc:
+            return _error_line(index, [{"msg": f"Riga NDJSON non valida: {exc}"}])
+    if not isinstance(item, dict):
+        return _error_line(index, [{"msg": "Ogni elemento deve essere un oggetto JSON."}])
+    try:
+        validated = assessment_validator.validate(item)
+    except ValidationError as exc:
+        return _error_line(index, exc.errors())
+    return result_to_json(compute_risk_cached(validated.answers, validated.key)) + b"\n"
+
+
+def _error_line(index: int, errors: Any) -> bytes:
+    return _dump_line({"index": index, "errors": errors})
+
+
+# -------------------------------------------------------------------
+#  Parsing del corpo
+# -------------------------------------------------------------------
+
+
+async def open_batch(chunks: AsyncIterator[bytes]) -> AsyncIterator[ChunkItem]:
+    """
+    Riconosce il formato del corpo (array JSON o NDJSON) e ne itera gli elementi.
+
+    Un array JSON viene letto e parsato subito (in un thread), così che un
+    corpo malformato possa essere rifiutato prima di iniziare lo streaming
+    della risposta (BatchFormatError). In modalità NDJSON le righe vengono
+    invece emesse man mano che arrivano, ancora da parsare: una riga non
+    valida diventa una riga di errore nella risposta, senza interrompere il
+    resto del batch.
+    """
+    # Frammenti del corpo: uniti una volta sola, non a ogni chunk
+    parts: List[bytes] = []
+    async for data in chunks:
+        parts.append(data)
+        if data.strip():
+            break
+
+    if b"".join(parts).lstrip()[:1] == b"[":
+        async for data in chunks:
+            parts.append(data)
+        items = await asyncio.to_thread(_parse_array, parts)
+        return _iter_list(items)
+
+    return _iter_ndjson(parts, chunks)
+
+
+def _parse_array(parts: List[bytes]) -> List[Any]:
+    try:
+        items = json.loads(b"".join(parts))
+    except ValueError as exc:
+        raise BatchFormatError(f"Array JSON non valido: {exc}") from exc
+    if not isinstance(items, list):
+        raise BatchFormatError("Il corpo deve essere un array JSON o NDJSON.")
+    return items
+
+
+async def _iter_list(items: List[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+async def _iter_ndjson(parts: List[bytes], chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # tail: frammenti della riga non ancora terminata
+    tail: List[bytes] = []
+    pending = iter(parts)
+    while True:
+        data = next(pending, None)
+        if data is None:
+            try:
+                data = await chunks.__anext__()
+            except StopAsyncIteration:
+                break
+        *lines, rest = data.split(b"\n")
+        if lines:
+            tail.append(lines[0])
+            lines[0] = b"".join(tail)
+            tail = []
+            for line in lines:
+                if line.strip():
+                    yield line
+        if rest:
+            tail.append(rest)
+    line = b"".join(tail)
+    if line.strip():
+        yield line
+
+
+# -------------------------------------------------------------------
+#  Scoring in streaming
+# -------------------------------------------------------------------
+
+
+async def _iter_chunks(
+    items: AsyncIterator[ChunkItem],
+) -> AsyncIterator[Tuple[int, List[ChunkItem]]]:
+    # (indice del primo elemento, elementi): niente lavoro per elemento sul loop
+    chunk: List[ChunkItem] = []
+    start = 0
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield start, chunk
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+async def stream_batch_results(
+    items: AsyncIterator[Any], parallel: bool = True
+) -> AsyncIterator[bytes]:
+    """
+    Valuta gli elementi e restituisce le righe NDJSON delle risposte.
+
+    Con parallel=True i chunk vengono distribuiti sul pool di processi
+    condiviso, tenendo al massimo 2 chunk in volo per worker; altrimenti
+    vengono valutati uno alla volta in un thread, senza bloccare l'event loop.
+    """
+    loop = asyncio.get_running_loop()
+    max_in_flight = 2 * WORKER_PROCESSES if parallel else 1
+    pending: Deque["asyncio.Future[List[bytes]]"] = deque()
+
+    async for start, chunk in _iter_chunks(items):
+        if parallel:
+            pending.append(asyncio.wrap_future(submit_to_pool(score_chunk, start, chunk)))
+        else:
+            pending.append(loop.run_in_executor(None, score_chunk, start, chunk))
+        while len(pending) >= max_in_flight:
+            yield b"".join(await pending.popleft())
+
+    while pending:
+        yield b"".join(await pending.popleft())
@@ -0,0 +1,248 @@
+# app/bulk_export.py
+
+"""
+Esportazione in blocco dei report PDF di un portafoglio di valutazioni.
+
+Le valutazioni si selezionano con gli stessi filtri dello storico (azienda,
+classe di rischio, intervallo di date) e vengono lette a pagine dal DB. Il
+lavoro CPU-bound gira nel pool di processi condiviso, con un numero limitato
+di report in volo, e l'output viene prodotto in streaming:
+
+- "zip": un PDF per valutazione in un archivio ZIP, emesso un file alla
+  volta (in memoria c'è solo la finestra di report in lavorazione)
+- "pdf": un unico PDF con un segnalibro per valutazione; i worker
+  impaginano i report e il processo principale li disegna sullo stesso
+  canvas. ReportLab tiene in memoria i flussi di pagina fino al
+  salvataggio, quindi questo formato è limitato a EXPORT_PDF_MAX_REPORTS
+  valutazioni (APP_EXPORT_PDF_MAX_REPORTS): oltre il limite l'export
+  fallisce subito con ExportTooLargeError e va usato lo ZIP
+
+Da riga di comando:
+
+    python -m app.bulk_export portafoglio.zip --risk-class High --from 2026-01-01
+"""
+
+import argparse
+import io
+import itertools
+import os
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from datetime import date, datetime
+from tempfile import SpooledTemporaryFile
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from .db import iter_assessment_reports
+from .pdf_utils import build_pdf_from_report, draw_report, layout_report
+from .report_cache import pdf_cache, report_cache_key
+from .workers import WORKER_PROCESSES, submit_to_pool
+
+EXPORT_FORMATS = ("zip", "pdf")
+
+# Dimensione dei blocchi emessi in streaming
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Report in lavorazione contemporaneamente nel pool (per worker)
+EXPORT_INFLIGHT_PER_WORKER = 2
+
+# Valutazioni al massimo in un unico PDF (il canvas resta in memoria fino alla fine)
+EXPORT_PDF_MAX_REPORTS = int(os.environ.get("APP_EXPORT_PDF_MAX_REPORTS", "500"))
+
+# Riga letta dal DB: (id, created_at, company_name, report_text)
+ReportRow = Tuple[int, str, Optional[str], str]
+
+
+class ExportTooLargeError(ValueError):
+    """Troppe valutazioni per un unico PDF (vedi EXPORT_PDF_MAX_REPORTS)."""
+
+
+# -------------------------------------------------
+# Lavoro nei worker
+# -------------------------------------------------
+
+
+def _render_row(row: ReportRow) -> bytes:
+    return build_pdf_from_report(company_name=row[2], report_text=row[3])
+
+
+def _layout_row(row: ReportRow) -> Any:
+    return layout_report(row[2], row[3])
+
+
+def _ordered_map(
+    fn: Callable[[ReportRow], Any],
+    rows: Iterable[ReportRow],
+    lookup: Optional[Callable[[ReportRow], Any]] = None,
+) -> Iterator[Tuple[ReportRow, Any]]:
+    """
+    Applica fn alle righe nel pool di processi, mantenendo l'ordine e al più
+    EXPORT_INFLIGHT_PER_WORKER * WORKER_PROCESSES righe in volo. lookup può
+    fornire il risultato senza passare dal pool (es. PDF già in cache).
+    """
+    window = EXPORT_INFLIGHT_PER_WORKER * WORKER_PROCESSES
+    pending: Deque[Tuple[ReportRow, Future]] = deque()
+    try:
+        for row in rows:
+            cached = lookup(row) if lookup is not None else None
+            if cached is not None:
+                future: Future = Future()
+                future.set_result(cached)
+            else:
+                future = submit_to_pool(fn, row)
+            pending.append((row, future))
+            if len(pending) >= window:
+                done_row, done = pending.popleft()
+                yield done_row, done.result()
+        while pending:
+            done_row, done = pending.popleft()
+            yield done_row, done.result()
+    finally:
+        # Export interrotto (es. client disconnesso): niente lavoro inutile
+        for _, future in pending:
+            future.cancel()
+
+
+def _cached_pdf(row: ReportRow) -> Optional[bytes]:
+    return pdf_cache.get(report_cache_key(row[2], row[3]))
+
+
+# -------------------------------------------------
+# Formati di uscita
+# -------------------------------------------------
+
+
+class _ChunkSink(io.RawIOBase):
+    """File in sola scrittura, non posizionabile, svuotato da take()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _entry_name(row: ReportRow) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", row[2] or "").strip("_") or "azienda"
+    return f"{row[0]:06d}_{slug[:40]}_{row[1][:10]}.pdf"
+
+
+def export_zip(**filters) -> Iterator[bytes]:
+    """ZIP con un PDF per valutazione, emesso a blocchi."""
+    sink = _ChunkSink()
+    # Su un file non posizionabile zipfile usa i data descriptor: ogni file
+    # può essere emesso appena scritto, senza tornare indietro
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        rows = iter_assessment_reports(**filters)
+        for row, pdf in _ordered_map(_render_row, rows, lookup=_cached_pdf):
+            created = datetime.fromisoformat(row[1])
+            info = zipfile.ZipInfo(_entry_name(row), date_time=created.timetuple()[:6])
+            archive.writestr(info, pdf)
+            yield sink.take()
+    yield sink.take()
+
+
+def _bounded_rows(limit: int, **filters) -> List[ReportRow]:
+    rows = iter_assessment_reports(**filters)
+    try:
+        selected = list(itertools.islice(rows, limit + 1))
+    finally:
+        rows.close()
+    if len(selected) > limit:
+        raise ExportTooLargeError(
+            f"Più di {limit} valutazioni: restringere i filtri o usare il formato zip."
+        )
+    return selected
+
+
+def export_combined_pdf(**filters) -> Iterator[bytes]:
+    """
+    Un unico PDF con un segnalibro per valutazione, emesso a blocchi.
+    Solleva subito ExportTooLargeError (prima di produrre byte) se le
+    valutazioni sono più di EXPORT_PDF_MAX_REPORTS.
+    """
+    return _combined_pdf(_bounded_rows(EXPORT_PDF_MAX_REPORTS, **filters))
+
+
+def _combined_pdf(rows: List[ReportRow]) -> Iterator[bytes]:
+    with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+        c = canvas.Canvas(output, pagesize=A4)
+        c.setTitle("Valutazioni Rischi AI & Dati")
+        c.showOutline()
+
+        for row, pages in _ordered_map(_layout_row, rows):
+            key = f"assessment-{row[0]}"
+            c.bookmarkPage(key)
+            c.addOutlineEntry(f"{row[2] or 'N/A'} · {row[1]} (#{row[0]})", key, level=0)
+            draw_report(c, row[2], pages)
+            c.showPage()
+
+        c.save()
+        output.seek(0)
+        while True:
+            chunk = output.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_reports(export_format: str = "zip", **filters) -> Iterator[bytes]:
+    """
+    Esporta i report delle valutazioni filtrate (company_name, risk_class,
+    date_from, date_to come in get_assessment_history) nel formato scelto.
+    """
+    if export_format == "zip":
+        return export_zip(**filters)
+    if export_format == "pdf":
+        return export_combined_pdf(**filters)
+    raise ValueError(f"Formato non supportato: {export_format} (ammessi: {', '.join(EXPORT_FORMATS)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Esporta in blocco i report PDF delle valutazioni.")
+    parser.add_argument("output", help="file di destinazione (.zip o .pdf)")
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        help=(
+            "default: dall'estensione del file; pdf al massimo "
+            f"{EXPORT_PDF_MAX_REPORTS} valutazioni (APP_EXPORT_PDF_MAX_REPORTS)"
+        ),
+    )
+    parser.add_argument("--company", dest="company_name")
+    parser.add_argument("--risk-class", choices=["Low", "Medium", "High", "Critical"])
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    export_format = args.format or ("pdf" if args.output.lower().endswith(".pdf") else "zip")
+    try:
+        chunks = export_reports(
+            export_format,
+            company_name=args.company_name,
+            risk_class=args.risk_class,
+            date_from=args.date_from,
+            date_to=args.date_to,
+        )
+    except ExportTooLargeError as exc:
+        sys.exit(str(exc))
+    written = 0
+    with open(args.output, "wb") as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+            written += len(chunk)
+    print(f"Scritti {written} byte in {args.output}.")
@@ -1,45 +1,499 @@
 # app/db.py
 
+import asyncio
+import atexit
+import calendar
+import os
+import queue
 import sqlite3
 import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime, timedelta
+
+from .aggregates import select_daily_stats, select_stats, update_aggregates
+from .answers import (
+    ANSWER_COLUMNS,
+    INSERT_ANSWERS_SQL,
+    answer_labels,
+    decode_answers,
+    encode_answers,
+)
+from .drift import (
+    DRIFT_MIN_STREAK,
+    DRIFT_SLOPE_THRESHOLD,
+    select_drift_alerts,
+    update_company_drift,
+)
+from .metrics import DB_BATCH_ROWS, DB_SECONDS, METRICS_ENABLED, timed
+from .migrations import migrate
+from .rules import MULTI_FIELDS, pack_reason_codes, unpack_reason_codes
+from .scoring import render_report
+from .storage import STORAGE_BACKEND, create_store
 
 # Percorso del file SQLite (nella root del progetto)
 DB_PATH = Path(__file__).resolve().parent.parent / "assessments.db"
 
+# Attesa massima su un lock prima di fallire con "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+# Cache delle pagine per connessione (in KiB)
+CACHE_SIZE_KIB = 16384
+
+# Connessioni inattive tenute nel pool
+POOL_MAX_IDLE = 8
+
+# Le risposte sono sempre salvate in forma normalizzata (assessment_answers);
+# con APP_STORE_ANSWERS_JSON=0 non viene più scritta anche la copia JSON
+STORE_ANSWERS_JSON = os.environ.get("APP_STORE_ANSWERS_JSON", "1") != "0"
+
+# Con APP_STORE_REPORT_TEXT=0 si salvano solo punteggi e codici dei motivi:
+# il report si genera alla lettura (vedi scoring.render_report). Le righe già
+# salvate si compattano con: python -m app.migrations compact-reports
+STORE_REPORT_TEXT = os.environ.get("APP_STORE_REPORT_TEXT", "1") != "0"
+
+# Modalità multi-worker (vedi app.writer_service): se impostato, le scritture
+# vanno al processo scrittore su questo socket e le connessioni locali sono
+# in sola lettura
+WRITER_ADDRESS = os.environ.get("APP_WRITER_ADDRESS", "")
+READ_ONLY = bool(WRITER_ADDRESS)
+
+# Backend esterno (vedi app.storage): con APP_STORAGE diverso da "sqlite" le
+# operazioni dell'interfaccia di storage sono inoltrate a _store, mentre le
+# funzioni basate sulle tabelle SQLite (risposte, drift, aggregati) non sono
+# disponibili
+_store = None if STORAGE_BACKEND == "sqlite" else create_store(STORAGE_BACKEND)
+
+# Scritture non durable verso _store: un solo thread, nell'ordine di arrivo
+# (come lo scrittore SQLite); il thread parte alla prima scrittura
+_store_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-writer")
+
 
 def get_connection():
-    """Ritorna una connessione SQLite al file assessments.db."""
-    return sqlite3.connect(DB_PATH)
+    """
+    Ritorna una nuova connessione SQLite al file assessments.db, già
+    configurata (WAL, busy timeout, cache). Chi la apre deve chiuderla;
+    per l'uso interno preferire pooled_connection().
+    """
+    if _store is not None:
+        raise RuntimeError(
+            f"Funzione disponibile solo con il backend SQLite (APP_STORAGE={STORAGE_BACKEND})"
+        )
+    if READ_ONLY:
+        # Il file è già in WAL (lo imposta il processo scrittore)
+        conn = sqlite3.connect(
+            f"{Path(DB_PATH).resolve().as_uri()}?mode=ro",
+            uri=True,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+        )
+    else:
+        conn = sqlite3.connect(
+            DB_PATH,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+        )
+        # WAL: i lettori non bloccano lo scrittore (e viceversa);
+        # synchronous=NORMAL in WAL evita un fsync per ogni commit
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Pool di connessioni riutilizzabili verso un file SQLite.
+
+    Le connessioni inattive stanno in una coda LIFO (così si riusano quelle
+    con la cache più calda); se la coda è vuota se ne apre una nuova, e al
+    rilascio quelle in eccesso rispetto a max_idle vengono chiuse.
+    """
+
+    def __init__(self, path, max_idle=POOL_MAX_IDLE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = get_connection()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Chiude tutte le connessioni inattive."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool():
+    # Un pool per percorso, così da seguire eventuali cambi di DB_PATH
+    key = str(DB_PATH)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, ConnectionPool(key))
+    return pool
+
+
+@contextmanager
+def pooled_connection():
+    """Presta una connessione dal pool (per letture)."""
+    with _get_pool().connection() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction():
+    """Presta una connessione dal pool dentro una transazione (commit o rollback)."""
+    with _get_pool().connection() as conn:
+        with conn:
+            yield conn
+
+
+def close_connections():
+    """Chiude le connessioni inattive di tutti i pool (es. allo shutdown)."""
+    if _store is not None:
+        _store.close()
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
 
 
 def init_db():
-    """Crea la tabella assessments se non esiste."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    """
+    Porta il database all'ultima versione dello schema (vedi app.migrations):
+    crea la tabella assessments se non esiste e applica le migrazioni mancanti.
+    In modalità multi-worker le migrazioni le applica il processo scrittore:
+    qui si verifica solo che risponda.
+    """
+    if _store is not None:
+        _store.init()
+        return
+    if READ_ONLY:
+        _writer.flush()
+        return
+    with pooled_connection() as conn:
+        migrate(conn)
+
+
+def to_timestamp(value):
+    """
+    Converte datetime / date / stringa ISO nel formato di created_ts:
+    secondi dell'orario "da calendario" (come strftime('%s') di SQLite).
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return calendar.timegm(value.timetuple())
+
+
+# -------------------------------------------------
+# Versione dei dati (per le cache dei lettori)
+# -------------------------------------------------
+
+_data_version = 0
+_data_version_lock = threading.Lock()
+
+
+def _bump_data_version():
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+
+
+def data_version():
+    """
+    Chiave che cambia a ogni modifica delle valutazioni, da usare come chiave
+    di cache (es. st.cache_data). Non esegue query: combina un contatore
+    aggiornato dalle scritture di questo processo con dimensione e data di
+    modifica del file del database e del WAL, che cambiano anche quando a
+    scrivere è un altro processo (es. l'API).
+
+    Con un backend esterno non c'è un file da osservare: la chiave include
+    l'id della valutazione più recente (store.last(), una query sull'indice),
+    che cambia con ogni inserimento e con la cancellazione, da qualunque
+    processo arrivino.
+    """
+    if _store is not None:
+        last = _store.last()
+        return (_data_version, last[0] if last else None)
+    stamps = [_data_version]
+    for suffix in ("", "-wal"):
+        try:
+            stat = os.stat(f"{DB_PATH}{suffix}")
+        except FileNotFoundError:
+            stamps.extend((0, 0))
+        else:
+            stamps.extend((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
+
+
+# -------------------------------------------------
+# Scrittura a gruppi (group commit)
+# -------------------------------------------------
+
+# Righe massime scritte in una singola transazione
+WRITER_MAX_BATCH = 500
+
+# Attesa massima (secondi) prima di scrivere un batch senza richieste durable
+WRITER_MAX_DELAY = 0.05
+
+_INSERT_ASSESSMENT_SQL = """
+    INSERT INTO assessments (
+        created_at,
+        created_ts,
+        company_name,
+        final_score,
+        risk_class,
+        ai_risk,
+        gdpr_risk,
+        operational_risk,
+        urgency_risk,
+        answers_json,
+        report_text,
+        reason_codes
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _assessment_row(company_name, answers, result):
+    # (riga di assessments, riga di assessment_answers senza l'id)
+    now = datetime.now().replace(microsecond=0)
+    codes, extra_json = encode_answers(answers)
+    return (
+        now.isoformat(),
+        to_timestamp(now),
+        company_name,
+        float(result.final_score),
+        str(result.risk_class),
+        float(result.ai_risk),
+        float(result.gdpr_risk),
+        float(result.operational_risk),
+        float(result.urgency_risk),
+        json.dumps(answers, ensure_ascii=False) if STORE_ANSWERS_JSON else "",
+        result.report if STORE_REPORT_TEXT else "",
+        pack_reason_codes(result.reason_codes),
+    ), (*codes, extra_json)
+
+
+class _Flush:
+    """Marcatore in coda: scrive subito il batch corrente e risolve il future."""
+
+    def __init__(self):
+        self.future = Future()
+
+
+_STOP = object()
+
+
+class AssessmentWriter:
+    """
+    Write-behind per le valutazioni.
+
+    Le righe vengono accodate e un thread dedicato le scrive in batch con un
+    solo executemany e un solo commit. Un batch viene scritto quando:
+    - raggiunge max_batch righe, oppure
+    - contiene almeno una richiesta durable (scritto appena la coda è vuota,
+      con synchronous=FULL così che l'fsync sia condiviso dal batch), oppure
+    - sono passati max_delay secondi dalla prima riga in attesa.
+
+    Ogni riga ha un Future che si risolve con l'id assegnato (o con
+    l'eccezione della scrittura). close() svuota la coda prima di uscire.
+    """
+
+    def __init__(self, max_batch=WRITER_MAX_BATCH, max_delay=WRITER_MAX_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="assessment-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, row, durable=False):
         """
-        CREATE TABLE IF NOT EXISTS assessments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            created_at TEXT NOT NULL,
-            company_name TEXT,
-            final_score REAL NOT NULL,
-            risk_class TEXT NOT NULL,
-            ai_risk REAL NOT NULL,
-            gdpr_risk REAL NOT NULL,
-            operational_risk REAL NOT NULL,
-            urgency_risk REAL NOT NULL,
-            answers_json TEXT NOT NULL,
-            report_text TEXT NOT NULL
-        );
+        Accoda una valutazione (la coppia di righe di _assessment_row);
+        ritorna un Future con l'id assegnato.
         """
-    )
-    conn.commit()
-    conn.close()
+        future = Future()
+        self._ensure_started()
+        self._queue.put((row, durable, future))
+        return future
 
+    def flush(self, timeout=None):
+        """Attende che tutte le righe accodate finora siano scritte."""
+        if self._thread is None:
+            return
+        marker = _Flush()
+        self._queue.put(marker)
+        marker.future.result(timeout)
 
-def log_assessment(company_name, answers, result):
+    def close(self):
+        """Scrive le righe ancora in coda e ferma il thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = []
+            markers = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.max_delay
+            durable = False
+
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, _Flush):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                durable = durable or item[1]
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    if durable:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch, durable)
+            for marker in markers:
+                marker.future.set_result(None)
+
+    def _write(self, batch, durable):
+        rows = [row for (row, _), _, _ in batch]
+        started = time.perf_counter()
+        try:
+            with pooled_connection() as conn:
+                if durable:
+                    conn.execute("PRAGMA synchronous=FULL")
+                try:
+                    with conn:
+                        conn.executemany(_INSERT_ASSESSMENT_SQL, rows)
+                        # Il batch è un'unica transazione con il lock di
+                        # scrittura: gli id assegnati sono consecutivi
+                        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                        first_id = last_id - len(batch) + 1
+                        conn.executemany(
+                            INSERT_ANSWERS_SQL,
+                            [
+                                (first_id + offset, *answers_row)
+                                for offset, ((_, answers_row), _, _) in enumerate(batch)
+                            ],
+                        )
+                        update_company_drift(
+                            conn,
+                            [
+                                (first_id + offset, row[1], row[2], row[3], *row[5:9])
+                                for offset, row in enumerate(rows)
+                            ],
+                        )
+                        update_aggregates(
+                            conn,
+                            [(row[0], row[2], row[4], row[3], *row[5:9]) for row in rows],
+                        )
+                finally:
+                    if durable:
+                        conn.execute("PRAGMA synchronous=NORMAL")
+        except Exception as exc:
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+
+        if METRICS_ENABLED:
+            DB_SECONDS.observe(time.perf_counter() - started, "write_batch")
+            DB_BATCH_ROWS.observe(len(batch))
+        _bump_data_version()
+        for offset, (_, _, future) in enumerate(batch):
+            future.set_result(first_id + offset)
+
+
+def _create_writer():
+    if WRITER_ADDRESS:
+        from .writer_service import RemoteWriter
+
+        return RemoteWriter(WRITER_ADDRESS, on_written=_bump_data_version)
+    return AssessmentWriter()
+
+
+_writer = _create_writer()
+atexit.register(lambda: _writer.close())
+
+
+def use_local_writer():
+    """
+    Scrive nel processo corrente, con connessioni in lettura e scrittura
+    (usato dal processo scrittore della modalità multi-worker).
+    """
+    global _writer, READ_ONLY
+    _writer.close()
+    _writer = AssessmentWriter()
+    READ_ONLY = False
+    close_connections()
+
+
+def submit_assessment_row(row, durable=False):
+    """Accoda una riga già preparata (da _assessment_row); ritorna un Future con l'id."""
+    return _writer.submit(row, durable)
+
+
+def flush_assessments(timeout=None):
+    """Attende la scrittura di tutte le valutazioni accodate."""
+    if _store is None:
+        _writer.flush(timeout)
+    else:
+        _store_writer.submit(lambda: None).result(timeout)
+
+
+def _store_log(company_name, answers, result):
+    assessment_id = _store.log(company_name, answers, result)
+    _bump_data_version()
+    return assessment_id
+
+
+@timed(DB_SECONDS, "log_assessment")
+def log_assessment(company_name, answers, result, durable=True):
     """
     Salva una valutazione nel database.
 
@@ -51,46 +505,60 @@ def log_assessment(company_name, answers, result):
     - operational_risk
     - urgency_risk
     - report
+
+    Con durable=True (default) attende il commit su disco e ritorna l'id
+    della valutazione; le chiamate concorrenti condividono lo stesso commit.
+    Con durable=False ritorna subito un Future con l'id: la riga viene
+    scritta con il batch successivo, o dal thread store-writer con un
+    backend esterno (fire-and-forget per i job in bulk).
     """
-    conn = get_connection()
-    cur = conn.cursor()
+    if _store is not None:
+        if durable:
+            return _store_log(company_name, answers, result)
+        return _store_writer.submit(_store_log, company_name, answers, result)
+    future = _writer.submit(_assessment_row(company_name, answers, result), durable)
+    if durable:
+        return future.result()
+    return future
 
-    created_at = datetime.now().isoformat(timespec="seconds")
 
-    cur.execute(
-        """
-        INSERT INTO assessments (
-            created_at,
-            company_name,
-            final_score,
-            risk_class,
-            ai_risk,
-            gdpr_risk,
-            operational_risk,
-            urgency_risk,
-            answers_json,
-            report_text
+async def log_assessment_async(company_name, answers, result, durable=True):
+    """
+    Come log_assessment, per il codice asyncio: la riga va in coda allo
+    scrittore e si attende il commit senza bloccare il loop (nessun I/O su
+    disco nel thread del loop). Ritorna l'id della valutazione.
+    """
+    if _store is not None:
+        if durable:
+            return await asyncio.to_thread(_store_log, company_name, answers, result)
+        return await asyncio.wrap_future(
+            _store_writer.submit(_store_log, company_name, answers, result)
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            created_at,
-            company_name,
-            float(result.final_score),
-            str(result.risk_class),
-            float(result.ai_risk),
-            float(result.gdpr_risk),
-            float(result.operational_risk),
-            float(result.urgency_risk),
-            json.dumps(answers, ensure_ascii=False),
-            result.report,
-        ),
-    )
+    future = _writer.submit(_assessment_row(company_name, answers, result), durable)
+    return await asyncio.wrap_future(future)
+
 
-    conn.commit()
-    conn.close()
+@timed(DB_SECONDS, "bulk_insert_assessments")
+def bulk_insert_assessments(items):
+    """
+    Salva molte valutazioni, date come (company_name, answers, result).
+    Con SQLite passano dallo scrittore a batch (un commit ogni
+    WRITER_MAX_BATCH righe), con PostgreSQL da un unico COPY.
+    Ritorna il numero di valutazioni salvate.
+    """
+    if _store is not None:
+        count = _store.bulk_insert(items)
+        _bump_data_version()
+        return count
+    count = 0
+    for company_name, answers, result in items:
+        _writer.submit(_assessment_row(company_name, answers, result), False)
+        count += 1
+    flush_assessments()
+    return count
 
 
+@timed(DB_SECONDS, "get_recent_assessments")
 def get_recent_assessments(limit=50):
     """
     Ritorna le ultime N valutazioni come lista di tuple:
@@ -98,10 +566,141 @@ def get_recent_assessments(limit=50):
     (id, created_at, company_name, final_score, risk_class,
      ai_risk, gdpr_risk, operational_risk, urgency_risk)
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
+    if _store is not None:
+        return _store.recent(limit)
+    with pooled_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT
+                id,
+                created_at,
+                company_name,
+                final_score,
+                risk_class,
+                ai_risk,
+                gdpr_risk,
+                operational_risk,
+                urgency_risk
+            FROM assessments
+            ORDER BY created_ts DESC, id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    return rows
+
+
+def get_last_assessment():
+    """
+    Ritorna l'ultima valutazione (una sola riga) oppure None.
+    """
+    if _store is not None:
+        return _store.last()
+    rows = get_recent_assessments(limit=1)
+    return rows[0] if rows else None
+
+
+# Colonne da cui si ricava il report (vedi report_from_row)
+REPORT_COLUMNS = (
+    "final_score, risk_class, ai_risk, gdpr_risk, operational_risk, urgency_risk, "
+    "reason_codes, report_text"
+)
+
+
+def report_from_row(row):
+    """
+    Report di una valutazione dalle colonne REPORT_COLUMNS: generato con il
+    template corrente se la riga ha i codici dei motivi, altrimenti il testo
+    salvato (righe con motivi fuori catalogo).
+    """
+    *scores, reason_codes, report_text = row
+    if reason_codes is None:
+        return report_text
+    return render_report(*scores, unpack_reason_codes(reason_codes))
+
+
+@timed(DB_SECONDS, "get_assessment_report")
+def get_assessment_report(assessment_id):
+    """Ritorna (company_name, report_text) di una valutazione, oppure None."""
+    if _store is not None:
+        return _store.report(assessment_id)
+    with pooled_connection() as conn:
+        row = conn.execute(
+            f"SELECT company_name, {REPORT_COLUMNS} FROM assessments WHERE id = ?",
+            (assessment_id,),
+        ).fetchone()
+    return (row[0], report_from_row(row[1:])) if row else None
+
+
+def _history_filters(
+    company_name=None, risk_class=None, date_from=None, date_to=None, table="", placeholder="?"
+):
+    # Condizioni WHERE comuni a storico e aggregazioni (table: prefisso "a.";
+    # placeholder: "%s" per il backend PostgreSQL)
+    where = []
+    params = []
+    if company_name is not None:
+        where.append(f"{table}company_name = {placeholder}")
+        params.append(company_name)
+    if risk_class is not None:
+        where.append(f"{table}risk_class = {placeholder}")
+        params.append(risk_class)
+    if date_from is not None:
+        where.append(f"{table}created_ts >= {placeholder}")
+        params.append(to_timestamp(date_from))
+    if isinstance(date_to, str):
+        try:
+            # Solo data (es. "2025-01-31" da API o CLI): tutto il giorno, come un date
+            date_to = date.fromisoformat(date_to)
+        except ValueError:
+            pass  # data e ora: limite puntuale
+    if date_to is not None:
+        if isinstance(date_to, date) and not isinstance(date_to, datetime):
+            where.append(f"{table}created_ts < {placeholder}")
+            params.append(to_timestamp(date_to + timedelta(days=1)))
+        else:
+            where.append(f"{table}created_ts <= {placeholder}")
+            params.append(to_timestamp(date_to))
+    return where, params
+
+
+@timed(DB_SECONDS, "get_assessment_history")
+def get_assessment_history(
+    limit=50,
+    cursor=None,
+    company_name=None,
+    risk_class=None,
+    date_from=None,
+    date_to=None,
+):
+    """
+    Storico paginato per chiave (keyset), dal più recente al meno recente.
+
+    Ritorna (rows, next_cursor): rows ha lo stesso formato di
+    get_recent_assessments; next_cursor è la coppia (created_ts, id)
+    dell'ultima riga da passare come cursor per la pagina successiva,
+    oppure None se non ci sono altre righe.
+
+    Filtri opzionali: nome azienda (esatto), classe di rischio e intervallo
+    di date (datetime, date o stringa ISO; una date come date_to include
+    l'intero giorno). Ogni pagina usa gli indici su created_ts, quindi il
+    costo non dipende da quante righe ci sono prima del cursore.
+    """
+    if _store is not None:
+        return _store.history(
+            limit,
+            cursor,
+            company_name=company_name,
+            risk_class=risk_class,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    where, params = _history_filters(company_name, risk_class, date_from, date_to)
+    if cursor is not None:
+        where.append("(created_ts, id) < (?, ?)")
+        params.extend(cursor)
+
+    sql = """
         SELECT
             id,
             created_at,
@@ -111,30 +710,215 @@ def get_recent_assessments(limit=50):
             ai_risk,
             gdpr_risk,
             operational_risk,
-            urgency_risk
+            urgency_risk,
+            created_ts
         FROM assessments
-        ORDER BY datetime(created_at) DESC
-        LIMIT ?
-        """,
-        (limit,),
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_ts DESC, id DESC LIMIT ?"
+    params.append(limit)
+
+    with pooled_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = (rows[-1][9], rows[-1][0]) if len(rows) == limit else None
+    return [row[:9] for row in rows], next_cursor
+
+
+def iter_assessment_reports(batch_size=200, **filters):
+    """
+    Itera (id, created_at, company_name, report_text) delle valutazioni che
+    rispettano i filtri di get_assessment_history, dalla più recente.
+    Le righe vengono lette a pagine di batch_size (keyset), quindi in memoria
+    c'è al più una pagina alla volta.
+    """
+    if _store is not None:
+        yield from _store.iter_reports(batch_size, **filters)
+        return
+    where, params = _history_filters(**filters)
+    cursor = None
+    while True:
+        page_where = list(where)
+        page_params = list(params)
+        if cursor is not None:
+            page_where.append("(created_ts, id) < (?, ?)")
+            page_params.extend(cursor)
+        sql = (
+            f"SELECT id, created_at, company_name, {REPORT_COLUMNS}, created_ts "
+            "FROM assessments"
+        )
+        if page_where:
+            sql += " WHERE " + " AND ".join(page_where)
+        sql += " ORDER BY created_ts DESC, id DESC LIMIT ?"
+        page_params.append(batch_size)
+
+        with pooled_connection() as conn:
+            rows = conn.execute(sql, page_params).fetchall()
+        for row in rows:
+            yield (*row[:3], report_from_row(row[3:11]))
+        if len(rows) < batch_size:
+            return
+        cursor = (rows[-1][11], rows[-1][0])
+
+
+@timed(DB_SECONDS, "get_assessment_answers")
+def get_assessment_answers(assessment_id):
+    """
+    Ritorna il questionario di una valutazione come dizionario (lo stesso
+    passato a log_assessment), oppure None se la valutazione non esiste.
+    """
+    with pooled_connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(ANSWER_COLUMNS)}, extra_json "
+            "FROM assessment_answers WHERE assessment_id = ?",
+            (assessment_id,),
+        ).fetchone()
+        if row is not None:
+            return decode_answers(row[:-1], row[-1])
+        # Righe non ancora normalizzate (backfill in corso)
+        row = conn.execute(
+            "SELECT answers_json FROM assessments WHERE id = ?", (assessment_id,)
+        ).fetchone()
+    return json.loads(row[0]) if row and row[0] else None
+
+
+# -------------------------------------------------
+# Aggregazioni sulle risposte (calcolate in SQL)
+# -------------------------------------------------
+
+
+def _answers_query(select, field, group_by, filters):
+    if field not in ANSWER_COLUMNS:
+        raise ValueError(f"Campo sconosciuto: {field}")
+    where, params = _history_filters(table="a.", **filters)
+    where.append(f"n.{field} IS NOT NULL")
+    sql = (
+        f"SELECT {select} FROM assessment_answers n "
+        "JOIN assessments a ON a.id = n.assessment_id "
+        f"WHERE {' AND '.join(where)}"
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    if group_by:
+        sql += f" GROUP BY {group_by}"
+    with pooled_connection() as conn:
+        return conn.execute(sql, params).fetchall()
 
 
-def get_last_assessment():
+def _option_sums(field, expression):
+    # Per i campi multipli: una colonna per opzione, più il bit "altro"
+    bits = [1 << i for i in range(len(MULTI_FIELDS[field]) + 1)]
+    return ", ".join(
+        f"SUM(CASE WHEN n.{field} & {bit} THEN {expression} END)" for bit in bits
+    )
+
+
+def _option_labels(field):
+    return list(MULTI_FIELDS[field]) + [None]
+
+
+@timed(DB_SECONDS, "answer_counts")
+def answer_counts(field, **filters):
     """
-    Ritorna l'ultima valutazione (una sola riga) oppure None.
+    Numero di valutazioni per ciascun valore di un campo del questionario,
+    es. answer_counts("human_oversight") -> {"always": 12, "none": 3, ...}.
+
+    Per i campi a scelta multipla conta le valutazioni che hanno selezionato
+    ciascuna opzione. La chiave None raccoglie i valori fuori vocabolario.
+    Accetta gli stessi filtri di get_assessment_history.
     """
-    rows = get_recent_assessments(limit=1)
-    return rows[0] if rows else None
+    if field in MULTI_FIELDS:
+        (row,) = _answers_query(_option_sums(field, "1"), field, None, filters)
+        return {
+            label: count
+            for label, count in zip(_option_labels(field), row)
+            if count
+        }
+    rows = _answers_query(f"n.{field}, COUNT(*)", field, f"n.{field}", filters)
+    labels = answer_labels(field)
+    return {labels[code]: count for code, count in rows}
+
+
+@timed(DB_SECONDS, "score_by_answer")
+def score_by_answer(field, **filters):
+    """
+    Punteggio finale medio per ciascun valore di un campo del questionario:
+    valore -> (numero di valutazioni, media di final_score).
+    Accetta gli stessi filtri di get_assessment_history.
+    """
+    if field in MULTI_FIELDS:
+        (row,) = _answers_query(
+            _option_sums(field, "1") + ", " + _option_sums(field, "a.final_score"),
+            field,
+            None,
+            filters,
+        )
+        labels = _option_labels(field)
+        counts, totals = row[: len(labels)], row[len(labels):]
+        return {
+            label: (count, total / count)
+            for label, count, total in zip(labels, counts, totals)
+            if count
+        }
+    rows = _answers_query(
+        f"n.{field}, COUNT(*), AVG(a.final_score)", field, f"n.{field}", filters
+    )
+    labels = answer_labels(field)
+    return {labels[code]: (count, average) for code, count, average in rows}
+
+
+# -------------------------------------------------
+# Aggregati materializzati
+# -------------------------------------------------
+
+
+@timed(DB_SECONDS, "get_stats")
+def get_stats(company_name=None):
+    """
+    KPI aggregati (vedi app.aggregates) di tutte le valutazioni o di
+    un'azienda: una sola riga letta, indipendentemente dallo storico.
+    """
+    with pooled_connection() as conn:
+        if company_name is None:
+            return select_stats(conn)
+        return select_stats(conn, "company", company_name)
+
+
+@timed(DB_SECONDS, "get_daily_stats")
+def get_daily_stats(days=90):
+    """Aggregati per giorno degli ultimi `days` giorni con valutazioni."""
+    with pooled_connection() as conn:
+        return select_daily_stats(conn, days)
+
+
+# -------------------------------------------------
+# Drift di conformità
+# -------------------------------------------------
+
+
+@timed(DB_SECONDS, "get_drift_alerts")
+def get_drift_alerts(slope_threshold=DRIFT_SLOPE_THRESHOLD, min_streak=DRIFT_MIN_STREAK, limit=50):
+    """
+    Aziende con punteggi in crescita su valutazioni successive (vedi
+    app.drift). Legge solo lo stato per azienda, non lo storico.
+    """
+    with pooled_connection() as conn:
+        return select_drift_alerts(conn, slope_threshold, min_streak, limit)
 
 
 def clear_all_assessments():
-    """Cancella tutte le righe dalla tabella assessments (senza eliminare il file)."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM assessments;")
-    conn.commit()
-    conn.close()
+    """Cancella tutte le valutazioni (senza eliminare il file)."""
+    if _store is not None:
+        _store.clear()
+        _bump_data_version()
+        return
+    if READ_ONLY:
+        _writer.clear()
+        return
+    # Le righe ancora in coda verrebbero altrimenti scritte dopo la cancellazione
+    flush_assessments()
+    with transaction() as conn:
+        conn.execute("DELETE FROM assessment_answers;")
+        conn.execute("DELETE FROM company_drift;")
+        conn.execute("DELETE FROM agg_stats;")
+        conn.execute("DELETE FROM assessments;")
+    _bump_data_version()
@@ -0,0 +1,223 @@
+# app/drift.py
+
+"""
+Rilevamento del "compliance drift": punteggi di un'azienda che salgono
+valutazione dopo valutazione.
+
+Per ogni azienda la tabella company_drift tiene uno stato che si aggiorna
+in O(1) a ogni nuova valutazione, nella stessa transazione che la salva:
+
+- ultimi punteggi (complessivo e per dominio)
+- media mobile esponenziale (EWMA) dei punteggi
+- pendenza: EWMA delle variazioni tra valutazioni successive
+- serie di aumenti consecutivi del punteggio complessivo
+
+Gli alert si leggono quindi dallo stato, senza riscandire lo storico.
+Le valutazioni senza nome azienda non partecipano.
+"""
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Metriche seguite, nell'ordine delle colonne di company_drift
+DRIFT_METRICS: Tuple[str, ...] = (
+    "final_score",
+    "ai_risk",
+    "gdpr_risk",
+    "operational_risk",
+    "urgency_risk",
+)
+
+# Peso della nuova osservazione nelle medie mobili
+DRIFT_ALPHA = 0.3
+
+# Pendenza minima (punti per valutazione) e aumenti consecutivi per un alert
+DRIFT_SLOPE_THRESHOLD = 2.0
+DRIFT_MIN_STREAK = 2
+
+# Valutazione da applicare allo stato: (id, created_ts, company_name, metriche...)
+DriftRow = Tuple[int, int, Optional[str], float, float, float, float, float]
+
+_STATE_COLUMNS: Tuple[str, ...] = (
+    "company_name",
+    "assessments",
+    "last_assessment_id",
+    "last_ts",
+    "rising_streak",
+    *(f"last_{m}" for m in DRIFT_METRICS),
+    *(f"ewma_{m}" for m in DRIFT_METRICS),
+    *(f"slope_{m}" for m in DRIFT_METRICS),
+)
+
+_UPSERT_SQL = (
+    f"INSERT OR REPLACE INTO company_drift ({', '.join(_STATE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_STATE_COLUMNS))})"
+)
+
+
+@dataclass
+class DriftState:
+    company_name: str
+    assessments: int
+    last_assessment_id: int
+    last_ts: int
+    rising_streak: int
+    last: List[float]
+    ewma: List[float]
+    slope: List[float]
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> "DriftState":
+        n = len(DRIFT_METRICS)
+        return cls(
+            company_name=row[0],
+            assessments=row[1],
+            last_assessment_id=row[2],
+            last_ts=row[3],
+            rising_streak=row[4],
+            last=list(row[5 : 5 + n]),
+            ewma=list(row[5 + n : 5 + 2 * n]),
+            slope=list(row[5 + 2 * n : 5 + 3 * n]),
+        )
+
+    def to_row(self) -> Tuple:
+        return (
+            self.company_name,
+            self.assessments,
+            self.last_assessment_id,
+            self.last_ts,
+            self.rising_streak,
+            *self.last,
+            *self.ewma,
+            *self.slope,
+        )
+
+    def observe(self, assessment_id: int, created_ts: int, scores: Sequence[float]) -> None:
+        """Aggiorna lo stato con una nuova valutazione dell'azienda."""
+        self.rising_streak = self.rising_streak + 1 if scores[0] > self.last[0] else 0
+        for i, score in enumerate(scores):
+            delta = score - self.last[i]
+            self.slope[i] = DRIFT_ALPHA * delta + (1 - DRIFT_ALPHA) * self.slope[i]
+            self.ewma[i] = DRIFT_ALPHA * score + (1 - DRIFT_ALPHA) * self.ewma[i]
+            self.last[i] = score
+        self.assessments += 1
+        self.last_assessment_id = assessment_id
+        self.last_ts = created_ts
+
+
+def _new_state(company_name: str, assessment_id: int, created_ts: int, scores: Sequence[float]) -> DriftState:
+    return DriftState(
+        company_name=company_name,
+        assessments=1,
+        last_assessment_id=assessment_id,
+        last_ts=created_ts,
+        rising_streak=0,
+        last=list(scores),
+        ewma=list(scores),
+        slope=[0.0] * len(scores),
+    )
+
+
+def update_company_drift(conn: sqlite3.Connection, rows: Sequence[DriftRow]) -> None:
+    """
+    Applica un batch di nuove valutazioni (in ordine di id) allo stato di
+    drift delle aziende coinvolte. Va chiamata dentro la transazione che
+    inserisce le valutazioni.
+    """
+    companies = sorted({row[2] for row in rows if row[2]})
+    if not companies:
+        return
+    placeholders = ", ".join("?" * len(companies))
+    states: Dict[str, DriftState] = {
+        row[0]: DriftState.from_row(row)
+        for row in conn.execute(
+            f"SELECT {', '.join(_STATE_COLUMNS)} FROM company_drift "
+            f"WHERE company_name IN ({placeholders})",
+            companies,
+        )
+    }
+    for assessment_id, created_ts, company_name, *scores in rows:
+        if not company_name:
+            continue
+        state = states.get(company_name)
+        if state is None:
+            states[company_name] = _new_state(company_name, assessment_id, created_ts, scores)
+        elif assessment_id > state.last_assessment_id:
+            state.observe(assessment_id, created_ts, scores)
+    conn.executemany(_UPSERT_SQL, [state.to_row() for state in states.values()])
+
+
+def backfill_company_drift(conn: sqlite3.Connection, first_id: int, last_id: int) -> None:
+    """Passo di backfill (app.migrations): rigioca lo storico in ordine di id."""
+    rows = conn.execute(
+        f"""
+        SELECT id, created_ts, company_name, {', '.join(DRIFT_METRICS)}
+        FROM assessments
+        WHERE id BETWEEN ? AND ? AND company_name IS NOT NULL
+        ORDER BY id
+        """,
+        (first_id, last_id),
+    ).fetchall()
+    update_company_drift(conn, rows)
+
+
+# -------------------------------------------------
+# Alert
+# -------------------------------------------------
+
+
+@dataclass(frozen=True)
+class DriftAlert:
+    company_name: str
+    assessments: int
+    last_assessment_id: int
+    final_score: float
+    slope: float
+    rising_streak: int
+    domain: str
+    domain_slope: float
+
+
+def select_drift_alerts(
+    conn: sqlite3.Connection,
+    slope_threshold: float = DRIFT_SLOPE_THRESHOLD,
+    min_streak: int = DRIFT_MIN_STREAK,
+    limit: int = 50,
+) -> List[DriftAlert]:
+    """
+    Aziende in drift: almeno min_streak aumenti consecutivi del punteggio
+    complessivo e una pendenza (complessiva o di un dominio) di almeno
+    slope_threshold punti per valutazione. Ordinate per pendenza.
+    """
+    domain_slopes = [f"slope_{m}" for m in DRIFT_METRICS[1:]]
+    rows = conn.execute(
+        f"""
+        SELECT company_name, assessments, last_assessment_id, last_final_score,
+               slope_final_score, rising_streak, {', '.join(domain_slopes)}
+        FROM company_drift
+        WHERE rising_streak >= ?
+          AND MAX(slope_final_score, {', '.join(domain_slopes)}) >= ?
+        ORDER BY slope_final_score DESC
+        LIMIT ?
+        """,
+        (min_streak, slope_threshold, limit),
+    ).fetchall()
+
+    alerts = []
+    for row in rows:
+        slopes = dict(zip(DRIFT_METRICS[1:], row[6:]))
+        domain = max(slopes, key=slopes.get)
+        alerts.append(
+            DriftAlert(
+                company_name=row[0],
+                assessments=row[1],
+                last_assessment_id=row[2],
+                final_score=row[3],
+                slope=row[4],
+                rising_streak=row[5],
+                domain=domain,
+                domain_slope=slopes[domain],
+            )
+        )
+    return alerts
@@ -0,0 +1,221 @@
+# app/lookup.py
+
+"""
+Tabelle precalcolate per lo scoring da answers_key (compute_risk_fast).
+
+Ogni campo del questionario ha un numero finito di codici (vedi app.rules),
+e ogni gruppo di regole (dominio + condizione di attivazione) dipende solo da
+pochi campi. Per ogni gruppo il builder enumera tutte le combinazioni di
+codici dei suoi campi e memorizza, in array compatti:
+
+- il punteggio parziale del gruppo (uint8)
+- la bitmask delle regole scattate, da cui si ricavano regole e motivi (uint16)
+
+Le tabelle (~180 KB) si costruiscono all'import in circa 0,3 s: con
+gunicorn --preload una volta sola nel master, condivise dai worker.
+
+compute_risk_fast parte dalla answers_key, che la validazione
+(app.validation) produce comunque come chiave della cache: i codici sono già
+pronti e valutare un questionario diventa un indice per gruppo più i
+moltiplicatori di dimensione / geografia. compute_risk resta la definizione
+dello scoring; i test verificano che le due funzioni coincidano.
+"""
+
+import itertools
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .rules import (
+    ANY,
+    DOMAINS,
+    FIELD_VALUES,
+    GATES,
+    MULTI_FIELDS,
+    RULES,
+    Rule,
+    encode_value,
+    field_cardinality,
+)
+from .metrics import SCORING_SECONDS, timed
+from .scoring import GEO_MULTIPLIERS, SIZE_MULTIPLIERS, RiskResult, _combine_scores, clamp
+
+# Posizione di ogni campo nella answers_key (app.scoring_cache)
+_KEY_SLOTS: Dict[str, int] = {
+    field: i for i, field in enumerate((*FIELD_VALUES, *MULTI_FIELDS))
+}
+
+
+@dataclass(frozen=True)
+class LookupGroup:
+    """Tabella di un gruppo di regole, indicizzata dai codici dei suoi campi."""
+
+    domain_index: int
+    scores: array
+    reasons: array
+    # bitmask delle regole -> codici delle regole / dei soli motivi,
+    # per le sole bitmask presenti in tabella
+    rule_codes: Dict[int, Tuple[int, ...]]
+    reason_codes: Dict[int, Tuple[int, ...]]
+    # (posizione nella answers_key, stride) di ogni campo del gruppo
+    slots: Tuple[Tuple[int, int], ...]
+
+
+@dataclass(frozen=True)
+class ScoringTables:
+    """Tabelle di tutti i gruppi, nell'ordine in cui compute_risk emette i motivi."""
+
+    groups: Tuple[LookupGroup, ...]
+    # codice di company_size / geography -> moltiplicatore
+    size_multipliers: Tuple[float, ...]
+    geo_multipliers: Tuple[float, ...]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            len(g.scores) * g.scores.itemsize + len(g.reasons) * g.reasons.itemsize
+            for g in self.groups
+        )
+
+
+# -------------------------------------------------------------------
+#  Builder
+# -------------------------------------------------------------------
+
+
+def _group_layout() -> List[Tuple[str, Optional[str], List[str], List[Rule]]]:
+    """Gruppi (dominio, gate, campi, regole) nell'ordine di prima comparsa."""
+    groups: Dict[Tuple[str, Optional[str]], Tuple[List[str], List[Rule]]] = {}
+    for rule in RULES:
+        fields, rules = groups.setdefault((rule.domain, rule.gate), ([], []))
+        if rule.gate is not None and GATES[rule.gate][0] not in fields:
+            fields.append(GATES[rule.gate][0])
+        if rule.field not in fields:
+            fields.append(rule.field)
+        rules.append(rule)
+    return [(domain, gate, fields, rules) for (domain, gate), (fields, rules) in groups.items()]
+
+
+def _gate_open(gate: Optional[str], code: int) -> bool:
+    if gate is None:
+        return True
+    field, value = GATES[gate]
+    return code != 0 if value == ANY else code == encode_value(field, value)
+
+
+def _build_group(
+    domain: str, gate: Optional[str], fields: List[str], rules: List[Rule]
+) -> LookupGroup:
+    scores = array("B")
+    reasons = array("H")
+    gate_pos = fields.index(GATES[gate][0]) if gate is not None else None
+    rule_pos = [fields.index(rule.field) for rule in rules]
+    cards = [field_cardinality(field) for field in fields]
+
+    for codes in itertools.product(*(range(card) for card in cards)):
+        score = 0
+        mask = 0
+        if gate_pos is None or _gate_open(gate, codes[gate_pos]):
+            for bit, (rule, pos) in enumerate(zip(rules, rule_pos)):
+                if rule.matches_code(codes[pos]):
+                    score += int(rule.points)
+                    mask |= 1 << bit
+        # array("B") solleva OverflowError oltre 255
+        scores.append(score)
+        reasons.append(mask)
+
+    strides = []
+    stride = 1
+    for card in reversed(cards):
+        strides.append(stride)
+        stride *= card
+    return LookupGroup(
+        domain_index=DOMAINS.index(domain),
+        scores=scores,
+        reasons=reasons,
+        rule_codes={
+            mask: tuple(rule.code for bit, rule in enumerate(rules) if mask >> bit & 1)
+            for mask in set(reasons)
+        },
+        reason_codes={
+            mask: tuple(
+                rule.code
+                for bit, rule in enumerate(rules)
+                if mask >> bit & 1 and rule.reason is not None
+            )
+            for mask in set(reasons)
+        },
+        slots=tuple(zip((_KEY_SLOTS[field] for field in fields), reversed(strides))),
+    )
+
+
+def _multipliers(multipliers: Dict[str, float], values: Tuple[str, ...]) -> Tuple[float, ...]:
+    # Codice 0 (assente o sconosciuto): 1.0, come SIZE/GEO_MULTIPLIERS.get(value, 1.0)
+    return (1.0, *(multipliers.get(value, 1.0) for value in values))
+
+
+def build_tables() -> ScoringTables:
+    """Enumera tutte le combinazioni di ogni gruppo e costruisce le tabelle."""
+    for rule in RULES:
+        if not float(rule.points).is_integer():
+            raise ValueError(f"La regola {rule.code} ha punti non interi: {rule.points}")
+    return ScoringTables(
+        groups=tuple(_build_group(*layout) for layout in _group_layout()),
+        size_multipliers=_multipliers(SIZE_MULTIPLIERS, FIELD_VALUES["company_size"]),
+        geo_multipliers=_multipliers(GEO_MULTIPLIERS, FIELD_VALUES["geography"]),
+    )
+
+
+TABLES = build_tables()
+
+# Gruppi come tuple semplici: lo spacchettamento nel ciclo costa meno degli attributi.
+# Regole e motivi di una bitmask stanno in un solo dict: un lookup per gruppo.
+_GROUPS = tuple(
+    (
+        g.domain_index,
+        g.scores,
+        g.reasons,
+        {mask: (codes, g.reason_codes[mask]) for mask, codes in g.rule_codes.items()},
+        g.slots,
+    )
+    for g in TABLES.groups
+)
+_SIZE_SLOT = _KEY_SLOTS["company_size"]
+_GEO_SLOT = _KEY_SLOTS["geography"]
+
+
+# -------------------------------------------------------------------
+#  Scoring
+# -------------------------------------------------------------------
+
+
+@timed(SCORING_SECONDS, "compute_risk_fast")
+def compute_risk_fast(key: Sequence[int]) -> RiskResult:
+    """
+    Stesso risultato di compute_risk(answers) per key = answers_key(answers),
+    con un indice per gruppo di regole al posto della valutazione delle regole.
+    """
+    totals = [0, 0, 0, 0]
+    fired: List[int] = []
+    reasons: List[int] = []
+    for domain_index, scores, masks, mask_codes, slots in _GROUPS:
+        index = 0
+        for slot, stride in slots:
+            index += key[slot] * stride
+        totals[domain_index] += scores[index]
+        mask = masks[index]
+        if mask:
+            rule_codes, reason_codes = mask_codes[mask]
+            fired.extend(rule_codes)
+            reasons.extend(reason_codes)
+
+    return _combine_scores(
+        clamp(float(totals[0])),
+        clamp(float(totals[1])),
+        clamp(float(totals[2])),
+        clamp(float(totals[3])),
+        TABLES.size_multipliers[key[_SIZE_SLOT]],
+        TABLES.geo_multipliers[key[_GEO_SLOT]],
+        fired,
+        reasons,
+    )
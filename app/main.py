@@ -1,10 +1,66 @@
 # app/main.py
 
-from fastapi import FastAPI
-from app.schemas import AssessmentRequest, AssessmentResponse
-from app.scoring import compute_risk
+import email.message
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Literal, Optional, Tuple, Type
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from app.batch import BatchFormatError, open_batch, stream_batch_results
+from app.bulk_export import EXPORT_PDF_MAX_REPORTS, ExportTooLargeError, export_reports
+from app.db import (
+    get_assessment_report,
+    get_daily_stats,
+    get_drift_alerts,
+    get_stats,
+    init_db,
+    log_assessment,
+    log_assessment_async,
+)
+from app.drift import DRIFT_MIN_STREAK, DRIFT_SLOPE_THRESHOLD
+from app.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, METRICS_ENABLED, render_metrics
+from app.report_cache import render_report_pdf, report_cache_key
+from app.schemas import (
+    AssessmentRequest,
+    AssessmentResponse,
+    DriftAlertResponse,
+    PersistedAssessmentRequest,
+    PersistedAssessmentResponse,
+    SimilarAssessmentResponse,
+    StatsBucket,
+    StatsResponse,
+)
+from app.scoring import RiskResult
+from app.scoring_cache import compute_risk_cached, key_fingerprint
+from app.serialization import (
+    MSGPACK_CONTENT_TYPE,
+    negotiate_media_type,
+    result_to_json,
+    result_to_msgpack,
+)
+from app.similarity import HIGH_RISK_CLASSES, find_similar
+from app.storage import STORAGE_BACKEND
+from app.validation import (
+    RequestValidator,
+    ValidatedAnswers,
+    assessment_validator,
+    persisted_assessment_validator,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    yield
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="AI Compliance & Risk Intelligence API",
     version="0.1.0",
     description=(
@@ -14,27 +70,374 @@ app = FastAPI(
 )
 
 
+if METRICS_ENABLED:
+
+    @app.middleware("http")
+    async def measure_requests(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        # Etichetta per rotta (es. /assess/{assessment_id}), non per URL
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            request.method,
+            route.path if route is not None else "unmatched",
+        )
+        return response
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Metriche in formato Prometheus (abilitate con APP_METRICS=1)."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metriche disabilitate (APP_METRICS=1).")
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
 @app.get("/health")
 def health_check() -> dict:
     return {"status": "ok"}
 
 
+# -------------------------------------------------
+# Endpoint solo SQLite
+# -------------------------------------------------
+
+
+def _require_sqlite() -> None:
+    # Aggregati, drift e Decision Memory leggono tabelle che esistono solo nel
+    # file SQLite (vedi app.storage): con un altro backend 501, non un errore 500
+    if STORAGE_BACKEND != "sqlite":
+        raise HTTPException(
+            status_code=501,
+            detail=f"Funzione disponibile solo con il backend SQLite (APP_STORAGE={STORAGE_BACKEND})",
+        )
+
+
+# -------------------------------------------------
+# Corpo dei questionari (validazione veloce)
+# -------------------------------------------------
+
+
+def _request_body(model: Type[BaseModel]) -> dict:
+    # Schema OpenAPI del corpo, che l'endpoint legge da sé (_validated_body)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+        }
+    }
+
+
+def _is_json(content_type: str) -> bool:
+    message = email.message.Message()
+    message["content-type"] = content_type
+    subtype = message.get_content_subtype()
+    return message.get_content_maintype() == "application" and (
+        subtype == "json" or subtype.endswith("+json")
+    )
+
+
+async def _raw_body(request: Request) -> bytes:
+    # Dipendenza async: legge il corpo sul loop, l'handler sync lo valida nel threadpool
+    return await request.body()
+
+
+def _validated_body(
+    request: Request, body: bytes, validator: RequestValidator
+) -> ValidatedAnswers:
+    """
+    Valida il corpo JSON con app.validation. Gli errori sono gli stessi
+    (422, stesso formato) della validazione di FastAPI con il modello.
+    """
+    data = None
+    if body:
+        content_type = request.headers.get("content-type")
+        if content_type and not _is_json(content_type):
+            data = body
+        else:
+            try:
+                data = json.loads(body)
+            except json.JSONDecodeError as exc:
+                raise RequestValidationError(
+                    [
+                        {
+                            "type": "json_invalid",
+                            "loc": ("body", exc.pos),
+                            "msg": "JSON decode error",
+                            "input": {},
+                            "ctx": {"error": exc.msg},
+                        }
+                    ],
+                    body=exc.doc,
+                ) from exc
+    if data is None:
+        raise RequestValidationError(
+            [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+        )
+    try:
+        return validator.validate(data)
+    except ValidationError as exc:
+        errors = [
+            {**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)
+        ]
+        raise RequestValidationError(errors, body=data) from exc
+
+
 @app.post(
     "/assess",
     response_model=AssessmentResponse,
     summary="Valuta il rischio AI / GDPR per una PMI",
     tags=["assessment"],
+    openapi_extra=_request_body(AssessmentRequest),
+)
+def assess_risk(request: Request, body: bytes = Depends(_raw_body)) -> Response:
+    """
+    Il corpo (un AssessmentRequest) è validato da app.validation, che
+    produce direttamente le risposte codificate. L'ETag è la loro impronta
+    canonica: un client che reinvia lo stesso questionario con If-None-Match
+    riceve 304 senza corpo. L'handler è sync: validazione, scoring e
+    serializzazione girano nel threadpool, non sul loop.
+
+    Il corpo è serializzato direttamente dal RiskResult (app.serialization),
+    in JSON oppure in MessagePack se l'header Accept lo preferisce e msgpack
+    è installato (406 se il client accetta solo MessagePack e manca).
+    """
+    validated = _validated_body(request, body, assessment_validator)
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    if media_type is None:
+        raise HTTPException(
+            status_code=406, detail="MessagePack non disponibile: accettare application/json."
+        )
+    # Un ETag per rappresentazione (JSON e MessagePack non sono gli stessi byte)
+    fingerprint = key_fingerprint(validated.key)
+    etag = f'"{fingerprint}"' if media_type != MSGPACK_CONTENT_TYPE else f'"{fingerprint}-msgpack"'
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    result = compute_risk_cached(validated.answers, validated.key)
+
+    if media_type == MSGPACK_CONTENT_TYPE:
+        return Response(result_to_msgpack(result), media_type=media_type, headers=headers)
+    return Response(result_to_json(result), media_type=media_type, headers=headers)
+
+
+@app.post(
+    "/assessments",
+    response_model=PersistedAssessmentResponse,
+    status_code=201,
+    summary="Valuta il rischio e salva la valutazione",
+    tags=["assessment"],
+    openapi_extra=_request_body(PersistedAssessmentRequest),
 )
-def assess_risk(payload: AssessmentRequest) -> AssessmentResponse:
-    result = compute_risk(payload.dict())
+async def create_assessment(
+    request: Request,
+    body: bytes = Depends(_raw_body),
+    wait: bool = Query(
+        True,
+        description=(
+            "Attende il salvataggio e restituisce l'id; con false la valutazione "
+            "viene accodata e scritta con il batch successivo."
+        ),
+    ),
+) -> Response:
+    """
+    Variante di /assess che salva la valutazione. Validazione, scoring e
+    serializzazione girano nel threadpool come in /assess; il loop attende
+    solo lo scrittore in background (commit di gruppo), mai l'I/O su disco.
+    """
+    company_name, answers, result = await run_in_threadpool(_score_persisted, request, body)
+    if wait:
+        assessment_id = await log_assessment_async(company_name, answers, result)
+    else:
+        log_assessment(company_name, answers, result, durable=False)
+        assessment_id = None
+    content = await run_in_threadpool(result_to_json, result, assessment_id)
+    return Response(content, status_code=201, media_type="application/json")
+
+
+def _score_persisted(request: Request, body: bytes) -> Tuple[Optional[str], dict, RiskResult]:
+    validated = _validated_body(request, body, persisted_assessment_validator)
+    answers = validated.answers
+    company_name = answers.pop("company_name")
+    return company_name, answers, compute_risk_cached(answers, validated.key)
 
-    return AssessmentResponse(
-        ai_risk=result.ai_risk,
-        gdpr_risk=result.gdpr_risk,
-        operational_risk=result.operational_risk,
-        urgency_risk=result.urgency_risk,
-        final_score=result.final_score,
-        risk_class=result.risk_class,
-        reasons=result.reasons,
-        report=result.report,
+
+@app.post(
+    "/assess/similar",
+    response_model=List[SimilarAssessmentResponse],
+    summary="Valutazioni passate più simili a un questionario (Decision Memory)",
+    tags=["assessment"],
+    dependencies=[Depends(_require_sqlite)],
+)
+def similar_assessments(
+    payload: AssessmentRequest,
+    k: int = Query(5, ge=1, le=100, description="Numero di valutazioni da restituire."),
+    high_risk_only: bool = Query(
+        False, description="Solo valutazioni passate in classe High o Critical."
+    ),
+) -> List[SimilarAssessmentResponse]:
+    matches = find_similar(
+        payload.model_dump(),
+        k=k,
+        risk_classes=HIGH_RISK_CLASSES if high_risk_only else None,
+    )
+    return [SimilarAssessmentResponse(**vars(match)) for match in matches]
+
+
+@app.get(
+    "/stats",
+    response_model=StatsResponse,
+    summary="KPI aggregati delle valutazioni (totali e andamento giornaliero)",
+    tags=["assessment"],
+    dependencies=[Depends(_require_sqlite)],
+)
+def assessment_stats(
+    company_name: Optional[str] = None,
+    days: int = Query(30, ge=0, le=366, description="Giorni con valutazioni da includere."),
+) -> StatsResponse:
+    """
+    Legge gli aggregati materializzati (app.aggregates): il costo non
+    dipende dal numero di valutazioni salvate.
+    """
+    totals = get_stats(company_name)
+    daily = get_daily_stats(days) if company_name is None and days else []
+    return StatsResponse(
+        totals=StatsBucket(**vars(totals)),
+        daily=[StatsBucket(**vars(bucket)) for bucket in daily],
+    )
+
+
+@app.get(
+    "/drift/alerts",
+    response_model=List[DriftAlertResponse],
+    summary="Aziende con punteggi in crescita su valutazioni successive",
+    tags=["assessment"],
+    dependencies=[Depends(_require_sqlite)],
+)
+def drift_alerts(
+    slope_threshold: float = Query(
+        DRIFT_SLOPE_THRESHOLD, description="Pendenza minima (punti per valutazione)."
+    ),
+    min_streak: int = Query(
+        DRIFT_MIN_STREAK, ge=1, description="Aumenti consecutivi minimi del punteggio."
+    ),
+    limit: int = Query(50, ge=1, le=1000),
+) -> List[DriftAlertResponse]:
+    alerts = get_drift_alerts(slope_threshold, min_streak, limit)
+    return [DriftAlertResponse(**vars(alert)) for alert in alerts]
+
+
+@app.post(
+    "/assess/batch",
+    response_class=StreamingResponse,
+    summary="Valuta in batch il rischio per più PMI (NDJSON in streaming)",
+    tags=["assessment"],
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": (
+                "Un AssessmentResponse per riga, nello stesso ordine dell'input. "
+                "Gli elementi non validi producono una riga {index, errors}."
+            ),
+        }
+    },
+)
+async def assess_risk_batch(
+    request: Request,
+    parallel: bool = Query(
+        True,
+        description="Distribuisce lo scoring su un pool di processi (tutti i core).",
+    ),
+) -> StreamingResponse:
+    """
+    Accetta un array JSON o uno stream NDJSON di AssessmentRequest e
+    restituisce gli AssessmentResponse in NDJSON man mano che vengono calcolati.
+    """
+    try:
+        items = await open_batch(request.stream())
+    except BatchFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return StreamingResponse(
+        stream_batch_results(items, parallel=parallel),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get(
+    "/assess/{assessment_id}/report.pdf",
+    response_class=Response,
+    summary="Scarica il report PDF di una valutazione salvata",
+    tags=["assessment"],
+    responses={
+        200: {"content": {"application/pdf": {}}},
+        404: {"description": "Valutazione non trovata"},
+    },
+)
+async def assessment_report_pdf(assessment_id: int, request: Request) -> Response:
+    """
+    Serve il PDF dalla cache (indirizzata per contenuto) oppure lo renderizza
+    nel pool di processi. L'ETag è la chiave di cache: un client che ha già
+    il PDF riceve 304 senza alcun rendering.
+    """
+    row = await run_in_threadpool(get_assessment_report, assessment_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Valutazione non trovata")
+    company_name, report_text = row
+
+    etag = f'"{report_cache_key(company_name, report_text)}"'
+    headers = {
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="valutazione_{assessment_id}.pdf"',
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    pdf = await render_report_pdf(company_name, report_text)
+    return Response(content=pdf, media_type="application/pdf", headers=headers)
+
+
+@app.get(
+    "/assessments/export",
+    response_class=StreamingResponse,
+    summary="Esporta in blocco i report PDF delle valutazioni filtrate",
+    tags=["assessment"],
+    responses={
+        200: {"content": {"application/zip": {}, "application/pdf": {}}},
+        413: {"description": "Troppe valutazioni per il formato pdf (usare zip)"},
+    },
+)
+def export_assessment_reports(
+    format: Literal["zip", "pdf"] = Query(
+        "zip",
+        description=(
+            "zip: un PDF per valutazione; pdf: un unico PDF con segnalibri, "
+            f"al massimo {EXPORT_PDF_MAX_REPORTS} valutazioni."
+        ),
+    ),
+    company_name: Optional[str] = None,
+    risk_class: Optional[Literal["Low", "Medium", "High", "Critical"]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> StreamingResponse:
+    """
+    I PDF vengono generati nel pool di processi e inviati in streaming man
+    mano che sono pronti, senza tenere in memoria l'intero export. Il
+    formato pdf è limitato a EXPORT_PDF_MAX_REPORTS valutazioni (413 oltre).
+    """
+    try:
+        chunks = export_reports(
+            format,
+            company_name=company_name,
+            risk_class=risk_class,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except ExportTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    return StreamingResponse(
+        chunks,
+        media_type="application/zip" if format == "zip" else "application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="valutazioni.{format}"'},
     )
@@ -0,0 +1,296 @@
+# app/metrics.py
+
+"""
+Strumentazione dei percorsi caldi, esposta in formato Prometheus su /metrics.
+
+Si abilita con APP_METRICS=1. Da disabilitata il costo è nullo: i decoratori
+ritornano la funzione originale e i punti di misura sono saltati da un
+controllo su METRICS_ENABLED.
+
+Metriche raccolte:
+
+- app_scoring_seconds{function}: compute_risk, compute_risk_fast e le funzioni
+  _compute_* per dominio
+- app_validation_seconds{model}: validazione pydantic delle richieste
+- app_db_seconds{op}: scritture (per batch) e letture del DB
+- app_db_batch_rows: righe per batch dello scrittore
+- app_pdf_render_seconds{executor}: rendering dei PDF (thread o pool di processi)
+- app_pdf_cache_total{result}: richieste di PDF servite dalla cache (hit) o no (miss)
+- app_scoring_cache_total{result}: valutazioni servite dalla cache di compute_risk (hit) o no (miss)
+- app_http_request_seconds{method,route}: richieste HTTP
+- app_risk_class_total{risk_class}: distribuzione delle classi di rischio
+- app_rule_hits_total{rule,domain}: regole di scoring scattate (app.rules)
+
+Le metriche sono per processo: con più worker ogni processo espone le sue.
+"""
+
+import os
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .rules import RULES
+
+METRICS_ENABLED = os.environ.get("APP_METRICS", "0") == "1"
+
+# Limiti superiori (secondi) dei bucket degli istogrammi di latenza
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -------------------------------------------------
+# Tipi di metrica
+# -------------------------------------------------
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def inc_many(self, labelvalues_list: Iterable[Tuple[str, ...]]) -> None:
+        with self._lock:
+            values = self._values
+            for labelvalues in labelvalues_list:
+                values[labelvalues] = values.get(labelvalues, 0) + 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labelvalues -> [conteggi per bucket (non cumulativi)..., somma, conteggio]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        buckets = self.buckets
+        # Ricerca lineare: i bucket sono pochi e i valori tipici cadono nei primi
+        index = 0
+        while index < len(buckets) and value > buckets[index]:
+            index += 1
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        return _Timer(self, labelvalues)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {series[-2]:.9g}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labelvalues", "_start")
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple[str, ...]):
+        self._histogram = histogram
+        self._labelvalues = labelvalues
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, *self._labelvalues)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+# -------------------------------------------------
+# Registro
+# -------------------------------------------------
+
+SCORING_SECONDS = Histogram(
+    "app_scoring_seconds", "Durata delle funzioni di scoring.", ("function",)
+)
+VALIDATION_SECONDS = Histogram(
+    "app_validation_seconds", "Durata della validazione delle richieste.", ("model",)
+)
+DB_SECONDS = Histogram("app_db_seconds", "Durata delle operazioni sul DB.", ("op",))
+DB_BATCH_ROWS = Histogram(
+    "app_db_batch_rows",
+    "Valutazioni scritte per transazione dallo scrittore.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+PDF_RENDER_SECONDS = Histogram(
+    "app_pdf_render_seconds", "Durata del rendering dei PDF.", ("executor",)
+)
+PDF_CACHE_TOTAL = Counter(
+    "app_pdf_cache_total", "Richieste di PDF per esito della cache.", ("result",)
+)
+SCORING_CACHE_TOTAL = Counter(
+    "app_scoring_cache_total", "Valutazioni per esito della cache di compute_risk.", ("result",)
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "app_http_request_seconds", "Durata delle richieste HTTP.", ("method", "route")
+)
+RISK_CLASS_TOTAL = Counter(
+    "app_risk_class_total", "Valutazioni per classe di rischio.", ("risk_class",)
+)
+RULE_HITS_TOTAL = Counter(
+    "app_rule_hits_total", "Regole di scoring scattate.", ("rule", "domain")
+)
+
+REGISTRY = (
+    SCORING_SECONDS,
+    VALIDATION_SECONDS,
+    DB_SECONDS,
+    DB_BATCH_ROWS,
+    PDF_RENDER_SECONDS,
+    PDF_CACHE_TOTAL,
+    SCORING_CACHE_TOTAL,
+    HTTP_REQUEST_SECONDS,
+    RISK_CLASS_TOTAL,
+    RULE_HITS_TOTAL,
+)
+
+
+def render_metrics() -> str:
+    """Tutte le metriche nel formato di esposizione testuale di Prometheus."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def timer(histogram: Histogram, *labelvalues: str):
+    """Context manager che misura il blocco (nullo se le metriche sono disabilitate)."""
+    if not METRICS_ENABLED:
+        return NULL_TIMER
+    return _Timer(histogram, labelvalues)
+
+
+def timed(histogram: Histogram, *labelvalues: str) -> Callable[[Callable], Callable]:
+    """
+    Decoratore che misura ogni chiamata. Con le metriche disabilitate ritorna
+    la funzione originale, senza alcun involucro.
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *labelvalues)
+
+        return wrapper
+
+    return decorate
+
+
+def timed_validation(cls: type, data: Any, handler: Callable[[Any], Any]) -> Any:
+    """Validatore pydantic "wrap" che misura la validazione del modello."""
+    start = time.perf_counter()
+    try:
+        return handler(data)
+    finally:
+        VALIDATION_SECONDS.observe(time.perf_counter() - start, cls.__name__)
+
+
+# -------------------------------------------------
+# Scoring: classi di rischio e regole
+# -------------------------------------------------
+
+# Etichette (rule, domain) per codice di regola
+_RULE_LABELS: Dict[int, Tuple[str, str]] = {
+    rule.code: (str(rule.code), rule.domain) for rule in RULES
+}
+
+
+def record_scoring(result: Any) -> None:
+    """Conta classe di rischio e regole scattate di un RiskResult (anche dalla cache)."""
+    RISK_CLASS_TOTAL.inc(result.risk_class)
+    RULE_HITS_TOTAL.inc_many(_RULE_LABELS[code] for code in result.rule_codes)
+
+
+def instrument_compute_risk(fn: Callable) -> Callable:
+    """
+    Decoratore per compute_risk: durata, classe di rischio e regole scattate.
+    Con le metriche disabilitate ritorna la funzione originale.
+    """
+    if not METRICS_ENABLED:
+        return fn
+
+    @wraps(fn)
+    def wrapper(answers: Dict[str, Any]):
+        start = time.perf_counter()
+        result = fn(answers)
+        SCORING_SECONDS.observe(time.perf_counter() - start, "compute_risk")
+        record_scoring(result)
+        return result
+
+    return wrapper
+
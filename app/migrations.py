@@ -0,0 +1,585 @@
+# app/migrations.py
+
+"""
+Migrazioni versionate dello schema SQLite.
+
+Ogni migrazione ha un numero di versione crescente e una funzione che
+applica le modifiche allo schema (tabelle, colonne, indici). Le versioni
+applicate sono registrate nella tabella schema_migrations, quindi migrate()
+si può chiamare a ogni avvio: applica solo quelle mancanti, ognuna nella
+propria transazione insieme alla riga che la registra.
+
+Una migrazione può avere anche un backfill, cioè un aggiornamento dei dati
+esistenti. Il backfill non gira nella transazione dello schema: procede per
+intervalli di id, con una transazione breve per ogni batch, e salva il punto
+raggiunto in schema_backfills. In questo modo una tabella grande si migra
+senza tenere il lock di scrittura per minuti, e un backfill interrotto
+riprende da dove si era fermato.
+
+Stato e applicazione manuale:
+
+    python -m app.migrations status
+    python -m app.migrations migrate
+
+Compattazione dei report (per APP_STORE_REPORT_TEXT=0: svuota report_text
+delle righe che hanno i codici dei motivi, poi VACUUM e confronto delle
+dimensioni del file):
+
+    python -m app.migrations compact-reports
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .aggregates import backfill_aggregates
+from .answers import INSERT_ANSWERS_SQL, encode_answers
+from .drift import backfill_company_drift
+from .rules import pack_reason_codes
+from .scoring import parse_report_reason_codes
+
+# Righe aggiornate per transazione durante un backfill
+BACKFILL_BATCH_SIZE = 2000
+
+# Pausa (secondi) tra un batch e l'altro, per lasciare spazio agli scrittori
+BACKFILL_PAUSE = 0.0
+
+
+class MigrationError(RuntimeError):
+    """Lo schema del database non è compatibile con questa versione dell'app."""
+
+
+# Applica un batch di backfill alle righe con id in [first_id, last_id]
+BackfillStep = Callable[[sqlite3.Connection, int, int], None]
+
+
+@dataclass(frozen=True)
+class Backfill:
+    """Aggiornamento dei dati esistenti, eseguito a batch per intervalli di id."""
+
+    table: str
+    step: BackfillStep
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+    backfill: Optional[Backfill] = None
+
+
+def sql_backfill(table: str, sql: str) -> Backfill:
+    """
+    Backfill espresso come singola istruzione SQL con i parametri
+    :first_id e :last_id (estremi inclusi dell'intervallo di id).
+    """
+
+    def step(conn: sqlite3.Connection, first_id: int, last_id: int) -> None:
+        conn.execute(sql, {"first_id": first_id, "last_id": last_id})
+
+    return Backfill(table, step)
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# -------------------------------------------------
+# Migrazioni
+# -------------------------------------------------
+
+
+def _create_assessments(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS assessments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            company_name TEXT,
+            final_score REAL NOT NULL,
+            risk_class TEXT NOT NULL,
+            ai_risk REAL NOT NULL,
+            gdpr_risk REAL NOT NULL,
+            operational_risk REAL NOT NULL,
+            urgency_risk REAL NOT NULL,
+            answers_json TEXT NOT NULL,
+            report_text TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _add_created_ts(conn: sqlite3.Connection) -> None:
+    # I database aggiornati da init_db prima delle migrazioni hanno già la colonna
+    if "created_ts" not in _columns(conn, "assessments"):
+        conn.execute("ALTER TABLE assessments ADD COLUMN created_ts INTEGER")
+
+    # Ordinamento per data (con id come spareggio) e filtri dello storico
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_assessments_created "
+        "ON assessments (created_ts)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_assessments_company "
+        "ON assessments (company_name, created_ts)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_assessments_risk_class "
+        "ON assessments (risk_class, created_ts)"
+    )
+
+
+# Colonne di assessment_answers alla versione 3 (i campi aggiunti in seguito
+# al vocabolario richiedono una nuova migrazione con ALTER TABLE)
+_ANSWER_COLUMNS_V3 = (
+    "company_size",
+    "geography",
+    "uses_ai",
+    "ai_affects_individuals",
+    "human_oversight",
+    "ai_usage_clarity",
+    "processes_personal_data",
+    "processes_sensitive_data",
+    "data_location",
+    "third_party_access",
+    "users_informed_ai",
+    "ai_documentation",
+    "policies",
+    "risk_assessments",
+    "incident_response",
+    "ai_training_done",
+    "ai_act_plan_status",
+    "decision_criticality",
+    "reg_issue_impact",
+    "pim_ai_transparency",
+    "pim_ai_supervision_level",
+    "pim_third_party_models",
+    "pim_copyright_policy",
+    "pim_ai_impact",
+    "ai_use_cases",
+    "upcoming_changes",
+    "pim_ai_features",
+    "pim_training_data_source",
+)
+
+
+def _create_assessment_answers(conn: sqlite3.Connection) -> None:
+    columns = ",\n".join(f"            {name} INTEGER" for name in _ANSWER_COLUMNS_V3)
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS assessment_answers (
+            assessment_id INTEGER PRIMARY KEY,
+{columns},
+            extra_json TEXT
+        )
+        """
+    )
+
+
+def _backfill_assessment_answers(conn: sqlite3.Connection, first_id: int, last_id: int) -> None:
+    rows = conn.execute(
+        """
+        SELECT a.id, a.answers_json
+        FROM assessments a
+        LEFT JOIN assessment_answers n ON n.assessment_id = a.id
+        WHERE a.id BETWEEN ? AND ? AND n.assessment_id IS NULL
+        """,
+        (first_id, last_id),
+    ).fetchall()
+    normalized = []
+    for row_id, answers_json in rows:
+        codes, extra_json = encode_answers(json.loads(answers_json))
+        normalized.append((row_id, *codes, extra_json))
+    conn.executemany(INSERT_ANSWERS_SQL, normalized)
+
+
+# Metriche seguite da company_drift alla versione 4
+_DRIFT_METRICS_V4 = (
+    "final_score",
+    "ai_risk",
+    "gdpr_risk",
+    "operational_risk",
+    "urgency_risk",
+)
+
+
+def _create_company_drift(conn: sqlite3.Connection) -> None:
+    columns = ",\n".join(
+        f"            {prefix}_{metric} REAL NOT NULL"
+        for prefix in ("last", "ewma", "slope")
+        for metric in _DRIFT_METRICS_V4
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS company_drift (
+            company_name TEXT PRIMARY KEY,
+            assessments INTEGER NOT NULL,
+            last_assessment_id INTEGER NOT NULL,
+            last_ts INTEGER,
+            rising_streak INTEGER NOT NULL,
+{columns}
+        )
+        """
+    )
+
+
+def _create_agg_stats(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agg_stats (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            assessments INTEGER NOT NULL,
+            sum_final_score REAL NOT NULL,
+            sum_ai_risk REAL NOT NULL,
+            sum_gdpr_risk REAL NOT NULL,
+            sum_operational_risk REAL NOT NULL,
+            sum_urgency_risk REAL NOT NULL,
+            n_low INTEGER NOT NULL,
+            n_medium INTEGER NOT NULL,
+            n_high INTEGER NOT NULL,
+            n_critical INTEGER NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _add_reason_codes(conn: sqlite3.Connection) -> None:
+    # Codici dei motivi (app.rules), un byte per codice
+    if "reason_codes" not in _columns(conn, "assessments"):
+        conn.execute("ALTER TABLE assessments ADD COLUMN reason_codes BLOB")
+
+
+def _backfill_reason_codes(conn: sqlite3.Connection, first_id: int, last_id: int) -> None:
+    # I codici si ricavano dai motivi nel report salvato; le righe con motivi
+    # fuori catalogo restano NULL (il loro report_text resta l'unica fonte)
+    rows = conn.execute(
+        "SELECT id, report_text FROM assessments "
+        "WHERE id BETWEEN ? AND ? AND reason_codes IS NULL",
+        (first_id, last_id),
+    ).fetchall()
+    updates = []
+    for row_id, report_text in rows:
+        codes = parse_report_reason_codes(report_text)
+        if codes is not None:
+            updates.append((pack_reason_codes(codes), row_id))
+    conn.executemany("UPDATE assessments SET reason_codes = ? WHERE id = ?", updates)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create assessments", _create_assessments),
+    Migration(
+        2,
+        "assessments.created_ts + indici storico",
+        _add_created_ts,
+        sql_backfill(
+            "assessments",
+            "UPDATE assessments "
+            "SET created_ts = CAST(strftime('%s', created_at) AS INTEGER) "
+            "WHERE id BETWEEN :first_id AND :last_id AND created_ts IS NULL",
+        ),
+    ),
+    Migration(
+        3,
+        "assessment_answers (risposte normalizzate)",
+        _create_assessment_answers,
+        Backfill("assessments", _backfill_assessment_answers),
+    ),
+    Migration(
+        4,
+        "company_drift (stato incrementale del drift per azienda)",
+        _create_company_drift,
+        # Rigioca lo storico in ordine di id: i batch del backfill sono
+        # crescenti, quindi ogni azienda vede le sue valutazioni in sequenza
+        Backfill("assessments", backfill_company_drift),
+    ),
+    Migration(
+        5,
+        "agg_stats (aggregati per KPI e /stats)",
+        _create_agg_stats,
+        Backfill("assessments", backfill_aggregates),
+    ),
+    Migration(
+        6,
+        "assessments.reason_codes (codici dei motivi)",
+        _add_reason_codes,
+        Backfill("assessments", _backfill_reason_codes),
+    ),
+]
+
+
+# -------------------------------------------------
+# Esecuzione
+# -------------------------------------------------
+
+
+def _ensure_state_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_backfills (
+            version INTEGER PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            completed_at TEXT,
+            upto_id INTEGER
+        )
+        """
+    )
+    if "upto_id" not in _columns(conn, "schema_backfills"):
+        conn.execute("ALTER TABLE schema_backfills ADD COLUMN upto_id INTEGER")
+    conn.commit()
+
+
+def _has_table(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def applied_versions(conn: sqlite3.Connection) -> Dict[int, str]:
+    """Versioni già applicate (versione -> data di applicazione)."""
+    if not _has_table(conn, "schema_migrations"):
+        return {}
+    return dict(conn.execute("SELECT version, applied_at FROM schema_migrations"))
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return max(applied_versions(conn), default=0)
+
+
+def _apply(conn: sqlite3.Connection, migration: Migration) -> bool:
+    # BEGIN IMMEDIATE prende subito il lock di scrittura: se più processi
+    # partono insieme, solo uno applica la migrazione e gli altri, una volta
+    # ottenuto il lock, la trovano già registrata.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        already = conn.execute(
+            "SELECT 1 FROM schema_migrations WHERE version = ?",
+            (migration.version,),
+        ).fetchone()
+        if already:
+            conn.rollback()
+            return False
+        migration.apply(conn)
+        conn.execute(
+            "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+            (migration.version, migration.name, datetime.now().replace(microsecond=0).isoformat()),
+        )
+        if migration.backfill is not None:
+            # Le righe scritte da qui in poi sono già gestite dal codice nuovo:
+            # il backfill copre solo quelle presenti ora (con il lock preso)
+            conn.execute(
+                "INSERT OR IGNORE INTO schema_backfills (version, last_id, upto_id) "
+                f"SELECT ?, 0, COALESCE(MAX(id), 0) FROM {migration.backfill.table}",
+                (migration.version,),
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return True
+
+
+def run_backfill(
+    conn: sqlite3.Connection,
+    migration: Migration,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE,
+) -> int:
+    """
+    Esegue (o riprende) il backfill di una migrazione, un batch di id per
+    transazione. Le righe inserite dopo la migrazione sono già nel formato
+    nuovo, quindi il backfill si ferma all'id massimo registrato quando la
+    migrazione è stata applicata (o, per i backfill registrati prima di
+    upto_id, all'id massimo letto all'inizio). Questo conta per i backfill
+    non idempotenti, come gli stati incrementali (drift, aggregati), che
+    altrimenti conterebbero due volte le righe già applicate dallo scrittore.
+    Ritorna il numero di batch eseguiti.
+    """
+    backfill = migration.backfill
+    if backfill is None:
+        return 0
+    state = conn.execute(
+        "SELECT last_id, completed_at, upto_id FROM schema_backfills WHERE version = ?",
+        (migration.version,),
+    ).fetchone()
+    if state is None or state[1] is not None:
+        return 0
+
+    last_done = state[0]
+    max_id = state[2]
+    if max_id is None:
+        max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {backfill.table}").fetchone()[0]
+    batches = 0
+    while last_done < max_id:
+        upper = min(last_done + batch_size, max_id)
+        with conn:
+            backfill.step(conn, last_done + 1, upper)
+            conn.execute(
+                "UPDATE schema_backfills SET last_id = ? WHERE version = ?",
+                (upper, migration.version),
+            )
+        last_done = upper
+        batches += 1
+        if pause:
+            time.sleep(pause)
+
+    with conn:
+        conn.execute(
+            "UPDATE schema_backfills SET completed_at = ? WHERE version = ?",
+            (datetime.now().replace(microsecond=0).isoformat(), migration.version),
+        )
+    return batches
+
+
+def pending_backfills(conn: sqlite3.Connection) -> List[int]:
+    """Versioni con un backfill non ancora completato."""
+    if not _has_table(conn, "schema_backfills"):
+        return []
+    return [
+        row[0]
+        for row in conn.execute(
+            "SELECT version FROM schema_backfills WHERE completed_at IS NULL ORDER BY version"
+        )
+    ]
+
+
+def migrate(
+    conn: sqlite3.Connection,
+    backfill: bool = True,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE,
+) -> List[int]:
+    """
+    Porta il database all'ultima versione dello schema.
+
+    Applica in ordine le migrazioni mancanti e, se backfill è True, esegue
+    i backfill rimasti in sospeso (anche quelli di un avvio precedente
+    interrotto). Con backfill=False i backfill restano da completare con
+    run_pending_backfills(), ad esempio da un thread in background.
+    Ritorna le versioni applicate in questa chiamata.
+    """
+    _ensure_state_tables(conn)
+    known = max((m.version for m in MIGRATIONS), default=0)
+    if current_version(conn) > known:
+        raise MigrationError(
+            f"Il database è alla versione {current_version(conn)}, "
+            f"questa versione dell'app conosce fino alla {known}."
+        )
+
+    applied = [m.version for m in MIGRATIONS if _apply_if_missing(conn, m)]
+    if backfill:
+        run_pending_backfills(conn, batch_size=batch_size, pause=pause)
+    return applied
+
+
+def _apply_if_missing(conn: sqlite3.Connection, migration: Migration) -> bool:
+    if migration.version in applied_versions(conn):
+        return False
+    return _apply(conn, migration)
+
+
+def run_pending_backfills(
+    conn: sqlite3.Connection,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE,
+) -> int:
+    """Completa tutti i backfill in sospeso; ritorna i batch eseguiti."""
+    by_version = {m.version: m for m in MIGRATIONS}
+    return sum(
+        run_backfill(conn, by_version[version], batch_size=batch_size, pause=pause)
+        for version in pending_backfills(conn)
+    )
+
+
+# -------------------------------------------------
+# Compattazione dei report
+# -------------------------------------------------
+
+
+def _database_bytes(conn: sqlite3.Connection) -> int:
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def compact_reports(
+    conn: sqlite3.Connection,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE,
+    vacuum: bool = True,
+) -> Tuple[int, int, int]:
+    """
+    Svuota report_text delle valutazioni che hanno i codici dei motivi (il
+    report si rigenera da punteggi e codici), a batch di id come i backfill.
+    Le righe senza codici conservano il testo. Con vacuum=True ricostruisce
+    il file per restituire lo spazio liberato.
+
+    Ritorna (righe compattate, byte prima, byte dopo).
+    """
+    # I codici delle righe esistenti arrivano dal backfill della versione 6
+    migrate(conn, batch_size=batch_size, pause=pause)
+    size_before = _database_bytes(conn)
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM assessments").fetchone()[0]
+    compacted = 0
+    last_done = 0
+    while last_done < max_id:
+        upper = min(last_done + batch_size, max_id)
+        with conn:
+            compacted += conn.execute(
+                "UPDATE assessments SET report_text = '' "
+                "WHERE id BETWEEN ? AND ? AND reason_codes IS NOT NULL AND report_text != ''",
+                (last_done + 1, upper),
+            ).rowcount
+        last_done = upper
+        if pause:
+            time.sleep(pause)
+
+    if vacuum:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return compacted, size_before, _database_bytes(conn)
+
+
+if __name__ == "__main__":
+    from .db import get_connection
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    conn = get_connection()
+    try:
+        if command == "migrate":
+            applied = migrate(conn)
+            print(f"Migrazioni applicate: {applied or 'nessuna'}; versione {current_version(conn)}.")
+        elif command == "status":
+            applied_at = applied_versions(conn)
+            pending = set(pending_backfills(conn))
+            for migration in MIGRATIONS:
+                status = applied_at.get(migration.version, "da applicare")
+                if migration.version in pending:
+                    status += " (backfill in corso)"
+                print(f"{migration.version:>3}  {migration.name}: {status}")
+        elif command == "compact-reports":
+            compacted, before, after = compact_reports(conn)
+            saved = 1 - after / before if before else 0.0
+            print(
+                f"Report compattati: {compacted}; database da {before / 1024:.0f} KiB "
+                f"a {after / 1024:.0f} KiB (-{saved:.0%})."
+            )
+        else:
+            sys.exit("Uso: python -m app.migrations [status | migrate | compact-reports]")
+    finally:
+        conn.close()
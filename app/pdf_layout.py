@@ -0,0 +1,125 @@
+# app/pdf_layout.py
+
+"""
+Impaginazione del testo dei report PDF.
+
+Il testo viene spezzato in righe con un algoritmo greedy che somma le
+larghezze delle parole invece di rimisurare la riga intera a ogni parola, e
+le righe vengono distribuite sulle pagine prima di disegnare. Le larghezze
+sono in unità di glifo (millesimi della dimensione del font, interi per i
+font Type1 standard come Helvetica), memorizzate per parola: la larghezza di
+"riga + spazio + parola" è quindi la somma esatta delle parti e coincide con
+quella che ReportLab calcolerebbe sulla stringa intera.
+
+Il risultato (righe, a capo e posizioni) è identico a quello del ciclo
+originale di build_pdf_from_report, comprese le sue particolarità: i
+paragrafi vuoti non fanno avanzare la riga e i separatori multipli vengono
+compressi.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Parole diverse memorizzate per font (oltre la soglia la cache si azzera)
+WIDTH_CACHE_MAX_ENTRIES = 50_000
+
+
+@dataclass
+class FontMetrics:
+    """Larghezze (in unità di glifo) delle parole per un font, con cache."""
+
+    font_name: str
+    font_size: float
+    _units: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.space_units = self.units(" ")
+
+    def units(self, text: str) -> int:
+        cached = self._units.get(text)
+        if cached is None:
+            if len(self._units) >= WIDTH_CACHE_MAX_ENTRIES:
+                self._units.clear()
+            # Con size=1000 stringWidth ritorna proprio la somma delle unità
+            cached = self._units[text] = round(stringWidth(text, self.font_name, 1000))
+        return cached
+
+    def width(self, units: int) -> float:
+        # Stessa espressione di ReportLab (somma * 0.001 * size), così i
+        # confronti con la larghezza massima danno lo stesso esito
+        return units * 0.001 * self.font_size
+
+
+_metrics: Dict[Tuple[str, float], FontMetrics] = {}
+
+
+def get_metrics(font_name: str, font_size: float) -> FontMetrics:
+    """FontMetrics condivise per (font, dimensione)."""
+    metrics = _metrics.get((font_name, font_size))
+    if metrics is None:
+        metrics = _metrics[(font_name, font_size)] = FontMetrics(font_name, font_size)
+    return metrics
+
+
+def _is_trimmed(text: str) -> bool:
+    return not text or not (text[0].isspace() or text[-1].isspace())
+
+
+def wrap_text(text: str, metrics: FontMetrics, max_width: float) -> List[str]:
+    """
+    Spezza il testo in righe larghe al massimo max_width.
+
+    Ogni "\\n" inizia un nuovo paragrafo; le parole sono separate da spazi
+    singoli. Una parola più larga della riga resta intera (su una riga sua).
+    """
+    lines: List[str] = []
+    space = metrics.space_units
+    for paragraph in text.split("\n"):
+        line = ""
+        line_units = 0
+        for word in paragraph.split(" "):
+            if line and word and _is_trimmed(line) and _is_trimmed(word):
+                # Caso comune: la riga candidata è "riga parola"
+                test_units = line_units + space + metrics.units(word)
+                test_line = None
+            else:
+                # Riga vuota, parola vuota o spazi ai bordi: come l'originale,
+                # la riga candidata è la concatenazione ripulita con strip()
+                test_line = f"{line} {word}".strip()
+                test_units = metrics.units(test_line)
+
+            if metrics.width(test_units) <= max_width:
+                line = f"{line} {word}" if test_line is None else test_line
+                line_units = test_units
+            else:
+                lines.append(line)
+                line = word
+                line_units = metrics.units(word)
+        if line:
+            lines.append(line)
+    return lines
+
+
+def paginate(
+    lines: List[str],
+    first_y: float,
+    top_y: float,
+    bottom_y: float,
+    leading: float,
+) -> List[List[Tuple[float, str]]]:
+    """
+    Distribuisce le righe sulle pagine: ritorna, per ogni pagina, la lista
+    di (y, testo). La prima pagina parte da first_y (sotto l'intestazione),
+    le successive da top_y; si cambia pagina appena y scende sotto bottom_y.
+    """
+    pages: List[List[Tuple[float, str]]] = [[]]
+    y = first_y
+    for line in lines:
+        pages[-1].append((y, line))
+        y -= leading
+        if y < bottom_y:
+            pages.append([])
+            y = top_y
+    return pages
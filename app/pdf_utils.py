@@ -1,67 +1,91 @@
 # app/pdf_utils.py
 
 from io import BytesIO
+from typing import List, Tuple
+
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 
+from .pdf_layout import get_metrics, paginate, wrap_text
 
-def build_pdf_from_report(
-    company_name: str | None,
-    report_text: str,
-) -> bytes:
+# Da incrementare a ogni modifica dell'impaginazione: invalida i PDF in cache
+PDF_TEMPLATE_VERSION = 1
+
+
+# Margini, interlinea e font del corpo
+X_MARGIN = 20 * mm
+Y_MARGIN = 20 * mm
+LEADING = 5 * mm
+BODY_FONT = ("Helvetica", 10)
+
+# Righe del corpo, per pagina: lista di (y, testo)
+ReportPages = List[List[Tuple[float, str]]]
+
+
+def layout_report(company_name: str | None, report_text: str) -> ReportPages:
     """
-    Crea un PDF semplice a partire da un testo di report.
-    Ritorna i bytes del PDF da usare in un download button Streamlit.
+    Impagina il corpo del report (a capo e cambi pagina) senza disegnare.
+    La prima pagina parte sotto il titolo e l'eventuale nome azienda.
     """
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
+    y = height - Y_MARGIN - 12 * mm
+    if company_name:
+        y -= 10 * mm
+
+    metrics = get_metrics(*BODY_FONT)
+    lines = wrap_text(report_text, metrics, max_width=width - 2 * X_MARGIN)
+    return paginate(
+        lines,
+        first_y=y,
+        top_y=height - Y_MARGIN,
+        bottom_y=Y_MARGIN,
+        leading=LEADING,
+    )
 
-    # Margini
-    x_margin = 20 * mm
-    y_margin = 20 * mm
-    y = height - y_margin
+
+def draw_report(
+    c: canvas.Canvas,
+    company_name: str | None,
+    pages: ReportPages,
+) -> None:
+    """
+    Disegna un report già impaginato sul canvas, a partire dalla pagina
+    corrente. Non chiude l'ultima pagina (showPage resta al chiamante).
+    """
+    height = A4[1]
+    y = height - Y_MARGIN
 
     # Titolo
     c.setFont("Helvetica-Bold", 14)
     title = "Valutazione Rischi AI & Dati"
-    c.drawString(x_margin, y, title)
-    y -= 12 * mm
+    c.drawString(X_MARGIN, y, title)
 
     # Eventuale nome azienda
     if company_name:
         c.setFont("Helvetica", 11)
-        c.drawString(x_margin, y, f"Azienda: {company_name}")
-        y -= 10 * mm
+        c.drawString(X_MARGIN, y - 12 * mm, f"Azienda: {company_name}")
+
+    c.setFont(*BODY_FONT)
+    for page_index, page in enumerate(pages):
+        if page_index:
+            c.showPage()
+            c.setFont(*BODY_FONT)
+        for line_y, line in page:
+            c.drawString(X_MARGIN, line_y, line)
 
-    # Corpo del report, gestendo il ritorno a capo
-    c.setFont("Helvetica", 10)
-    max_width = width - 2 * x_margin
-    for paragraph in report_text.split("\n"):
-        # Spezza la riga se troppo lunga
-        words = paragraph.split(" ")
-        line = ""
-        for word in words:
-            test_line = f"{line} {word}".strip()
-            if c.stringWidth(test_line, "Helvetica", 10) <= max_width:
-                line = test_line
-            else:
-                c.drawString(x_margin, y, line)
-                y -= 5 * mm
-                line = word
-                if y < y_margin:
-                    c.showPage()
-                    y = height - y_margin
-                    c.setFont("Helvetica", 10)
-        if line:
-            c.drawString(x_margin, y, line)
-            y -= 5 * mm
-            if y < y_margin:
-                c.showPage()
-                y = height - y_margin
-                c.setFont("Helvetica", 10)
 
+def build_pdf_from_report(
+    company_name: str | None,
+    report_text: str,
+) -> bytes:
+    """
+    Crea un PDF semplice a partire da un testo di report.
+    Ritorna i bytes del PDF da usare in un download button Streamlit.
+    """
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    draw_report(c, company_name, layout_report(company_name, report_text))
     c.showPage()
     c.save()
     pdf_bytes = buffer.getvalue()
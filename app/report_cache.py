@@ -0,0 +1,156 @@
+# app/report_cache.py
+
+"""
+Cache dei PDF di report, indirizzata per contenuto.
+
+La chiave è lo SHA-256 di (versione del template, nome azienda, testo del
+report): due valutazioni con lo stesso report producono lo stesso PDF, che
+viene quindi renderizzato una sola volta. I PDF restano in un LRU in memoria
+(limitato in byte) e, se APP_PDF_CACHE_DIR è impostata, anche su disco, così
+da sopravvivere ai riavvii ed essere condivisi tra processi.
+
+Lato API il rendering avviene nel pool di processi (render_report_pdf), così
+ReportLab non blocca l'event loop; richieste concorrenti per lo stesso PDF
+attendono un unico rendering.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from .metrics import METRICS_ENABLED, PDF_CACHE_TOTAL, PDF_RENDER_SECONDS, timer
+from .pdf_utils import PDF_TEMPLATE_VERSION, build_pdf_from_report
+from .workers import submit_to_pool
+
+# Byte massimi dei PDF tenuti in memoria
+PDF_CACHE_MAX_BYTES = int(os.environ.get("APP_PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Cartella della cache su disco (disattivata se vuota)
+PDF_CACHE_DIR = os.environ.get("APP_PDF_CACHE_DIR", "")
+
+
+def report_cache_key(company_name: Optional[str], report_text: str) -> str:
+    """Chiave di cache (hex SHA-256) del PDF di un report."""
+    payload = json.dumps(
+        [PDF_TEMPLATE_VERSION, company_name, report_text],
+        ensure_ascii=False,
+    ).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class PdfCache:
+    """LRU in memoria (limitato in byte) con eventuale copia su disco."""
+
+    def __init__(self, max_bytes: int = PDF_CACHE_MAX_BYTES, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is not None:
+                self._entries.move_to_end(key)
+                return pdf
+        if self.directory is None:
+            return None
+        try:
+            pdf = self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        self._remember(key, pdf)
+        return pdf
+
+    def put(self, key: str, pdf: bytes) -> None:
+        self._remember(key, pdf)
+        if self.directory is not None:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Scrittura atomica: un lettore concorrente non vede mai un file a metà
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(pdf)
+            os.replace(tmp, path)
+
+    def _remember(self, key: str, pdf: bytes) -> None:
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = pdf
+            self._size += len(pdf)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        """Svuota la cache in memoria (i file su disco restano)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+pdf_cache = PdfCache(directory=PDF_CACHE_DIR or None)
+
+
+def get_report_pdf(company_name: Optional[str], report_text: str) -> bytes:
+    """PDF del report dalla cache, renderizzato nel thread corrente se manca."""
+    key = report_cache_key(company_name, report_text)
+    pdf = pdf_cache.get(key)
+    if METRICS_ENABLED:
+        PDF_CACHE_TOTAL.inc("miss" if pdf is None else "hit")
+    if pdf is None:
+        with timer(PDF_RENDER_SECONDS, "thread"):
+            pdf = build_pdf_from_report(company_name=company_name, report_text=report_text)
+        pdf_cache.put(key, pdf)
+    return pdf
+
+
+_inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+
+
+def _store_rendered(key: str, started: float, future: "asyncio.Future[bytes]") -> None:
+    _inflight.pop(key, None)
+    if not future.cancelled() and future.exception() is None:
+        pdf_cache.put(key, future.result())
+        if METRICS_ENABLED:
+            PDF_RENDER_SECONDS.observe(time.perf_counter() - started, "process_pool")
+
+
+async def render_report_pdf(company_name: Optional[str], report_text: str) -> bytes:
+    """
+    Versione asincrona di get_report_pdf: in caso di miss il rendering gira
+    nel pool di processi e le richieste concorrenti per la stessa chiave
+    condividono lo stesso rendering (che prosegue anche se il client che
+    l'ha avviato si disconnette).
+    """
+    key = report_cache_key(company_name, report_text)
+    pdf = pdf_cache.get(key)
+    if METRICS_ENABLED:
+        PDF_CACHE_TOTAL.inc("miss" if pdf is None else "hit")
+    if pdf is not None:
+        return pdf
+
+    pending = _inflight.get(key)
+    if pending is None:
+        started = time.perf_counter()
+        pending = asyncio.wrap_future(
+            submit_to_pool(build_pdf_from_report, company_name, report_text)
+        )
+        _inflight[key] = pending
+        pending.add_done_callback(lambda future: _store_rendered(key, started, future))
+    return await asyncio.shield(pending)
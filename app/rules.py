@@ -0,0 +1,311 @@
+# app/rules.py
+
+"""
+Regole di scoring espresse come dati.
+
+Ogni regola ha la forma "il campo X ha valore Y → aggiungi N punti al dominio
+D ed emetti il motivo R". L'ordine della tabella RULES è lo stesso in cui
+compute_risk valuta le condizioni (e quindi l'ordine dei motivi nel report).
+
+Il modulo definisce anche la codifica compatta delle risposte usata dai motori
+vettoriali: un intero piccolo per ogni campo a scelta singola (0 = assente o
+valore sconosciuto, i+1 = i-esimo valore ammesso) e una bitmask per ogni campo
+a scelta multipla (bit i = i-esimo valore, ultimo bit = valori sconosciuti).
+"""
+
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config_pmi import PMI_AI_FEATURES, PMI_TRAINING_SOURCES, PMI_THIRD_PARTY_MODELS
+
+
+# -------------------------------------------------------------------
+#  Vocabolario delle risposte
+# -------------------------------------------------------------------
+
+# Campi a scelta singola -> valori ammessi (l'ordine definisce i codici)
+FIELD_VALUES: Dict[str, Tuple[str, ...]] = {
+    "company_size": ("1_5", "6_20", "21_50", "51_100", "100_plus"),
+    "geography": ("single_eu", "multi_eu", "eu_plus_third_countries"),
+    "uses_ai": ("yes", "no"),
+    "ai_affects_individuals": ("none", "support", "direct"),
+    "human_oversight": ("always", "sometimes", "none"),
+    "ai_usage_clarity": ("clear", "unknown"),
+    "processes_personal_data": ("yes", "no"),
+    "processes_sensitive_data": ("yes", "no", "unknown"),
+    "data_location": ("eu_only", "eu_plus_third_countries", "unknown"),
+    "third_party_access": ("yes", "no"),
+    "users_informed_ai": ("yes", "partial", "no", "not_applicable"),
+    "ai_documentation": ("full", "partial", "none"),
+    "policies": ("full", "in_progress", "none"),
+    "risk_assessments": ("regular", "occasional", "none"),
+    "incident_response": ("full", "partial", "none"),
+    "ai_training_done": ("yes", "planned", "no"),
+    "ai_act_plan_status": ("structured", "informal", "none"),
+    "decision_criticality": ("low", "medium", "high"),
+    "reg_issue_impact": ("low", "medium", "high"),
+    "pim_ai_transparency": ("yes", "partial", "no"),
+    "pim_ai_supervision_level": ("strong", "limited", "none"),
+    "pim_third_party_models": tuple(PMI_THIRD_PARTY_MODELS),
+    "pim_copyright_policy": ("full", "partial", "none"),
+    "pim_ai_impact": ("low", "medium", "high"),
+}
+
+# Campi a scelta multipla -> valori ammessi (l'ordine definisce i bit)
+MULTI_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "ai_use_cases": ("chatbot", "marketing", "scoring", "hr", "fraud", "analytics"),
+    "upcoming_changes": ("new_ai_feature", "new_countries", "new_integrations"),
+    "pim_ai_features": tuple(PMI_AI_FEATURES),
+    "pim_training_data_source": tuple(PMI_TRAINING_SOURCES) + ("unknown",),
+}
+
+_VALUE_CODES: Dict[str, Dict[str, int]] = {
+    field: {value: i + 1 for i, value in enumerate(values)}
+    for field, values in FIELD_VALUES.items()
+}
+
+_VALUE_BITS: Dict[str, Dict[str, int]] = {
+    field: {value: 1 << i for i, value in enumerate(values)}
+    for field, values in MULTI_FIELDS.items()
+}
+
+
+def field_cardinality(field: str) -> int:
+    """Numero di codici possibili per il campo (incluso lo 0 / bit "altro")."""
+    if field in MULTI_FIELDS:
+        return 1 << (len(MULTI_FIELDS[field]) + 1)
+    return len(FIELD_VALUES[field]) + 1
+
+
+def encode_value(field: str, value: Any) -> int:
+    """Codice di un campo a scelta singola (0 se assente o sconosciuto)."""
+    return _VALUE_CODES[field].get(value, 0)
+
+
+def encode_multi(field: str, values: Optional[Iterable[Any]]) -> int:
+    """Bitmask di un campo a scelta multipla."""
+    bits = _VALUE_BITS[field]
+    other = 1 << len(bits)
+    mask = 0
+    for value in values or ():
+        mask |= bits.get(value, other)
+    return mask
+
+
+def decode_value(field: str, code: int) -> Optional[str]:
+    """Inverso di encode_value (None per il codice 0)."""
+    return FIELD_VALUES[field][code - 1] if code else None
+
+
+def decode_multi(field: str, mask: int) -> List[str]:
+    """Inverso di encode_multi (i valori sconosciuti non sono ricostruibili)."""
+    return [value for value, bit in _VALUE_BITS[field].items() if mask & bit]
+
+
+def random_answers(rng: random.Random, missing_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Genera un questionario casuale nel vocabolario ammesso (usato dalle
+    verifiche di equivalenza). Con missing_rate > 0 alcuni campi vengono
+    omessi, per coprire anche il codice 0.
+    """
+    answers: Dict[str, Any] = {}
+    for field, values in FIELD_VALUES.items():
+        if rng.random() >= missing_rate:
+            answers[field] = rng.choice(values)
+    for field, values in MULTI_FIELDS.items():
+        if rng.random() >= missing_rate:
+            answers[field] = [v for v in values if rng.random() < 0.5]
+    return answers
+
+
+# -------------------------------------------------------------------
+#  Regole
+# -------------------------------------------------------------------
+
+# Valore speciale per i campi multipli: "almeno un valore selezionato"
+ANY = "*"
+
+# Condizioni che abilitano interi gruppi di regole
+GATES: Dict[str, Tuple[str, str]] = {
+    "uses_ai": ("uses_ai", "yes"),
+    "personal_data": ("processes_personal_data", "yes"),
+    "pim": ("pim_ai_features", ANY),
+}
+
+DOMAINS: Tuple[str, ...] = ("ai", "gdpr", "operational", "urgency")
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Una regola di scoring (il codice è stabile e non va rinumerato)."""
+
+    code: int
+    domain: str
+    gate: Optional[str]
+    field: str
+    values: Tuple[str, ...]
+    points: float
+    reason: Optional[str]
+
+    def matches_code(self, code: int) -> bool:
+        """Verifica la regola sul codice (o bitmask) del proprio campo."""
+        if self.field in MULTI_FIELDS:
+            if self.values == (ANY,):
+                return code != 0
+            bits = _VALUE_BITS[self.field]
+            return any(code & bits[v] for v in self.values)
+        return code != 0 and FIELD_VALUES[self.field][code - 1] in self.values
+
+
+RULES: Tuple[Rule, ...] = (
+    # --- AI Act (base) ---
+    Rule(1, "ai", "uses_ai", "uses_ai", ("yes",), 20,
+         "L'azienda utilizza sistemi di AI o automazione sui dati."),
+    Rule(2, "ai", "uses_ai", "ai_affects_individuals", ("direct",), 25,
+         "Le decisioni di AI influenzano direttamente gli individui."),
+    Rule(3, "ai", "uses_ai", "ai_affects_individuals", ("support",), 15,
+         "L'AI supporta decisioni su persone."),
+    Rule(4, "ai", "uses_ai", "ai_use_cases", ("hr",), 20,
+         "L'AI è usata in ambito HR / selezione del personale."),
+    Rule(5, "ai", "uses_ai", "ai_use_cases", ("scoring",), 15,
+         "L'AI è usata per scoring, ranking o raccomandazioni."),
+    Rule(6, "ai", "uses_ai", "human_oversight", ("none",), 20,
+         "Manca una supervisione umana significativa sulle decisioni di AI."),
+    Rule(7, "ai", "uses_ai", "human_oversight", ("sometimes",), 10,
+         "La supervisione umana sulle decisioni di AI è solo parziale."),
+    Rule(8, "ai", "uses_ai", "ai_usage_clarity", ("unknown",), 10,
+         "Non è chiaro come e dove viene usata l'AI nei processi aziendali."),
+    # --- AI Act (PIM + AI) ---
+    Rule(9, "ai", "pim", "pim_ai_features", (ANY,), 5, None),
+    Rule(10, "ai", "pim", "pim_ai_features", ("dynamic_pricing", "categorization"), 15,
+         "Il PIM utilizza AI per decisioni automatizzate su prezzi o categorizzazione prodotti."),
+    Rule(11, "ai", "pim", "pim_ai_transparency", ("partial",), 10,
+         "La trasparenza sui contenuti generati da AI nel PIM è solo parziale."),
+    Rule(12, "ai", "pim", "pim_ai_transparency", ("no",), 20,
+         "Manca trasparenza sui contenuti generati da AI nel PIM, in potenziale contrasto con i requisiti di trasparenza."),
+    Rule(13, "ai", "pim", "pim_ai_supervision_level", ("none",), 20,
+         "Le decisioni automatizzate del PIM non sono sottoposte a supervisione umana."),
+    Rule(14, "ai", "pim", "pim_ai_supervision_level", ("limited",), 10,
+         "La supervisione umana sulle decisioni AI del PIM è limitata."),
+    Rule(15, "ai", "pim", "pim_third_party_models", ("extensive",), 10,
+         "Uso estensivo di modelli AI di terze parti nel PIM (es. GPAI via API)."),
+    Rule(16, "ai", "pim", "pim_third_party_models", ("some",), 5,
+         "Uso di modelli AI di terze parti nel PIM per alcune funzionalità."),
+    # --- GDPR / dati (base) ---
+    Rule(17, "gdpr", "personal_data", "processes_personal_data", ("yes",), 20,
+         "L'azienda tratta dati personali dei clienti o dipendenti."),
+    Rule(18, "gdpr", "personal_data", "processes_sensitive_data", ("yes",), 30,
+         "L'azienda tratta dati sensibili (es. salute, finanza, minori)."),
+    Rule(19, "gdpr", "personal_data", "processes_sensitive_data", ("unknown",), 10,
+         "Non è chiaro se vengono trattati dati sensibili."),
+    Rule(20, "gdpr", "personal_data", "data_location", ("eu_plus_third_countries",), 20,
+         "I dati vengono trasferiti anche fuori dall'UE."),
+    Rule(21, "gdpr", "personal_data", "data_location", ("unknown",), 10,
+         "Non è chiaro dove sono conservati o trattati i dati."),
+    Rule(22, "gdpr", "personal_data", "third_party_access", ("yes",), 15,
+         "Terze parti o API di terze parti accedono ai dati personali."),
+    Rule(23, "gdpr", "personal_data", "users_informed_ai", ("no", "partial"), 20,
+         "Gli utenti non sono chiaramente informati sull'uso di AI sui loro dati personali."),
+    # --- GDPR / dati (PIM + AI) ---
+    Rule(24, "gdpr", "pim", "pim_training_data_source", ("web_scraped",), 15,
+         "I modelli AI del PIM sono addestrati anche su dati estratti dal web (rischio copyright/GDPR secondo Legge 132/2025)."),
+    Rule(25, "gdpr", "pim", "pim_training_data_source", ("customer_data",), 10,
+         "I modelli AI del PIM utilizzano dati cliente (ricerche, recensioni, ecc.) potenzialmente personali."),
+    Rule(26, "gdpr", "pim", "pim_training_data_source", ("unknown",), 10,
+         "Non è chiaro da dove provengono i dati di training dei modelli AI nel PIM."),
+    Rule(27, "gdpr", "pim", "pim_copyright_policy", ("none",), 20,
+         "Mancano policy chiare sull'uso di contenuti protetti da copyright per l'addestramento dell'AI (Legge 132/2025)."),
+    Rule(28, "gdpr", "pim", "pim_copyright_policy", ("partial",), 10,
+         "Le policy sul copyright per l'AI nel PIM sono solo parziali."),
+    # --- Operativo / governance ---
+    Rule(29, "operational", None, "ai_documentation", ("none",), 25,
+         "Manca documentazione sui sistemi di AI utilizzati dall'azienda."),
+    Rule(30, "operational", None, "ai_documentation", ("partial",), 10,
+         "La documentazione sui sistemi di AI è solo parziale."),
+    Rule(31, "operational", None, "policies", ("none",), 20,
+         "Mancano policy interne su protezione dati e uso dell'AI."),
+    Rule(32, "operational", None, "policies", ("in_progress",), 10,
+         "Le policy interne su dati e AI sono ancora in sviluppo."),
+    Rule(33, "operational", None, "risk_assessments", ("none",), 20,
+         "Non vengono effettuate valutazioni periodiche dei rischi."),
+    Rule(34, "operational", None, "risk_assessments", ("occasional",), 10,
+         "Le valutazioni del rischio non sono regolari."),
+    Rule(35, "operational", None, "incident_response", ("none",), 20,
+         "Manca un piano di risposta in caso di problemi con AI o dati."),
+    Rule(36, "operational", None, "incident_response", ("partial",), 10,
+         "Esiste solo un piano parziale di risposta agli incidenti."),
+    Rule(37, "operational", None, "ai_training_done", ("no",), 10,
+         "Non è stata ancora fatta formazione/alfabetizzazione AI per il personale coinvolto."),
+    Rule(38, "operational", None, "ai_training_done", ("planned",), 5,
+         "La formazione AI per il personale è solo pianificata, non ancora realizzata."),
+    Rule(39, "operational", None, "ai_act_plan_status", ("none",), 15,
+         "Manca un piano strutturato di adeguamento alle scadenze AI Act / Legge 132/2025."),
+    Rule(40, "operational", None, "ai_act_plan_status", ("informal",), 7,
+         "Esiste solo un piano informale per l'adeguamento alle scadenze AI Act / Legge 132/2025."),
+    # --- Urgenza ---
+    Rule(41, "urgency", None, "upcoming_changes", ("new_ai_feature",), 25,
+         "È previsto il lancio di una nuova funzionalità di AI."),
+    Rule(42, "urgency", None, "upcoming_changes", ("new_countries",), 20,
+         "È prevista l'espansione in nuovi paesi."),
+    Rule(43, "urgency", None, "upcoming_changes", ("new_integrations",), 15,
+         "Sono previste nuove integrazioni con tool o API di terze parti."),
+    Rule(44, "urgency", None, "decision_criticality", ("high",), 25,
+         "Le decisioni pianificate sono critiche per il business."),
+    Rule(45, "urgency", None, "reg_issue_impact", ("high",), 25,
+         "Un problema regolatorio avrebbe un impatto elevato sull'azienda."),
+    Rule(46, "urgency", "pim", "pim_ai_impact", ("high",), 10,
+         "L'uso di AI nel PIM ha un impatto elevato su prezzi, visibilità o decisioni di business."),
+    Rule(47, "urgency", "pim", "pim_ai_impact", ("medium",), 5,
+         "L'uso di AI nel PIM ha un impatto moderato sulle decisioni di business."),
+)
+
+RULES_BY_CODE: Dict[int, Rule] = {rule.code: rule for rule in RULES}
+
+# (campo, valori) -> codice: ogni condizione identifica una sola regola
+_RULE_CODES: Dict[Tuple[str, Tuple[str, ...]], int] = {
+    (rule.field, rule.values): rule.code for rule in RULES
+}
+assert len(_RULE_CODES) == len(RULES), "due regole con la stessa condizione"
+
+
+def rule_code(field: str, *values: str) -> int:
+    """Codice della regola su field con esattamente questi valori (KeyError se manca)."""
+    return _RULE_CODES[(field, values)]
+
+
+def rules_fingerprint() -> str:
+    """Impronta di regole e vocabolario: cambia se cambia lo scoring."""
+    payload = repr((FIELD_VALUES, MULTI_FIELDS, RULES)).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+# -------------------------------------------------------------------
+#  Catalogo dei motivi
+# -------------------------------------------------------------------
+
+# Codice della regola -> testo del motivo. Lo scoring emette solo i codici:
+# il testo si ricava dal catalogo quando serve (risposta API, report, PDF),
+# e nel DB basta salvare i codici (vedi pack_reason_codes).
+REASON_TEXTS: Dict[int, str] = {rule.code: rule.reason for rule in RULES if rule.reason}
+
+# Testo del motivo -> codice (per ricavare i codici dai report già salvati)
+REASON_CODES: Dict[str, int] = {text: code for code, text in REASON_TEXTS.items()}
+
+assert max(REASON_TEXTS) < 256, "i codici dei motivi devono stare in un byte"
+
+
+def reason_texts(codes: Iterable[int]) -> List[str]:
+    """Testi dei motivi, nell'ordine dei codici."""
+    return [REASON_TEXTS[code] for code in codes]
+
+
+def pack_reason_codes(codes: Iterable[int]) -> bytes:
+    """Forma compatta per il DB: un byte per codice, nell'ordine dato."""
+    return bytes(codes)
+
+
+def unpack_reason_codes(packed: Optional[bytes]) -> Tuple[int, ...]:
+    """Inverso di pack_reason_codes."""
+    return tuple(packed or b"")
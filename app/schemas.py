@@ -1,7 +1,9 @@
 # app/schemas.py
 
-from typing import List, Literal
-from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+
+from .metrics import METRICS_ENABLED, timed_validation
 
 
 # -----------------------------
@@ -103,6 +105,16 @@ class AssessmentRequest(BaseModel):
         description="Impatto potenziale di un problema regolatorio sull'azienda.",
     )
 
+    if METRICS_ENABLED:
+        # Durata della validazione in app_validation_seconds (solo con APP_METRICS=1)
+        _timed_validation = model_validator(mode="wrap")(timed_validation)
+
+
+class PersistedAssessmentRequest(AssessmentRequest):
+    company_name: Optional[str] = Field(
+        None, max_length=200, description="Nome dell'azienda valutata (salvato con la valutazione)."
+    )
+
 
 # -----------------------------
 # Response model
@@ -124,7 +136,60 @@ class AssessmentResponse(BaseModel):
         ...,
         description="Principali motivi che contribuiscono al rischio (max 5).",
     )
+    reason_codes: List[int] = Field(
+        ...,
+        description="Codici stabili delle regole corrispondenti ai motivi, nello stesso ordine.",
+    )
     report: str = Field(
         ...,
         description="Report testuale riassuntivo della valutazione.",
     )
+
+
+class PersistedAssessmentResponse(AssessmentResponse):
+    assessment_id: Optional[int] = Field(
+        None,
+        description="Id della valutazione salvata (assente se non si attende il salvataggio).",
+    )
+
+
+class SimilarAssessmentResponse(BaseModel):
+    assessment_id: int = Field(..., description="Id della valutazione passata.")
+    distance: int = Field(
+        ..., description="Distanza di Hamming tra i vettori one-hot delle risposte."
+    )
+    similarity: float = Field(..., description="Similarità delle risposte (0–1).")
+    risk_class: str = Field(..., description="Classe di rischio della valutazione passata.")
+    final_score: float = Field(..., description="Punteggio complessivo della valutazione passata.")
+
+
+class DriftAlertResponse(BaseModel):
+    company_name: str = Field(..., description="Azienda con punteggi in crescita.")
+    assessments: int = Field(..., description="Valutazioni registrate per l'azienda.")
+    last_assessment_id: int = Field(..., description="Id dell'ultima valutazione.")
+    final_score: float = Field(..., description="Punteggio complessivo dell'ultima valutazione.")
+    slope: float = Field(
+        ..., description="Pendenza del punteggio complessivo (punti per valutazione, EWMA)."
+    )
+    rising_streak: int = Field(
+        ..., description="Aumenti consecutivi del punteggio complessivo."
+    )
+    domain: str = Field(..., description="Dominio con la pendenza maggiore.")
+    domain_slope: float = Field(..., description="Pendenza del dominio (punti per valutazione).")
+
+
+class StatsBucket(BaseModel):
+    key: str = Field(..., description="Giorno (YYYY-MM-DD), azienda o vuoto per il totale.")
+    assessments: int = Field(..., description="Numero di valutazioni.")
+    averages: Dict[str, float] = Field(
+        ..., description="Punteggi medi: final_score e punteggi per dominio."
+    )
+    risk_classes: Dict[str, int] = Field(..., description="Valutazioni per classe di rischio.")
+
+
+class StatsResponse(BaseModel):
+    totals: StatsBucket = Field(..., description="Aggregati di tutte le valutazioni (o dell'azienda).")
+    daily: List[StatsBucket] = Field(
+        default_factory=list,
+        description="Aggregati per giorno, in ordine di data (solo senza filtro azienda).",
+    )
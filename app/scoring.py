@@ -1,14 +1,25 @@
 # app/scoring.py
 
+import os
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from .config_pmi import PMI_AI_FEATURES, PMI_TRAINING_SOURCES, PMI_THIRD_PARTY_MODELS
+from .metrics import SCORING_SECONDS, instrument_compute_risk, timed
+from .rules import ANY, REASON_CODES, REASON_TEXTS, reason_texts, rule_code
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RiskResult:
-    """Risultato strutturato di una valutazione di rischio."""
+    """
+    Risultato strutturato di una valutazione di rischio (immutabile, senza
+    __dict__ per istanza).
+
+    I motivi sono i codici delle regole (app.rules, max 5): testi e report
+    si generano dal catalogo solo quando vengono letti. rule_codes sono
+    tutte le regole scattate, anche quelle senza motivo (per le metriche).
+    """
 
     ai_risk: float
     gdpr_risk: float
@@ -16,8 +27,24 @@ class RiskResult:
     urgency_risk: float
     final_score: float
     risk_class: str
-    reasons: List[str]
-    report: str
+    reason_codes: Tuple[int, ...]
+    rule_codes: Tuple[int, ...]
+
+    @property
+    def reasons(self) -> List[str]:
+        return reason_texts(self.reason_codes)
+
+    @property
+    def report(self) -> str:
+        return render_report(
+            self.final_score,
+            self.risk_class,
+            self.ai_risk,
+            self.gdpr_risk,
+            self.operational_risk,
+            self.urgency_risk,
+            self.reason_codes,
+        )
 
 
 SIZE_MULTIPLIERS: Dict[str, float] = {
@@ -49,52 +76,107 @@ def classify_risk(score: float) -> str:
     return "Critical"
 
 
+# -------------------------------------------------------------------
+#  Codici delle regole
+# -------------------------------------------------------------------
+
+# Ricavati da app.rules.RULES per campo e valori: rinumerare una regola non
+# cambia il motivo emesso, e una condizione senza regola fallisce all'import
+_R_USES_AI = rule_code("uses_ai", "yes")
+_R_AI_AFFECTS_DIRECTLY = rule_code("ai_affects_individuals", "direct")
+_R_AI_SUPPORTS_DECISIONS = rule_code("ai_affects_individuals", "support")
+_R_AI_USE_CASE_HR = rule_code("ai_use_cases", "hr")
+_R_AI_USE_CASE_SCORING = rule_code("ai_use_cases", "scoring")
+_R_NO_HUMAN_OVERSIGHT = rule_code("human_oversight", "none")
+_R_PARTIAL_HUMAN_OVERSIGHT = rule_code("human_oversight", "sometimes")
+_R_AI_USAGE_UNCLEAR = rule_code("ai_usage_clarity", "unknown")
+_R_PIM_AI_PRESENT = rule_code("pim_ai_features", ANY)
+_R_PIM_AUTOMATED_DECISIONS = rule_code("pim_ai_features", "dynamic_pricing", "categorization")
+_R_PIM_PARTIAL_TRANSPARENCY = rule_code("pim_ai_transparency", "partial")
+_R_PIM_NO_TRANSPARENCY = rule_code("pim_ai_transparency", "no")
+_R_PIM_NO_SUPERVISION = rule_code("pim_ai_supervision_level", "none")
+_R_PIM_LIMITED_SUPERVISION = rule_code("pim_ai_supervision_level", "limited")
+_R_PIM_EXTENSIVE_THIRD_PARTY = rule_code("pim_third_party_models", "extensive")
+_R_PIM_SOME_THIRD_PARTY = rule_code("pim_third_party_models", "some")
+_R_PERSONAL_DATA = rule_code("processes_personal_data", "yes")
+_R_SENSITIVE_DATA = rule_code("processes_sensitive_data", "yes")
+_R_SENSITIVE_DATA_UNKNOWN = rule_code("processes_sensitive_data", "unknown")
+_R_DATA_OUTSIDE_EU = rule_code("data_location", "eu_plus_third_countries")
+_R_DATA_LOCATION_UNKNOWN = rule_code("data_location", "unknown")
+_R_THIRD_PARTY_ACCESS = rule_code("third_party_access", "yes")
+_R_USERS_NOT_INFORMED = rule_code("users_informed_ai", "no", "partial")
+_R_PIM_TRAINING_WEB_SCRAPED = rule_code("pim_training_data_source", "web_scraped")
+_R_PIM_TRAINING_CUSTOMER_DATA = rule_code("pim_training_data_source", "customer_data")
+_R_PIM_TRAINING_UNKNOWN = rule_code("pim_training_data_source", "unknown")
+_R_PIM_NO_COPYRIGHT_POLICY = rule_code("pim_copyright_policy", "none")
+_R_PIM_PARTIAL_COPYRIGHT_POLICY = rule_code("pim_copyright_policy", "partial")
+_R_NO_AI_DOCUMENTATION = rule_code("ai_documentation", "none")
+_R_PARTIAL_AI_DOCUMENTATION = rule_code("ai_documentation", "partial")
+_R_NO_POLICIES = rule_code("policies", "none")
+_R_POLICIES_IN_PROGRESS = rule_code("policies", "in_progress")
+_R_NO_RISK_ASSESSMENTS = rule_code("risk_assessments", "none")
+_R_OCCASIONAL_RISK_ASSESSMENTS = rule_code("risk_assessments", "occasional")
+_R_NO_INCIDENT_RESPONSE = rule_code("incident_response", "none")
+_R_PARTIAL_INCIDENT_RESPONSE = rule_code("incident_response", "partial")
+_R_NO_AI_TRAINING = rule_code("ai_training_done", "no")
+_R_AI_TRAINING_PLANNED = rule_code("ai_training_done", "planned")
+_R_NO_AI_ACT_PLAN = rule_code("ai_act_plan_status", "none")
+_R_INFORMAL_AI_ACT_PLAN = rule_code("ai_act_plan_status", "informal")
+_R_NEW_AI_FEATURE = rule_code("upcoming_changes", "new_ai_feature")
+_R_NEW_COUNTRIES = rule_code("upcoming_changes", "new_countries")
+_R_NEW_INTEGRATIONS = rule_code("upcoming_changes", "new_integrations")
+_R_CRITICAL_DECISIONS = rule_code("decision_criticality", "high")
+_R_HIGH_REGULATORY_IMPACT = rule_code("reg_issue_impact", "high")
+_R_PIM_HIGH_IMPACT = rule_code("pim_ai_impact", "high")
+_R_PIM_MEDIUM_IMPACT = rule_code("pim_ai_impact", "medium")
+
+
 # -------------------------------------------------------------------
 #  AI Act risk
 # -------------------------------------------------------------------
 
 
-def _compute_ai_risk_base(answers: Dict[str, Any], reasons: List[str]) -> float:
+def _compute_ai_risk_base(answers: Dict[str, Any], fired: List[int]) -> float:
     score = 0.0
 
     # In questo tool assumo che ci sia sempre AI (PIM+AI),
     # ma tengo comunque la logica generica per altri casi d'uso futuri.
     if answers.get("uses_ai") == "yes":
         score += 20
-        reasons.append("L'azienda utilizza sistemi di AI o automazione sui dati.")
+        fired.append(_R_USES_AI)
 
         ai_affects = answers.get("ai_affects_individuals")
         if ai_affects == "direct":
             score += 25
-            reasons.append("Le decisioni di AI influenzano direttamente gli individui.")
+            fired.append(_R_AI_AFFECTS_DIRECTLY)
         elif ai_affects == "support":
             score += 15
-            reasons.append("L'AI supporta decisioni su persone.")
+            fired.append(_R_AI_SUPPORTS_DECISIONS)
 
         use_cases = set(answers.get("ai_use_cases", []))
         if "hr" in use_cases:
             score += 20
-            reasons.append("L'AI è usata in ambito HR / selezione del personale.")
+            fired.append(_R_AI_USE_CASE_HR)
         if "scoring" in use_cases:
             score += 15
-            reasons.append("L'AI è usata per scoring, ranking o raccomandazioni.")
+            fired.append(_R_AI_USE_CASE_SCORING)
 
         oversight = answers.get("human_oversight")
         if oversight == "none":
             score += 20
-            reasons.append("Manca una supervisione umana significativa sulle decisioni di AI.")
+            fired.append(_R_NO_HUMAN_OVERSIGHT)
         elif oversight == "sometimes":
             score += 10
-            reasons.append("La supervisione umana sulle decisioni di AI è solo parziale.")
+            fired.append(_R_PARTIAL_HUMAN_OVERSIGHT)
 
         if answers.get("ai_usage_clarity") == "unknown":
             score += 10
-            reasons.append("Non è chiaro come e dove viene usata l'AI nei processi aziendali.")
+            fired.append(_R_AI_USAGE_UNCLEAR)
 
     return score
 
 
-def _compute_ai_risk_pim(answers: Dict[str, Any], reasons: List[str]) -> float:
+def _compute_ai_risk_pim(answers: Dict[str, Any], fired: List[int]) -> float:
     """Componenti di rischio AI Act specifiche per PIM + AI."""
     score = 0.0
 
@@ -104,55 +186,43 @@ def _compute_ai_risk_pim(answers: Dict[str, Any], reasons: List[str]) -> float:
 
     # Presenza di AI nel PMI
     score += 5
+    fired.append(_R_PIM_AI_PRESENT)
 
     if "dynamic_pricing" in pim_features or "categorization" in pim_features:
         score += 15
-        reasons.append(
-            "Il PIM utilizza AI per decisioni automatizzate su prezzi o categorizzazione prodotti."
-        )
+        fired.append(_R_PIM_AUTOMATED_DECISIONS)
 
     transparency = answers.get("pim_ai_transparency")
     if transparency == "partial":
         score += 10
-        reasons.append(
-            "La trasparenza sui contenuti generati da AI nel PIM è solo parziale."
-        )
+        fired.append(_R_PIM_PARTIAL_TRANSPARENCY)
     elif transparency == "no":
         score += 20
-        reasons.append(
-            "Manca trasparenza sui contenuti generati da AI nel PIM, in potenziale contrasto con i requisiti di trasparenza."
-        )
+        fired.append(_R_PIM_NO_TRANSPARENCY)
 
     supervision = answers.get("pim_ai_supervision_level")
     if supervision == "none":
         score += 20
-        reasons.append(
-            "Le decisioni automatizzate del PIM non sono sottoposte a supervisione umana."
-        )
+        fired.append(_R_PIM_NO_SUPERVISION)
     elif supervision == "limited":
         score += 10
-        reasons.append(
-            "La supervisione umana sulle decisioni AI del PIM è limitata."
-        )
+        fired.append(_R_PIM_LIMITED_SUPERVISION)
 
     third_party = answers.get("pim_third_party_models")
     if third_party == "extensive":
         score += 10
-        reasons.append(
-            "Uso estensivo di modelli AI di terze parti nel PIM (es. GPAI via API)."
-        )
+        fired.append(_R_PIM_EXTENSIVE_THIRD_PARTY)
     elif third_party == "some":
         score += 5
-        reasons.append(
-            "Uso di modelli AI di terze parti nel PIM per alcune funzionalità."
-        )
+        fired.append(_R_PIM_SOME_THIRD_PARTY)
 
     return score
 
 
-def _compute_ai_risk(answers: Dict[str, Any], reasons: List[str]) -> float:
-    base = _compute_ai_risk_base(answers, reasons)
-    pim = _compute_ai_risk_pim(answers, reasons)
+@timed(SCORING_SECONDS, "_compute_ai_risk")
+def _compute_ai_risk(answers: Dict[str, Any], fired: List[int]) -> float:
+    base = _compute_ai_risk_base(answers, fired)
+    pim = _compute_ai_risk_pim(answers, fired)
     return clamp(base + pim)
 
 
@@ -161,44 +231,42 @@ def _compute_ai_risk(answers: Dict[str, Any], reasons: List[str]) -> float:
 # -------------------------------------------------------------------
 
 
-def _compute_gdpr_risk_base(answers: Dict[str, Any], reasons: List[str]) -> float:
+def _compute_gdpr_risk_base(answers: Dict[str, Any], fired: List[int]) -> float:
     score = 0.0
 
     if answers.get("processes_personal_data") == "yes":
         score += 20
-        reasons.append("L'azienda tratta dati personali dei clienti o dipendenti.")
+        fired.append(_R_PERSONAL_DATA)
 
         sensitive = answers.get("processes_sensitive_data")
         if sensitive == "yes":
             score += 30
-            reasons.append("L'azienda tratta dati sensibili (es. salute, finanza, minori).")
+            fired.append(_R_SENSITIVE_DATA)
         elif sensitive == "unknown":
             score += 10
-            reasons.append("Non è chiaro se vengono trattati dati sensibili.")
+            fired.append(_R_SENSITIVE_DATA_UNKNOWN)
 
         data_location = answers.get("data_location")
         if data_location == "eu_plus_third_countries":
             score += 20
-            reasons.append("I dati vengono trasferiti anche fuori dall'UE.")
+            fired.append(_R_DATA_OUTSIDE_EU)
         elif data_location == "unknown":
             score += 10
-            reasons.append("Non è chiaro dove sono conservati o trattati i dati.")
+            fired.append(_R_DATA_LOCATION_UNKNOWN)
 
         if answers.get("third_party_access") == "yes":
             score += 15
-            reasons.append("Terze parti o API di terze parti accedono ai dati personali.")
+            fired.append(_R_THIRD_PARTY_ACCESS)
 
         informed = answers.get("users_informed_ai")
         if informed in ("no", "partial"):
             score += 20
-            reasons.append(
-                "Gli utenti non sono chiaramente informati sull'uso di AI sui loro dati personali."
-            )
+            fired.append(_R_USERS_NOT_INFORMED)
 
     return score
 
 
-def _compute_gdpr_risk_pim(answers: Dict[str, Any], reasons: List[str]) -> float:
+def _compute_gdpr_risk_pim(answers: Dict[str, Any], fired: List[int]) -> float:
     score = 0.0
 
     pim_features = set(answers.get("pim_ai_features", []))
@@ -208,38 +276,29 @@ def _compute_gdpr_risk_pim(answers: Dict[str, Any], reasons: List[str]) -> float
     training_sources = set(answers.get("pim_training_data_source", []))
     if "web_scraped" in training_sources:
         score += 15
-        reasons.append(
-            "I modelli AI del PIM sono addestrati anche su dati estratti dal web (rischio copyright/GDPR secondo Legge 132/2025)."
-        )
+        fired.append(_R_PIM_TRAINING_WEB_SCRAPED)
     if "customer_data" in training_sources:
         score += 10
-        reasons.append(
-            "I modelli AI del PIM utilizzano dati cliente (ricerche, recensioni, ecc.) potenzialmente personali."
-        )
+        fired.append(_R_PIM_TRAINING_CUSTOMER_DATA)
     if "unknown" in training_sources:
         score += 10
-        reasons.append(
-            "Non è chiaro da dove provengono i dati di training dei modelli AI nel PIM."
-        )
+        fired.append(_R_PIM_TRAINING_UNKNOWN)
 
     copyright_policy = answers.get("pim_copyright_policy")
     if copyright_policy == "none":
         score += 20
-        reasons.append(
-            "Mancano policy chiare sull'uso di contenuti protetti da copyright per l'addestramento dell'AI (Legge 132/2025)."
-        )
+        fired.append(_R_PIM_NO_COPYRIGHT_POLICY)
     elif copyright_policy == "partial":
         score += 10
-        reasons.append(
-            "Le policy sul copyright per l'AI nel PIM sono solo parziali."
-        )
+        fired.append(_R_PIM_PARTIAL_COPYRIGHT_POLICY)
 
     return score
 
 
-def _compute_gdpr_risk(answers: Dict[str, Any], reasons: List[str]) -> float:
-    base = _compute_gdpr_risk_base(answers, reasons)
-    pim = _compute_gdpr_risk_pim(answers, reasons)
+@timed(SCORING_SECONDS, "_compute_gdpr_risk")
+def _compute_gdpr_risk(answers: Dict[str, Any], fired: List[int]) -> float:
+    base = _compute_gdpr_risk_base(answers, fired)
+    pim = _compute_gdpr_risk_pim(answers, fired)
     return clamp(base + pim)
 
 
@@ -249,71 +308,64 @@ def _compute_gdpr_risk(answers: Dict[str, Any], reasons: List[str]) -> float:
 
 
 def _compute_operational_risk_base(
-    answers: Dict[str, Any], reasons: List[str]
+    answers: Dict[str, Any], fired: List[int]
 ) -> float:
     score = 0.0
 
     ai_doc = answers.get("ai_documentation")
     if ai_doc == "none":
         score += 25
-        reasons.append("Manca documentazione sui sistemi di AI utilizzati dall'azienda.")
+        fired.append(_R_NO_AI_DOCUMENTATION)
     elif ai_doc == "partial":
         score += 10
-        reasons.append("La documentazione sui sistemi di AI è solo parziale.")
+        fired.append(_R_PARTIAL_AI_DOCUMENTATION)
 
     policies = answers.get("policies")
     if policies == "none":
         score += 20
-        reasons.append("Mancano policy interne su protezione dati e uso dell'AI.")
+        fired.append(_R_NO_POLICIES)
     elif policies == "in_progress":
         score += 10
-        reasons.append("Le policy interne su dati e AI sono ancora in sviluppo.")
+        fired.append(_R_POLICIES_IN_PROGRESS)
 
     risk_assessments = answers.get("risk_assessments")
     if risk_assessments == "none":
         score += 20
-        reasons.append("Non vengono effettuate valutazioni periodiche dei rischi.")
+        fired.append(_R_NO_RISK_ASSESSMENTS)
     elif risk_assessments == "occasional":
         score += 10
-        reasons.append("Le valutazioni del rischio non sono regolari.")
+        fired.append(_R_OCCASIONAL_RISK_ASSESSMENTS)
 
     incident_response = answers.get("incident_response")
     if incident_response == "none":
         score += 20
-        reasons.append("Manca un piano di risposta in caso di problemi con AI o dati.")
+        fired.append(_R_NO_INCIDENT_RESPONSE)
     elif incident_response == "partial":
         score += 10
-        reasons.append("Esiste solo un piano parziale di risposta agli incidenti.")
+        fired.append(_R_PARTIAL_INCIDENT_RESPONSE)
 
     ai_training = answers.get("ai_training_done")
     if ai_training == "no":
         score += 10
-        reasons.append(
-            "Non è stata ancora fatta formazione/alfabetizzazione AI per il personale coinvolto."
-        )
+        fired.append(_R_NO_AI_TRAINING)
     elif ai_training == "planned":
         score += 5
-        reasons.append(
-            "La formazione AI per il personale è solo pianificata, non ancora realizzata."
-        )
+        fired.append(_R_AI_TRAINING_PLANNED)
 
     ai_plan = answers.get("ai_act_plan_status")
     if ai_plan == "none":
         score += 15
-        reasons.append(
-            "Manca un piano strutturato di adeguamento alle scadenze AI Act / Legge 132/2025."
-        )
+        fired.append(_R_NO_AI_ACT_PLAN)
     elif ai_plan == "informal":
         score += 7
-        reasons.append(
-            "Esiste solo un piano informale per l'adeguamento alle scadenze AI Act / Legge 132/2025."
-        )
+        fired.append(_R_INFORMAL_AI_ACT_PLAN)
 
     return score
 
 
-def _compute_operational_risk(answers: Dict[str, Any], reasons: List[str]) -> float:
-    return clamp(_compute_operational_risk_base(answers, reasons))
+@timed(SCORING_SECONDS, "_compute_operational_risk")
+def _compute_operational_risk(answers: Dict[str, Any], fired: List[int]) -> float:
+    return clamp(_compute_operational_risk_base(answers, fired))
 
 
 # -------------------------------------------------------------------
@@ -321,43 +373,38 @@ def _compute_operational_risk(answers: Dict[str, Any], reasons: List[str]) -> fl
 # -------------------------------------------------------------------
 
 
-def _compute_urgency_risk(answers: Dict[str, Any], reasons: List[str]) -> float:
+@timed(SCORING_SECONDS, "_compute_urgency_risk")
+def _compute_urgency_risk(answers: Dict[str, Any], fired: List[int]) -> float:
     score = 0.0
 
     upcoming = set(answers.get("upcoming_changes", []))
     if "new_ai_feature" in upcoming:
         score += 25
-        reasons.append("È previsto il lancio di una nuova funzionalità di AI.")
+        fired.append(_R_NEW_AI_FEATURE)
     if "new_countries" in upcoming:
         score += 20
-        reasons.append("È prevista l'espansione in nuovi paesi.")
+        fired.append(_R_NEW_COUNTRIES)
     if "new_integrations" in upcoming:
         score += 15
-        reasons.append("Sono previste nuove integrazioni con tool o API di terze parti.")
+        fired.append(_R_NEW_INTEGRATIONS)
 
     if answers.get("decision_criticality") == "high":
         score += 25
-        reasons.append("Le decisioni pianificate sono critiche per il business.")
+        fired.append(_R_CRITICAL_DECISIONS)
 
     if answers.get("reg_issue_impact") == "high":
         score += 25
-        reasons.append(
-            "Un problema regolatorio avrebbe un impatto elevato sull'azienda."
-        )
+        fired.append(_R_HIGH_REGULATORY_IMPACT)
 
     pim_features = set(answers.get("pim_ai_features", []))
     if pim_features:
         pim_impact = answers.get("pim_ai_impact")
         if pim_impact == "high":
             score += 10
-            reasons.append(
-                "L'uso di AI nel PIM ha un impatto elevato su prezzi, visibilità o decisioni di business."
-            )
+            fired.append(_R_PIM_HIGH_IMPACT)
         elif pim_impact == "medium":
             score += 5
-            reasons.append(
-                "L'uso di AI nel PIM ha un impatto moderato sulle decisioni di business."
-            )
+            fired.append(_R_PIM_MEDIUM_IMPACT)
 
     return clamp(score)
 
@@ -366,6 +413,16 @@ def _compute_urgency_risk(answers: Dict[str, Any], reasons: List[str]) -> float:
 #  Report
 # -------------------------------------------------------------------
 
+# Versione del template del report. I report si generano da punteggi e codici
+# dei motivi, anche per le valutazioni salvate: una modifica a _build_report
+# vale quindi per tutte e va accompagnata da un incremento della versione
+REPORT_TEMPLATE_VERSION = 1
+
+# Report renderizzati tenuti in memoria (per processo)
+REPORT_CACHE_SIZE = int(os.environ.get("APP_REPORT_CACHE_SIZE", "4096"))
+
+_REPORT_REASONS_HEADER = "Principali driver di rischio individuati:"
+
 
 def _build_report(
     final_score: float,
@@ -393,7 +450,7 @@ def _build_report(
     lines.append("")
 
     if reasons:
-        lines.append("Principali driver di rischio individuati:")
+        lines.append(_REPORT_REASONS_HEADER)
         for r in reasons[:5]:
             lines.append(f"  • {r}")
     else:
@@ -411,24 +468,116 @@ def _build_report(
     return "\n".join(lines)
 
 
+@lru_cache(maxsize=REPORT_CACHE_SIZE)
+def _render_report_cached(
+    version: int,
+    final_score: float,
+    risk_class: str,
+    ai_risk: float,
+    gdpr_risk: float,
+    operational_risk: float,
+    urgency_risk: float,
+    reason_codes: Tuple[int, ...],
+) -> str:
+    return _build_report(
+        final_score=final_score,
+        risk_class=risk_class,
+        ai_risk=ai_risk,
+        gdpr_risk=gdpr_risk,
+        operational_risk=operational_risk,
+        urgency_risk=urgency_risk,
+        reasons=reason_texts(reason_codes),
+    )
+
+
+def render_report(
+    final_score: float,
+    risk_class: str,
+    ai_risk: float,
+    gdpr_risk: float,
+    operational_risk: float,
+    urgency_risk: float,
+    reason_codes: Sequence[int],
+) -> str:
+    """
+    Report testuale dai punteggi e dai codici dei motivi, con il template
+    corrente. Valutazioni con gli stessi punteggi e motivi (es. questionari
+    reinviati) hanno lo stesso report, che resta in un LRU e non viene
+    rigenerato.
+    """
+    return _render_report_cached(
+        REPORT_TEMPLATE_VERSION,
+        final_score,
+        risk_class,
+        ai_risk,
+        gdpr_risk,
+        operational_risk,
+        urgency_risk,
+        tuple(reason_codes),
+    )
+
+
+def parse_report_reason_codes(report: str) -> Optional[Tuple[int, ...]]:
+    """
+    Ricava i codici dei motivi da un report generato da _build_report (per
+    le valutazioni salvate prima dei codici). None se un motivo del report
+    non è nel catalogo, es. perché il testo della regola è cambiato.
+    """
+    lines = report.split("\n")
+    try:
+        start = lines.index(_REPORT_REASONS_HEADER) + 1
+    except ValueError:
+        return ()
+    codes = []
+    for line in lines[start:]:
+        if not line.startswith("  • "):
+            break
+        code = REASON_CODES.get(line[4:])
+        if code is None:
+            return None
+        codes.append(code)
+    return tuple(codes)
+
+
 # -------------------------------------------------------------------
 #  Public function
 # -------------------------------------------------------------------
 
 
-def compute_risk(answers: Dict[str, Any]) -> RiskResult:
-    """Calcola i punteggi di rischio e il report a partire dalle risposte al questionario."""
-    reasons: List[str] = []
-
-    ai_risk = _compute_ai_risk(answers, reasons)
-    gdpr_risk = _compute_gdpr_risk(answers, reasons)
-    operational_risk = _compute_operational_risk(answers, reasons)
-    urgency_risk = _compute_urgency_risk(answers, reasons)
-
+def _assemble_result(
+    ai_risk: float,
+    gdpr_risk: float,
+    operational_risk: float,
+    urgency_risk: float,
+    company_size: Any,
+    geography: Any,
+    fired: Sequence[int],
+) -> RiskResult:
+    """Combina i punteggi di dominio nel punteggio finale."""
     # Moltiplicatori per dimensione e geografia (stessa logica di prima)
-    size_mult = SIZE_MULTIPLIERS.get(answers.get("company_size"), 1.0)
-    geo_mult = GEO_MULTIPLIERS.get(answers.get("geography"), 1.0)
+    return _combine_scores(
+        ai_risk,
+        gdpr_risk,
+        operational_risk,
+        urgency_risk,
+        SIZE_MULTIPLIERS.get(company_size, 1.0),
+        GEO_MULTIPLIERS.get(geography, 1.0),
+        fired,
+        [code for code in fired if code in REASON_TEXTS],
+    )
+
 
+def _combine_scores(
+    ai_risk: float,
+    gdpr_risk: float,
+    operational_risk: float,
+    urgency_risk: float,
+    size_mult: float,
+    geo_mult: float,
+    fired: Sequence[int],
+    reasons: Sequence[int],
+) -> RiskResult:
+    # Come _assemble_result, con i moltiplicatori già risolti (app.lookup)
     # Nuovi pesi tra i domini, basati sulla "vita reale":
     # - AI Act e GDPR: impatto regolatorio maggiore (fino al 7% e 4% del fatturato)
     # - Operativo / governance: importante ma più come fattore abilitante
@@ -444,17 +593,6 @@ def compute_risk(answers: Dict[str, Any]) -> RiskResult:
     final_score = clamp(base_score * size_mult * geo_mult)
     risk_class = classify_risk(final_score)
 
-    trimmed_reasons = reasons[:5]
-    report = _build_report(
-        final_score=final_score,
-        risk_class=risk_class,
-        ai_risk=ai_risk,
-        gdpr_risk=gdpr_risk,
-        operational_risk=operational_risk,
-        urgency_risk=urgency_risk,
-        reasons=trimmed_reasons,
-    )
-
     return RiskResult(
         ai_risk=ai_risk,
         gdpr_risk=gdpr_risk,
@@ -462,6 +600,27 @@ def compute_risk(answers: Dict[str, Any]) -> RiskResult:
         urgency_risk=urgency_risk,
         final_score=final_score,
         risk_class=risk_class,
-        reasons=trimmed_reasons,
-        report=report,
+        reason_codes=tuple(reasons[:5]),
+        rule_codes=tuple(fired),
+    )
+
+
+@instrument_compute_risk
+def compute_risk(answers: Dict[str, Any]) -> RiskResult:
+    """Calcola i punteggi di rischio e il report a partire dalle risposte al questionario."""
+    fired: List[int] = []
+
+    ai_risk = _compute_ai_risk(answers, fired)
+    gdpr_risk = _compute_gdpr_risk(answers, fired)
+    operational_risk = _compute_operational_risk(answers, fired)
+    urgency_risk = _compute_urgency_risk(answers, fired)
+
+    return _assemble_result(
+        ai_risk,
+        gdpr_risk,
+        operational_risk,
+        urgency_risk,
+        answers.get("company_size"),
+        answers.get("geography"),
+        fired,
     )
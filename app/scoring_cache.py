@@ -0,0 +1,160 @@
+# app/scoring_cache.py
+
+"""
+Memoizzazione di compute_risk per questionari ripetuti.
+
+La chiave è l'impronta canonica delle risposte: i codici di app.rules di
+ogni campo del vocabolario, nell'ordine fisso di FIELD_VALUES e MULTI_FIELDS.
+È quindi indipendente dall'ordine delle chiavi e delle scelte multiple
+(bitmask), ignora i campi che non fanno parte del questionario e fa
+coincidere i questionari che compute_risk non distingue (es. valore
+sconosciuto e campo assente).
+
+Nei miss il risultato viene da app.lookup.compute_risk_fast, che parte
+proprio da questa chiave (niente ricodifica delle risposte); è equivalente a
+compute_risk.
+
+I risultati restano in un LRU limitato nel numero di voci e con una durata
+massima (TTL). L'impronta in forma esadecimale (answers_fingerprint) include
+la versione delle regole e del template del report, così da poter fare da
+ETag per /assess.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .lookup import compute_risk_fast
+from .metrics import METRICS_ENABLED, SCORING_CACHE_TOTAL, record_scoring
+from .rules import FIELD_VALUES, MULTI_FIELDS, encode_multi, encode_value, rules_fingerprint
+from .scoring import REPORT_TEMPLATE_VERSION, RiskResult, compute_risk
+
+# Risultati tenuti in memoria (per processo)
+SCORING_CACHE_SIZE = int(os.environ.get("APP_SCORING_CACHE_SIZE", "10000"))
+
+# Durata massima (secondi) di un risultato in cache
+SCORING_CACHE_TTL = float(os.environ.get("APP_SCORING_CACHE_TTL", "3600"))
+
+AnswersKey = Tuple[int, ...]
+
+# Cambia se cambiano regole, vocabolario o testo del report
+_VERSION = (rules_fingerprint(), REPORT_TEMPLATE_VERSION)
+
+
+def answers_key(answers: Dict[str, Any]) -> Optional[AnswersKey]:
+    """
+    Forma canonica delle risposte (codici per campo), oppure None se un
+    valore non è codificabile (es. una lista in un campo a scelta singola).
+    """
+    get = answers.get
+    try:
+        return (
+            *(encode_value(field, get(field)) for field in FIELD_VALUES),
+            *(encode_multi(field, get(field)) for field in MULTI_FIELDS),
+        )
+    except TypeError:
+        return None
+
+
+def key_fingerprint(key: AnswersKey) -> str:
+    """Impronta esadecimale di una answers_key (con la versione delle regole)."""
+    payload = repr((_VERSION, key)).encode("ascii")
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+def answers_fingerprint(answers: Dict[str, Any]) -> Optional[str]:
+    """Impronta canonica esadecimale delle risposte (None se non codificabili)."""
+    key = answers_key(answers)
+    return None if key is None else key_fingerprint(key)
+
+
+@dataclass(frozen=True)
+class ScoringCacheStats:
+    hits: int
+    misses: int
+    expired: int
+    size: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ScoringCache:
+    """LRU con TTL dei risultati di compute_risk, indicizzato per answers_key."""
+
+    def __init__(self, max_entries: int = SCORING_CACHE_SIZE, ttl: float = SCORING_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[AnswersKey, Tuple[float, RiskResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+
+    def get(self, key: AnswersKey) -> Optional[RiskResult]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return result
+
+    def put(self, key: AnswersKey, result: RiskResult) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> ScoringCacheStats:
+        with self._lock:
+            return ScoringCacheStats(self._hits, self._misses, self._expired, len(self._entries))
+
+    def clear(self) -> None:
+        """Svuota la cache e azzera le statistiche."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._expired = 0
+
+
+scoring_cache = ScoringCache()
+
+
+def compute_risk_cached(answers: Dict[str, Any], key: Optional[AnswersKey] = None) -> RiskResult:
+    """
+    compute_risk con memoizzazione. Il RiskResult ritornato può essere
+    condiviso tra più chiamate: non va modificato. key, se già nota (es. da
+    app.validation), evita di ricalcolare answers_key.
+    """
+    if key is None:
+        key = answers_key(answers)
+    if key is None:
+        return compute_risk(answers)
+    result = scoring_cache.get(key)
+    if METRICS_ENABLED:
+        SCORING_CACHE_TOTAL.inc("miss" if result is None else "hit")
+    if result is None:
+        result = compute_risk_fast(key)
+        scoring_cache.put(key, result)
+    if METRICS_ENABLED:
+        # Classi e regole contano le valutazioni, anche quelle dalla cache
+        record_scoring(result)
+    return result
+
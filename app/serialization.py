@@ -0,0 +1,146 @@
+# app/serialization.py
+
+"""
+Serializzazione diretta di RiskResult, senza passare da AssessmentResponse.
+
+result_to_json produce gli stessi byte JSON della risposta di /assess (stessi
+campi, stesso ordine, separatori compatti come JSONResponse) concatenando
+frammenti già codificati: i motivi e le classi di rischio sono codificati una
+volta sola dal catalogo, i report (spesso ripetuti, vedi render_report) da
+un LRU. result_to_msgpack fa lo stesso in MessagePack, se il pacchetto
+msgpack è installato; negotiate_media_type sceglie tra i due in base
+all'header Accept.
+"""
+
+import importlib.util
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from .rules import REASON_TEXTS
+from .scoring import REPORT_CACHE_SIZE, RiskResult
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+# MessagePack si offre solo se il pacchetto è installato
+MSGPACK_AVAILABLE = importlib.util.find_spec("msgpack") is not None
+
+# assessment_id non passato: risposta senza il campo (AssessmentResponse)
+_OMITTED: Any = object()
+
+
+def _json_string(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+# Frammenti JSON precalcolati
+_REASON_JSON: Dict[int, str] = {code: _json_string(text) for code, text in REASON_TEXTS.items()}
+_RISK_CLASS_JSON: Dict[str, str] = {
+    risk_class: _json_string(risk_class) for risk_class in ("Low", "Medium", "High", "Critical")
+}
+
+_encode_report = lru_cache(maxsize=REPORT_CACHE_SIZE)(_json_string)
+
+
+def result_to_json(result: RiskResult, assessment_id: Any = _OMITTED) -> bytes:
+    """
+    JSON (UTF-8) di un AssessmentResponse; con assessment_id (anche None)
+    quello di un PersistedAssessmentResponse.
+    """
+    codes = result.reason_codes
+    risk_class = result.risk_class
+    parts = [
+        '{"ai_risk":', repr(float(result.ai_risk)),
+        ',"gdpr_risk":', repr(float(result.gdpr_risk)),
+        ',"operational_risk":', repr(float(result.operational_risk)),
+        ',"urgency_risk":', repr(float(result.urgency_risk)),
+        ',"final_score":', repr(float(result.final_score)),
+        ',"risk_class":', _RISK_CLASS_JSON.get(risk_class) or _json_string(risk_class),
+        ',"reasons":[', ",".join([_REASON_JSON[code] for code in codes]),
+        '],"reason_codes":[', ",".join(map(str, codes)),
+        '],"report":', _encode_report(result.report),
+    ]
+    if assessment_id is not _OMITTED:
+        parts += ',"assessment_id":', "null" if assessment_id is None else str(int(assessment_id))
+    parts.append("}")
+    return "".join(parts).encode("utf-8")
+
+
+def result_to_msgpack(result: RiskResult, assessment_id: Any = _OMITTED) -> bytes:
+    """Stessi campi di result_to_json in MessagePack (richiede msgpack)."""
+    try:
+        import msgpack
+    except ImportError as exc:
+        raise RuntimeError(
+            "La serializzazione MessagePack richiede msgpack (pip install msgpack)"
+        ) from exc
+    payload = {
+        "ai_risk": float(result.ai_risk),
+        "gdpr_risk": float(result.gdpr_risk),
+        "operational_risk": float(result.operational_risk),
+        "urgency_risk": float(result.urgency_risk),
+        "final_score": float(result.final_score),
+        "risk_class": result.risk_class,
+        "reasons": result.reasons,
+        "reason_codes": result.reason_codes,
+        "report": result.report,
+    }
+    if assessment_id is not _OMITTED:
+        payload["assessment_id"] = assessment_id
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+# -------------------------------------------------
+# Negoziazione del formato (Accept)
+# -------------------------------------------------
+
+
+def _accept_quality(accept: str, media_type: str) -> float:
+    """q dell'intervallo più specifico di Accept che comprende media_type (0 se nessuno)."""
+    main_type = media_type.split("/")[0]
+    best_rank, quality = -1, 0.0
+    for entry in accept.split(","):
+        media_range, *params = (part.strip() for part in entry.split(";"))
+        media_range = media_range.lower()
+        if media_range == media_type:
+            rank = 2
+        elif media_range == f"{main_type}/*":
+            rank = 1
+        elif media_range == "*/*":
+            rank = 0
+        else:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        if rank > best_rank:
+            best_rank, quality = rank, q
+    return quality
+
+
+def negotiate_media_type(accept: Optional[str]) -> Optional[str]:
+    """
+    Formato della risposta per l'header Accept: MessagePack solo se il
+    client lo accetta (q > 0) almeno quanto JSON e msgpack è installato,
+    altrimenti JSON. None (406) se il client accetta MessagePack ma non
+    JSON e msgpack manca. Senza Accept, o se nessuno dei due è accettato,
+    JSON come sempre.
+    """
+    if not accept:
+        return JSON_CONTENT_TYPE
+    json_q = _accept_quality(accept, JSON_CONTENT_TYPE)
+    msgpack_q = _accept_quality(accept, MSGPACK_CONTENT_TYPE)
+    # "*/*" o "application/*" da soli non bastano per scegliere MessagePack
+    explicit = MSGPACK_CONTENT_TYPE in accept.lower()
+    if msgpack_q > 0 and explicit and msgpack_q >= json_q:
+        if MSGPACK_AVAILABLE:
+            return MSGPACK_CONTENT_TYPE
+        if json_q == 0:
+            return None
+    return JSON_CONTENT_TYPE
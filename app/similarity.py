@@ -0,0 +1,352 @@
+# app/similarity.py
+
+"""
+Indice di similarità tra valutazioni ("Decision Memory").
+
+Ogni questionario diventa un vettore one-hot: un bit per ciascun codice di
+ogni campo a scelta singola (incluso lo 0 di "assente / sconosciuto") e un
+bit per ciascuna opzione dei campi a scelta multipla. I 119 bit stanno in
+due parole uint64, quindi la distanza di Hamming tra un questionario e tutte
+le valutazioni salvate è uno XOR più un popcount vettoriale (NumPy) su due
+colonne.
+
+L'indice legge i codici già normalizzati di assessment_answers (nessun
+parsing di JSON) e si aggiorna in modo incrementale: a ogni query, se la
+versione dei dati è cambiata, carica solo le righe con id maggiore
+dell'ultimo indicizzato.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import db
+from .answers import ANSWER_COLUMNS, encode_answers
+from .rules import FIELD_VALUES, MULTI_FIELDS, field_cardinality
+
+RISK_CLASSES: Tuple[str, ...] = ("Low", "Medium", "High", "Critical")
+HIGH_RISK_CLASSES: Tuple[str, ...] = ("High", "Critical")
+
+# Similarità minima (0–1) per segnalare una valutazione simile ad alto rischio
+SIMILARITY_THRESHOLD = 0.85
+
+# Righe caricate dal DB per query durante un aggiornamento
+REFRESH_BATCH_SIZE = 50_000
+
+
+# -------------------------------------------------------------------
+#  Codifica one-hot a bit
+# -------------------------------------------------------------------
+
+
+def _bit_layout() -> List[Tuple[int, int]]:
+    # Per ogni colonna di ANSWER_COLUMNS: (primo bit, numero di bit)
+    layout = []
+    offset = 0
+    for field in ANSWER_COLUMNS:
+        if field in MULTI_FIELDS:
+            width = len(MULTI_FIELDS[field]) + 1
+        else:
+            width = field_cardinality(field)
+        layout.append((offset, width))
+        offset += width
+    return layout
+
+
+_LAYOUT = _bit_layout()
+VECTOR_BITS = sum(width for _, width in _LAYOUT)
+_WORDS = (VECTOR_BITS + 63) // 64
+
+# Distanza massima: 2 per ogni campo singolo diverso, 1 per ogni opzione
+MAX_DISTANCE = 2 * len(FIELD_VALUES) + sum(len(v) + 1 for v in MULTI_FIELDS.values())
+
+# Distanza assegnata alle righe escluse da una query (> MAX_DISTANCE, in uint8)
+_EXCLUDED = 128
+
+
+def pack_codes(codes: np.ndarray) -> np.ndarray:
+    """
+    Converte una matrice di codici (righe × ANSWER_COLUMNS, 0 per i campi
+    assenti) nei vettori one-hot impaccati (righe × parole uint64).
+    """
+    codes = codes.astype(np.uint64, copy=False)
+    words = np.zeros((codes.shape[0], _WORDS), dtype=np.uint64)
+    for column, (field, (offset, width)) in enumerate(zip(ANSWER_COLUMNS, _LAYOUT)):
+        values = codes[:, column]
+        if field in MULTI_FIELDS:
+            bits = [(offset + j, (values >> np.uint64(j)) & np.uint64(1)) for j in range(width)]
+        else:
+            bits = [(offset + j, (values == j).astype(np.uint64)) for j in range(width)]
+        for position, flag in bits:
+            words[:, position // 64] |= flag << np.uint64(position % 64)
+    return words
+
+
+_MULTI_COLUMNS = frozenset(i for i, f in enumerate(ANSWER_COLUMNS) if f in MULTI_FIELDS)
+
+
+def pack_answers(answers: Dict[str, Any]) -> np.ndarray:
+    """
+    Vettore impaccato (parole uint64) di un singolo questionario. Stesso
+    risultato di pack_codes, calcolato con interi Python (per una riga
+    sola è molto più rapido delle operazioni vettoriali).
+    """
+    codes, _ = encode_answers(answers)
+    vector = 0
+    for column, (code, (offset, _)) in enumerate(zip(codes, _LAYOUT)):
+        code = code or 0
+        if column in _MULTI_COLUMNS:
+            vector |= code << offset
+        else:
+            vector |= 1 << (offset + code)
+    return np.array(
+        [(vector >> (64 * word)) & 0xFFFF_FFFF_FFFF_FFFF for word in range(_WORDS)],
+        dtype=np.uint64,
+    )
+
+
+# -------------------------------------------------------------------
+#  Indice
+# -------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class SimilarAssessment:
+    assessment_id: int
+    distance: int
+    similarity: float
+    risk_class: str
+    final_score: float
+
+
+class SimilarityIndex:
+    """
+    Vettori impaccati di tutte le valutazioni, in array NumPy a crescita
+    geometrica (aggiungere righe costa in media O(1) per riga).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.size = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        # Una riga per parola: lo XOR scorre memoria contigua
+        self._words = np.empty((_WORDS, 0), dtype=np.uint64)
+        self._classes = np.empty(0, dtype=np.int8)
+        self._scores = np.empty(0, dtype=np.float64)
+        self._penalties: Dict[frozenset, np.ndarray] = {}
+
+    def _append(self, ids, words, classes, scores) -> None:
+        needed = self.size + len(ids)
+        if needed > len(self._ids):
+            capacity = max(needed, 2 * len(self._ids), 1024)
+            self._ids = np.resize(self._ids, capacity)
+            words_grown = np.zeros((_WORDS, capacity), dtype=np.uint64)
+            words_grown[:, : self.size] = self._words[:, : self.size]
+            self._words = words_grown
+            self._classes = np.resize(self._classes, capacity)
+            self._scores = np.resize(self._scores, capacity)
+        window = slice(self.size, needed)
+        self._ids[window] = ids
+        self._words[:, window] = words.T
+        self._classes[window] = classes
+        self._scores[window] = scores
+        self.size = needed
+        self._penalties.clear()
+
+    def _penalty(self, risk_classes: Sequence[str]) -> np.ndarray:
+        # Vettore da sommare alle distanze per escludere le altre classi;
+        # calcolato una volta per insieme di classi e riusato fino al
+        # prossimo aggiornamento dell'indice
+        key = frozenset(risk_classes)
+        penalty = self._penalties.get(key)
+        if penalty is None:
+            by_class = np.array(
+                [0 if c in key else _EXCLUDED for c in RISK_CLASSES], dtype=np.uint8
+            )
+            penalty = np.zeros(-(-self.size // 8) * 8, dtype=np.uint8)
+            penalty[: self.size] = by_class[self._classes[: self.size]]
+            self._penalties[key] = penalty
+        return penalty
+
+    def refresh(self) -> int:
+        """
+        Allinea l'indice al DB se la versione dei dati è cambiata; ritorna
+        il numero di righe aggiunte. Se le valutazioni sono state cancellate
+        (clear_all_assessments) l'indice viene ricostruito da zero.
+        """
+        version = db.data_version()
+        if version == self._version:
+            return 0
+        with self._lock:
+            if version == self._version:
+                return 0
+            added = self._load_new_rows()
+            self._version = version
+            return added
+
+    def _load_new_rows(self) -> int:
+        columns = ", ".join(f"COALESCE(n.{name}, 0)" for name in ANSWER_COLUMNS)
+        with db.pooled_connection() as conn:
+            first_id = conn.execute("SELECT MIN(id) FROM assessments").fetchone()[0]
+            if self.size and (first_id is None or first_id > self._ids[0]):
+                self._reset()
+
+            last_id = int(self._ids[self.size - 1]) if self.size else 0
+            added = 0
+            while True:
+                rows = conn.execute(
+                    f"""
+                    SELECT n.assessment_id, a.risk_class, a.final_score, {columns}
+                    FROM assessment_answers n
+                    JOIN assessments a ON a.id = n.assessment_id
+                    WHERE n.assessment_id > ?
+                    ORDER BY n.assessment_id
+                    LIMIT ?
+                    """,
+                    (last_id, REFRESH_BATCH_SIZE),
+                ).fetchall()
+                if not rows:
+                    return added
+                ids, classes, scores, *codes = zip(*rows)
+                self._append(
+                    np.array(ids, dtype=np.int64),
+                    pack_codes(np.array(codes, dtype=np.int64).T),
+                    np.array([RISK_CLASSES.index(c) for c in classes], dtype=np.int8),
+                    np.array(scores, dtype=np.float64),
+                )
+                added += len(rows)
+                last_id = ids[-1]
+
+    def _padded_distances(self, vector: np.ndarray) -> np.ndarray:
+        # Lunghezza arrotondata a multipli di 8 (la capacità lo è sempre):
+        # le righe di riempimento hanno distanza _EXCLUDED
+        padded = -(-self.size // 8) * 8
+        words = self._words[:, :padded]
+        result = np.zeros(padded, dtype=np.uint8)
+        scratch = np.empty(padded, dtype=np.uint64)
+        counts = np.empty(padded, dtype=np.uint8)
+        for word in range(_WORDS):
+            np.bitwise_xor(words[word], vector[word], out=scratch)
+            np.bitwise_count(scratch, out=counts)
+            np.add(result, counts, out=result)
+        result[self.size:] = _EXCLUDED
+        return result
+
+    def distances(self, vector: np.ndarray) -> np.ndarray:
+        """Distanza di Hamming (uint8) da ogni valutazione indicizzata."""
+        return self._padded_distances(vector)[: self.size]
+
+    def query(
+        self,
+        answers: Dict[str, Any],
+        k: int = 5,
+        risk_classes: Optional[Sequence[str]] = None,
+        exclude_id: Optional[int] = None,
+    ) -> List[SimilarAssessment]:
+        """
+        Le k valutazioni più simili al questionario (a parità di distanza,
+        le più recenti), eventualmente solo tra quelle delle classi indicate.
+        """
+        self.refresh()
+        with self._lock:
+            if not self.size or k <= 0:
+                return []
+            distance = self._padded_distances(pack_answers(answers))
+            ids = self._ids[: self.size]
+
+            # Le righe escluse ricevono una distanza fuori scala
+            if risk_classes is not None:
+                np.add(distance, self._penalty(risk_classes), out=distance)
+            if exclude_id is not None:
+                # Gli id sono in ordine crescente: ricerca binaria
+                position = int(np.searchsorted(ids, exclude_id))
+                if position < self.size and ids[position] == exclude_id:
+                    distance[position] = _EXCLUDED
+
+            cutoff = _cutoff(distance, k)
+            if cutoff is None:
+                return []
+            candidates = _positions_at_most(distance, cutoff)
+            order = np.lexsort((-ids[candidates], distance[candidates]))[:k]
+            chosen = candidates[order]
+
+            return [
+                SimilarAssessment(
+                    assessment_id=int(ids[i]),
+                    distance=int(distance[i]),
+                    similarity=1.0 - int(distance[i]) / MAX_DISTANCE,
+                    risk_class=RISK_CLASSES[self._classes[i]],
+                    final_score=float(self._scores[i]),
+                )
+                for i in chosen
+            ]
+
+
+def _cutoff(distance: np.ndarray, k: int) -> Optional[int]:
+    # Distanza minima che include almeno k righe (None se sono tutte escluse).
+    # Di solito bastano pochi passi a partire dal minimo; altrimenti un
+    # istogramma completo.
+    cutoff = int(distance.min())
+    if cutoff > MAX_DISTANCE:
+        return None
+    for _ in range(4):
+        if cutoff >= MAX_DISTANCE or np.count_nonzero(distance <= cutoff) >= k:
+            return cutoff
+        cutoff += 1
+    counts = np.cumsum(np.bincount(distance, minlength=MAX_DISTANCE + 1)[: MAX_DISTANCE + 1])
+    return min(int(np.searchsorted(counts, k)), MAX_DISTANCE)
+
+
+def _positions_at_most(distance: np.ndarray, cutoff: int) -> np.ndarray:
+    # flatnonzero su un array booleano lungo è lento: si cercano prima i
+    # blocchi di 8 righe con almeno un candidato (vista uint64), poi le
+    # singole posizioni solo dentro quei blocchi
+    mask = distance <= cutoff
+    blocks = np.flatnonzero(mask.view(np.uint64))
+    positions = (blocks[:, None] * 8 + np.arange(8)).ravel()
+    return positions[mask[positions]]
+
+
+_indexes: Dict[str, SimilarityIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """Indice condiviso per il DB corrente (uno per percorso, come i pool)."""
+    key = str(db.DB_PATH)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(key, SimilarityIndex())
+    return index
+
+
+def find_similar(
+    answers: Dict[str, Any],
+    k: int = 5,
+    risk_classes: Optional[Sequence[str]] = None,
+    exclude_id: Optional[int] = None,
+) -> List[SimilarAssessment]:
+    """Top-k valutazioni passate più simili al questionario."""
+    return get_similarity_index().query(answers, k, risk_classes, exclude_id)
+
+
+def similar_high_risk(
+    answers: Dict[str, Any],
+    threshold: float = SIMILARITY_THRESHOLD,
+    k: int = 3,
+    exclude_id: Optional[int] = None,
+) -> List[SimilarAssessment]:
+    """
+    Valutazioni passate ad alto rischio (High / Critical) con similarità
+    almeno pari alla soglia: se la lista non è vuota, lo schema di risposte
+    ricorda casi già classificati come rischiosi.
+    """
+    matches = find_similar(answers, k, HIGH_RISK_CLASSES, exclude_id)
+    return [match for match in matches if match.similarity >= threshold]
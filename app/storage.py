@@ -0,0 +1,147 @@
+# app/storage.py
+
+"""
+Interfaccia di storage delle valutazioni e scelta del backend.
+
+app.db resta il punto d'accesso per il resto dell'applicazione: con
+APP_STORAGE=sqlite (default) usa il proprio file SQLite, con
+APP_STORAGE=postgres inoltra le operazioni dell'interfaccia a PostgresStore
+(app.storage_postgres, connessione da APP_POSTGRES_DSN).
+
+L'interfaccia copre le operazioni sulle valutazioni: salvataggio singolo e
+in blocco, ultime valutazioni (o solo l'ultima), report, storico filtrato
+(a pagine o in streaming) e cancellazione. Le funzioni costruite sulle tabelle SQLite
+(risposte normalizzate, drift, aggregati, Decision Memory) restano per ora
+disponibili solo con il backend SQLite: con un altro backend /stats,
+/drift/alerts e /assess/similar rispondono 501.
+
+Il contratto dell'interfaccia è verificato dai test (fixture store_contract
+in tests/conftest.py).
+"""
+
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+STORAGE_BACKENDS = ("sqlite", "postgres")
+
+STORAGE_BACKEND = os.environ.get("APP_STORAGE", "sqlite")
+
+# Riga di get_recent_assessments / get_assessment_history:
+# (id, created_at, company_name, final_score, risk_class,
+#  ai_risk, gdpr_risk, operational_risk, urgency_risk)
+AssessmentRow = Tuple[int, str, Optional[str], float, str, float, float, float, float]
+
+# Riga di iter_assessment_reports: (id, created_at, company_name, report_text)
+ReportRow = Tuple[int, str, Optional[str], str]
+
+# Cursore dello storico: (created_ts, id) dell'ultima riga della pagina
+HistoryCursor = Tuple[int, int]
+
+# Valutazione da salvare: (company_name, answers, result di compute_risk)
+AssessmentInput = Tuple[Optional[str], Dict[str, Any], Any]
+
+
+class AssessmentStore(Protocol):
+    """Operazioni che ogni backend di storage deve fornire."""
+
+    def init(self) -> None:
+        """Crea o aggiorna lo schema."""
+
+    def log(self, company_name: Optional[str], answers: Dict[str, Any], result: Any) -> int:
+        """Salva una valutazione e ritorna il suo id."""
+
+    def bulk_insert(self, items: Iterable[AssessmentInput]) -> int:
+        """Salva molte valutazioni nel modo più efficiente; ritorna quante."""
+
+    def recent(self, limit: int = 50) -> List[AssessmentRow]:
+        """Ultime valutazioni, dalla più recente."""
+
+    def last(self) -> Optional[AssessmentRow]:
+        """Valutazione più recente, oppure None."""
+
+    def report(self, assessment_id: int) -> Optional[Tuple[Optional[str], str]]:
+        """(company_name, report_text) di una valutazione, oppure None."""
+
+    def history(
+        self, limit: int = 50, cursor: Optional[HistoryCursor] = None, **filters: Any
+    ) -> Tuple[List[AssessmentRow], Optional[HistoryCursor]]:
+        """Pagina dello storico filtrato (vedi db.get_assessment_history)."""
+
+    def iter_reports(self, batch_size: int = 200, **filters: Any) -> Iterator[ReportRow]:
+        """Report dello storico filtrato, in streaming."""
+
+    def clear(self) -> None:
+        """Cancella tutte le valutazioni."""
+
+    def close(self) -> None:
+        """Rilascia connessioni e risorse."""
+
+
+class SQLiteStore:
+    """Backend SQLite: le funzioni di app.db (pool, scrittore a gruppi, WAL)."""
+
+    def init(self) -> None:
+        from . import db
+
+        db.init_db()
+
+    def log(self, company_name, answers, result) -> int:
+        from . import db
+
+        return db.log_assessment(company_name, answers, result)
+
+    def bulk_insert(self, items: Iterable[AssessmentInput]) -> int:
+        from . import db
+
+        return db.bulk_insert_assessments(items)
+
+    def recent(self, limit: int = 50) -> List[AssessmentRow]:
+        from . import db
+
+        return db.get_recent_assessments(limit)
+
+    def last(self) -> Optional[AssessmentRow]:
+        from . import db
+
+        return db.get_last_assessment()
+
+    def report(self, assessment_id: int):
+        from . import db
+
+        return db.get_assessment_report(assessment_id)
+
+    def history(self, limit=50, cursor=None, **filters):
+        from . import db
+
+        return db.get_assessment_history(limit, cursor, **filters)
+
+    def iter_reports(self, batch_size=200, **filters):
+        from . import db
+
+        return db.iter_assessment_reports(batch_size, **filters)
+
+    def clear(self) -> None:
+        from . import db
+
+        db.clear_all_assessments()
+
+    def close(self) -> None:
+        from . import db
+
+        db.flush_assessments()
+        db.close_connections()
+
+
+def create_store(backend: str = STORAGE_BACKEND) -> AssessmentStore:
+    """Istanzia il backend configurato."""
+    if backend == "sqlite":
+        return SQLiteStore()
+    if backend == "postgres":
+        from .storage_postgres import POSTGRES_DSN, PostgresStore
+
+        if not POSTGRES_DSN:
+            raise ValueError("APP_STORAGE=postgres richiede APP_POSTGRES_DSN")
+        return PostgresStore(POSTGRES_DSN)
+    raise ValueError(
+        f"Backend di storage sconosciuto: {backend} (ammessi: {', '.join(STORAGE_BACKENDS)})"
+    )
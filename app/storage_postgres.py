@@ -0,0 +1,190 @@
+# app/storage_postgres.py
+
+"""
+Backend PostgreSQL delle valutazioni (APP_STORAGE=postgres).
+
+Richiede psycopg 3 e psycopg_pool (pip install "psycopg[binary]" psycopg_pool).
+
+- connessioni da un pool (psycopg_pool.ConnectionPool), aperto al primo uso
+- inserimenti in blocco con COPY ... FROM STDIN
+- storico a pagine per chiave (created_ts, id), come con SQLite
+- report in streaming con un cursore lato server: le righe arrivano a
+  blocchi di batch_size senza rieseguire la query per ogni pagina
+
+Le colonne sono quelle della tabella SQLite (created_at resta la stringa
+ISO, created_ts i secondi "da calendario"), così i filtri di
+db._history_filters valgono per entrambi i backend.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import db
+
+POSTGRES_DSN = os.environ.get("APP_POSTGRES_DSN", "")
+
+# Connessioni del pool
+POSTGRES_POOL_MIN = int(os.environ.get("APP_POSTGRES_POOL_MIN", "1"))
+POSTGRES_POOL_MAX = int(os.environ.get("APP_POSTGRES_POOL_MAX", "10"))
+
+_COLUMNS = (
+    "created_at",
+    "created_ts",
+    "company_name",
+    "final_score",
+    "risk_class",
+    "ai_risk",
+    "gdpr_risk",
+    "operational_risk",
+    "urgency_risk",
+    "answers_json",
+    "report_text",
+    "reason_codes",
+)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS assessments (
+        id BIGSERIAL PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        created_ts BIGINT NOT NULL,
+        company_name TEXT,
+        final_score DOUBLE PRECISION NOT NULL,
+        risk_class TEXT NOT NULL,
+        ai_risk DOUBLE PRECISION NOT NULL,
+        gdpr_risk DOUBLE PRECISION NOT NULL,
+        operational_risk DOUBLE PRECISION NOT NULL,
+        urgency_risk DOUBLE PRECISION NOT NULL,
+        answers_json TEXT NOT NULL,
+        report_text TEXT NOT NULL,
+        reason_codes BYTEA
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_assessments_created ON assessments (created_ts, id)",
+    "CREATE INDEX IF NOT EXISTS idx_assessments_company "
+    "ON assessments (company_name, created_ts, id)",
+    "CREATE INDEX IF NOT EXISTS idx_assessments_risk ON assessments (risk_class, created_ts, id)",
+)
+
+_SUMMARY_COLUMNS = (
+    "id, created_at, company_name, final_score, risk_class, "
+    "ai_risk, gdpr_risk, operational_risk, urgency_risk"
+)
+
+
+def _where(**filters: Any) -> Tuple[List[str], List[Any]]:
+    return db._history_filters(**filters, placeholder="%s")
+
+
+class PostgresStore:
+    """Implementazione di storage.AssessmentStore su PostgreSQL."""
+
+    def __init__(self, dsn: str, min_size: int = POSTGRES_POOL_MIN, max_size: int = POSTGRES_POOL_MAX):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Context manager: connessione del pool, commit all'uscita senza errori
+        with self._lock:
+            if self._pool is None:
+                try:
+                    from psycopg_pool import ConnectionPool
+                except ImportError as exc:
+                    raise RuntimeError(
+                        "APP_STORAGE=postgres richiede psycopg e psycopg_pool "
+                        '(pip install "psycopg[binary]" psycopg_pool)'
+                    ) from exc
+                self._pool = ConnectionPool(
+                    self.dsn, min_size=self.min_size, max_size=self.max_size, open=True
+                )
+        return self._pool.connection()
+
+    def init(self) -> None:
+        with self._connection() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def log(self, company_name, answers, result) -> int:
+        row, _ = db._assessment_row(company_name, answers, result)
+        with self._connection() as conn:
+            return conn.execute(
+                f"INSERT INTO assessments ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join(['%s'] * len(_COLUMNS))}) RETURNING id",
+                row,
+            ).fetchone()[0]
+
+    def bulk_insert(self, items: Iterable[Tuple[Optional[str], Dict[str, Any], Any]]) -> int:
+        count = 0
+        with self._connection() as conn, conn.cursor() as cur:
+            with cur.copy(f"COPY assessments ({', '.join(_COLUMNS)}) FROM STDIN") as copy:
+                for company_name, answers, result in items:
+                    copy.write_row(db._assessment_row(company_name, answers, result)[0])
+                    count += 1
+        return count
+
+    def recent(self, limit: int = 50) -> List[Tuple]:
+        with self._connection() as conn:
+            return conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM assessments "
+                "ORDER BY created_ts DESC, id DESC LIMIT %s",
+                (limit,),
+            ).fetchall()
+
+    def last(self) -> Optional[Tuple]:
+        with self._connection() as conn:
+            return conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM assessments "
+                "ORDER BY created_ts DESC, id DESC LIMIT 1"
+            ).fetchone()
+
+    def report(self, assessment_id: int) -> Optional[Tuple[Optional[str], str]]:
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT company_name, {db.REPORT_COLUMNS} FROM assessments WHERE id = %s",
+                (assessment_id,),
+            ).fetchone()
+        return (row[0], db.report_from_row(row[1:])) if row else None
+
+    def history(self, limit: int = 50, cursor=None, **filters):
+        where, params = _where(**filters)
+        if cursor is not None:
+            where.append("(created_ts, id) < (%s, %s)")
+            params.extend(cursor)
+        sql = f"SELECT {_SUMMARY_COLUMNS}, created_ts FROM assessments"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_ts DESC, id DESC LIMIT %s"
+        params.append(limit)
+
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        next_cursor = (rows[-1][9], rows[-1][0]) if len(rows) == limit else None
+        return [row[:9] for row in rows], next_cursor
+
+    def iter_reports(self, batch_size: int = 200, **filters) -> Iterator[Tuple]:
+        where, params = _where(**filters)
+        sql = f"SELECT id, created_at, company_name, {db.REPORT_COLUMNS} FROM assessments"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_ts DESC, id DESC"
+
+        # Cursore con nome = lato server; vive nella transazione della connessione
+        with self._connection() as conn, conn.cursor(name="iter_assessment_reports") as cur:
+            cur.itersize = batch_size
+            cur.execute(sql, params)
+            for row in cur:
+                yield (*row[:3], db.report_from_row(row[3:]))
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("TRUNCATE assessments")
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
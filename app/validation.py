@@ -0,0 +1,162 @@
+# app/validation.py
+
+"""
+Validazione veloce dei questionari (AssessmentRequest e derivati).
+
+RequestValidator legge una volta sola i campi del modello pydantic e li
+compila in una tabella: per ogni campo a scelta (Literal) la mappa valore
+ammesso -> codice di app.rules, per ogni campo a scelta multipla (List di
+Literal) la mappa valore -> bit, per le stringhe la lunghezza massima. La
+validazione di un corpo JSON è quindi un ciclo di lookup che produce insieme:
+
+- answers: lo stesso dict di model.model_dump() (campi nell'ordine del
+  modello, default inclusi, liste copiate)
+- key: la forma codificata delle risposte (scoring_cache.answers_key),
+  usata come chiave della cache e come ETag senza ricodificare
+
+Il percorso veloce accetta solo input che pydantic accetterebbe senza
+conversioni; per tutto il resto (valori non ammessi, campi mancanti, tipi
+diversi) la validazione passa al modello pydantic, che solleva la stessa
+ValidationError di sempre o, per le conversioni lax, ne restituisce il
+risultato. Il modello resta quindi la definizione del contratto (e dello
+schema OpenAPI): cambiarlo cambia anche il validatore.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type, Union, get_args, get_origin
+
+from annotated_types import MaxLen
+from pydantic import BaseModel
+
+from .metrics import METRICS_ENABLED, VALIDATION_SECONDS
+from .rules import FIELD_VALUES, MULTI_FIELDS, encode_multi, encode_value
+from .schemas import AssessmentRequest, PersistedAssessmentRequest
+from .scoring_cache import AnswersKey, answers_key
+
+# Tipi di campo compilati
+_CHOICE = 0
+_MULTI = 1
+_TEXT = 2
+
+# Posizione di ogni campo del vocabolario nella answers_key
+_KEY_SLOTS: Dict[str, int] = {
+    field: i for i, field in enumerate((*FIELD_VALUES, *MULTI_FIELDS))
+}
+
+_MISSING: Any = object()
+
+
+@dataclass(frozen=True, slots=True)
+class ValidatedAnswers:
+    answers: Dict[str, Any]
+    key: AnswersKey
+
+
+# (nome, tipo, codici ammessi / lunghezza massima, posizione nella key, default)
+_FieldSpec = Tuple[str, int, Any, Optional[int], Any]
+
+
+def _compile_field(name: str, field: Any) -> _FieldSpec:
+    annotation = field.annotation
+    origin = get_origin(annotation)
+    slot = _KEY_SLOTS.get(name)
+    default = _MISSING if field.is_required() else field.get_default(call_default_factory=True)
+
+    if origin is Literal:
+        # Valori fuori dal vocabolario di app.rules: codice 0, come encode_value
+        codes = {
+            value: encode_value(name, value) if name in FIELD_VALUES else 0
+            for value in get_args(annotation)
+        }
+        if default is not _MISSING:
+            default = (default, codes[default])
+        return name, _CHOICE, codes, slot, default
+
+    if origin is list and get_origin(get_args(annotation)[0]) is Literal:
+        values = get_args(get_args(annotation)[0])
+        bits = {
+            value: encode_multi(name, [value]) if name in MULTI_FIELDS else 0
+            for value in values
+        }
+        return name, _MULTI, bits, slot, default
+
+    if origin is Union and set(get_args(annotation)) == {str, type(None)}:
+        max_length = next(
+            (m.max_length for m in field.metadata if isinstance(m, MaxLen)), None
+        )
+        return name, _TEXT, max_length, None, default
+
+    raise TypeError(f"Campo {name}: tipo {annotation} non supportato dal validatore veloce")
+
+
+class RequestValidator:
+    """Validatore precompilato di un modello di questionario."""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self._fields = tuple(
+            _compile_field(name, field) for name, field in model.model_fields.items()
+        )
+
+    def validate(self, data: Any) -> ValidatedAnswers:
+        """
+        Valida un corpo JSON già decodificato. Solleva
+        pydantic.ValidationError come model.model_validate.
+        """
+        start = time.perf_counter()
+        validated = self._validate_fast(data) if type(data) is dict else None
+        if validated is None:
+            # Misurato dal validatore del modello (timed_validation)
+            return self._validate_model(data)
+        if METRICS_ENABLED:
+            VALIDATION_SECONDS.observe(time.perf_counter() - start, self.model.__name__)
+        return validated
+
+    def _validate_fast(self, data: Dict[str, Any]) -> Optional[ValidatedAnswers]:
+        answers: Dict[str, Any] = {}
+        key: List[int] = [0] * len(_KEY_SLOTS)
+        get = data.get
+        try:
+            for name, kind, allowed, slot, default in self._fields:
+                value = get(name, _MISSING)
+                if kind == _CHOICE:
+                    if value is _MISSING:
+                        if default is _MISSING:
+                            return None
+                        value, code = default
+                    else:
+                        code = allowed[value]
+                elif kind == _MULTI:
+                    if value is _MISSING:
+                        value = []
+                    elif type(value) is not list:
+                        return None
+                    code = 0
+                    for item in value:
+                        code |= allowed[item]
+                    value = list(value)
+                else:
+                    if value is _MISSING:
+                        value = default
+                    elif value is not None and (
+                        type(value) is not str or (allowed is not None and len(value) > allowed)
+                    ):
+                        return None
+                answers[name] = value
+                if slot is not None:
+                    key[slot] = code
+        except (KeyError, TypeError):
+            # Valore non ammesso o non confrontabile (es. una lista in un Literal)
+            return None
+        return ValidatedAnswers(answers, tuple(key))
+
+    def _validate_model(self, data: Any) -> ValidatedAnswers:
+        # from_attributes come la validazione del corpo in FastAPI (stessi errori)
+        answers = self.model.model_validate(data, from_attributes=True).model_dump()
+        return ValidatedAnswers(answers, answers_key(answers))
+
+
+assessment_validator = RequestValidator(AssessmentRequest)
+persisted_assessment_validator = RequestValidator(PersistedAssessmentRequest)
+
@@ -0,0 +1,156 @@
+# app/vectorized.py
+
+"""
+Motore di scoring vettoriale (NumPy) basato sulla tabella di regole app.rules.
+
+Le risposte vengono codificate per colonne (un int8 per ogni campo a scelta
+singola, una bitmask uint8 per ogni campo a scelta multipla). Ogni gruppo di
+regole (dominio, condizione di attivazione, campo) viene compilato in una
+tabella "codice -> punti", così che lo scoring di un intero batch si riduca a
+un'indicizzazione per gruppo più qualche somma tra array.
+
+Il risultato è identico a quello di compute_risk (stesse operazioni in virgola
+mobile, nello stesso ordine). L'equivalenza è verificata da
+tests/test_vectorized.py.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rules import (
+    ANY,
+    DOMAINS,
+    FIELD_VALUES,
+    GATES,
+    MULTI_FIELDS,
+    RULES,
+    encode_multi,
+    encode_value,
+    field_cardinality,
+)
+from .scoring import GEO_MULTIPLIERS, SIZE_MULTIPLIERS
+
+RISK_CLASSES = np.array(["Low", "Medium", "High", "Critical"])
+_RISK_THRESHOLDS = np.array([30.0, 60.0, 80.0])
+
+
+# -------------------------------------------------------------------
+#  Codifica per colonne
+# -------------------------------------------------------------------
+
+
+def encode_batch(answers_list: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Codifica una lista di risposte in un dizionario campo -> colonna."""
+    n = len(answers_list)
+    columns: Dict[str, np.ndarray] = {}
+    for field in FIELD_VALUES:
+        columns[field] = np.fromiter(
+            (encode_value(field, a.get(field)) for a in answers_list),
+            dtype=np.int8,
+            count=n,
+        )
+    for field in MULTI_FIELDS:
+        columns[field] = np.fromiter(
+            (encode_multi(field, a.get(field)) for a in answers_list),
+            dtype=np.uint8,
+            count=n,
+        )
+    return columns
+
+
+# -------------------------------------------------------------------
+#  Compilazione delle regole
+# -------------------------------------------------------------------
+
+_GroupKey = Tuple[str, Optional[str], str]
+
+
+def _compile_tables() -> Dict[_GroupKey, np.ndarray]:
+    tables: Dict[_GroupKey, np.ndarray] = {}
+    for rule in RULES:
+        key = (rule.domain, rule.gate, rule.field)
+        table = tables.get(key)
+        if table is None:
+            table = tables[key] = np.zeros(field_cardinality(rule.field))
+        for code in range(len(table)):
+            if rule.matches_code(code):
+                table[code] += rule.points
+    return tables
+
+
+def _multiplier_table(field: str, multipliers: Dict[str, float]) -> np.ndarray:
+    return np.array([1.0] + [multipliers[value] for value in FIELD_VALUES[field]])
+
+
+_TABLES = _compile_tables()
+_SIZE_MULT = _multiplier_table("company_size", SIZE_MULTIPLIERS)
+_GEO_MULT = _multiplier_table("geography", GEO_MULTIPLIERS)
+
+
+def _gate_mask(gate: str, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    field, value = GATES[gate]
+    if value == ANY:
+        return columns[field] != 0
+    return columns[field] == encode_value(field, value)
+
+
+# -------------------------------------------------------------------
+#  Scoring
+# -------------------------------------------------------------------
+
+
+def score_batch(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Calcola i punteggi di un batch codificato con encode_batch.
+
+    Ritorna un dizionario con le stesse chiavi di RiskResult (ai_risk,
+    gdpr_risk, operational_risk, urgency_risk, final_score, risk_class),
+    ciascuna con un array di lunghezza pari al batch.
+    """
+    n = len(columns["company_size"])
+
+    partial: Dict[Tuple[str, Optional[str]], np.ndarray] = {}
+    for (domain, gate, field), table in _TABLES.items():
+        contrib = table[columns[field]]
+        key = (domain, gate)
+        partial[key] = partial[key] + contrib if key in partial else contrib
+
+    scores = {domain: np.zeros(n) for domain in DOMAINS}
+    for (domain, gate), values in partial.items():
+        if gate is not None:
+            values = np.where(_gate_mask(gate, columns), values, 0.0)
+        scores[domain] += values
+
+    ai_risk = np.clip(scores["ai"], 0.0, 100.0)
+    gdpr_risk = np.clip(scores["gdpr"], 0.0, 100.0)
+    operational_risk = np.clip(scores["operational"], 0.0, 100.0)
+    urgency_risk = np.clip(scores["urgency"], 0.0, 100.0)
+
+    # Stessi pesi e stesso ordine delle operazioni di compute_risk
+    base_score = (
+        0.35 * ai_risk
+        + 0.35 * gdpr_risk
+        + 0.20 * operational_risk
+        + 0.10 * urgency_risk
+    )
+    final_score = np.clip(
+        base_score * _SIZE_MULT[columns["company_size"]] * _GEO_MULT[columns["geography"]],
+        0.0,
+        100.0,
+    )
+    risk_class = RISK_CLASSES[np.searchsorted(_RISK_THRESHOLDS, final_score, side="left")]
+
+    return {
+        "ai_risk": ai_risk,
+        "gdpr_risk": gdpr_risk,
+        "operational_risk": operational_risk,
+        "urgency_risk": urgency_risk,
+        "final_score": final_score,
+        "risk_class": risk_class,
+    }
+
+
+def score_answers(answers_list: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Scorciatoia: encode_batch + score_batch."""
+    return score_batch(encode_batch(answers_list))
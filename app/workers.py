@@ -0,0 +1,100 @@
+# app/workers.py
+
+"""
+Pool di processi condiviso per il lavoro CPU-bound (scoring in batch, ecc.).
+
+Il pool viene creato alla prima richiesta e riutilizzato per tutta la vita
+del processo, così che le richieste successive non paghino il costo di avvio
+dei worker.
+
+Se un worker muore (es. OOM) il pool diventa inutilizzabile
+(BrokenProcessPool): submit_to_pool lo scarta, ne crea uno nuovo e ritenta
+il task una volta, così un crash non blocca batch ed export fino al riavvio.
+"""
+
+import atexit
+import os
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Callable, Optional
+
+# Numero di processi worker (default: tutti i core disponibili)
+WORKER_PROCESSES = int(os.environ.get("APP_WORKER_PROCESSES", "0")) or (os.cpu_count() or 1)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Ritorna il pool di processi condiviso, creandolo se necessario."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES)
+    return _pool
+
+
+def reset_process_pool(broken: ProcessPoolExecutor) -> None:
+    """Scarta il pool rotto, se non è già stato sostituito da un altro task."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+
+
+def submit_to_pool(fn: Callable[..., Any], *args: Any) -> Future:
+    """
+    Come get_process_pool().submit(fn, *args), ma se il pool è rotto (al
+    momento dell'invio o durante l'esecuzione) lo ricrea e ritenta una volta.
+    Cancellare il Future ritornato cancella anche il task nel pool.
+    """
+    outer: Future = Future()
+
+    def submit(retry: bool) -> None:
+        pool = get_process_pool()
+        try:
+            inner = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            reset_process_pool(pool)
+            if retry:
+                submit(False)
+            else:
+                outer.set_exception(BrokenProcessPool("Pool di processi rotto anche dopo il riavvio"))
+            return
+        outer.add_done_callback(lambda done: done.cancelled() and inner.cancel())
+        inner.add_done_callback(lambda done: finish(pool, done, retry))
+
+    def finish(pool: ProcessPoolExecutor, inner: Future, retry: bool) -> None:
+        if inner.cancelled():
+            outer.cancel()
+            return
+        exc = inner.exception()
+        if isinstance(exc, BrokenProcessPool) and retry:
+            reset_process_pool(pool)
+            if not outer.cancelled():
+                submit(False)
+            return
+        try:
+            if exc is not None:
+                outer.set_exception(exc)
+            else:
+                outer.set_result(inner.result())
+        except InvalidStateError:
+            pass  # outer cancellato nel frattempo
+
+    submit(True)
+    return outer
+
+
+def shutdown_process_pool() -> None:
+    """Chiude il pool (se avviato) attendendo i task in corso."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+atexit.register(shutdown_process_pool)
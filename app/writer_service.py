@@ -0,0 +1,250 @@
+# app/writer_service.py
+
+"""
+Modalità multi-worker: un solo processo scrittore per il file SQLite.
+
+Con più worker uvicorn/gunicorn ogni processo avrebbe il proprio scrittore
+e le transazioni si contenderebbero il lock del database. In questa
+modalità:
+
+- un processo scrittore (serve_writer) applica le migrazioni, ascolta su un
+  socket Unix e passa le valutazioni ricevute al suo AssessmentWriter, che
+  le scrive in batch con un commit condiviso anche tra worker diversi
+- i worker, con APP_WRITER_ADDRESS impostata, inviano le righe al processo
+  scrittore (RemoteWriter) e aprono il DB in sola lettura per le query
+
+La preparazione della riga (JSON, codifica delle risposte) resta nel worker:
+al processo scrittore arriva solo la tupla da inserire.
+
+Avvio con gunicorn (scrittore e preload gestiti da gunicorn.conf.py):
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Avvio manuale (es. uvicorn --workers):
+
+    python -m app.writer_service --address /tmp/assessments.sock &
+    APP_WRITER_ADDRESS=/tmp/assessments.sock uvicorn app.main:app --workers 4
+"""
+
+import argparse
+import itertools
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, Optional
+
+# Chiave condivisa per l'handshake (opzionale: il socket è già protetto dai
+# permessi del file)
+WRITER_AUTHKEY = os.environ.get("APP_WRITER_AUTHKEY", "").encode() or None
+
+
+class WriterError(RuntimeError):
+    """Errore riportato dal processo scrittore."""
+
+
+def default_writer_address(db_path: Any) -> str:
+    """Socket di default accanto al file del database."""
+    return f"{db_path}.writer.sock"
+
+
+# -------------------------------------------------
+# Lato worker
+# -------------------------------------------------
+
+
+class RemoteWriter:
+    """
+    Stessa interfaccia di db.AssessmentWriter (submit / flush / close), ma
+    le righe vengono inviate al processo scrittore.
+
+    Ogni processo apre la propria connessione alla prima richiesta (anche
+    dopo un fork). Le richieste concorrenti dei thread del worker viaggiano
+    sulla stessa connessione; un thread dedicato riceve le risposte e
+    risolve i Future corrispondenti.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        authkey: Optional[bytes] = WRITER_AUTHKEY,
+        on_written: Optional[Callable[[], None]] = None,
+    ):
+        self.address = address
+        self.authkey = authkey
+        self.on_written = on_written
+        self._conn: Optional[Connection] = None
+        self._pid: Optional[int] = None
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _connection(self) -> Connection:
+        # Da chiamare con self._lock acquisito
+        if self._conn is None or self._pid != os.getpid():
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._conn, self._pid, self._pending = conn, os.getpid(), {}
+            threading.Thread(
+                target=self._receive, args=(conn, self._pending), name="writer-client", daemon=True
+            ).start()
+        return self._conn
+
+    def _call(self, op: str, *args: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            try:
+                conn = self._connection()
+                self._pending[request_id] = future
+                conn.send((op, request_id, *args))
+            except (OSError, EOFError) as exc:
+                self._conn = None
+                self._pending.pop(request_id, None)
+                future.set_exception(WriterError(f"Processo scrittore non raggiungibile: {exc}"))
+        return future
+
+    def _receive(self, conn: Connection, pending: Dict[int, Future]) -> None:
+        while True:
+            try:
+                request_id, ok, value = conn.recv()
+            except (OSError, EOFError):
+                break
+            future = pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                if self.on_written is not None:
+                    self.on_written()
+                future.set_result(value)
+            else:
+                future.set_exception(WriterError(value))
+
+        # Connessione persa: le richieste in attesa falliscono, la prossima riconnette
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+        for future in list(pending.values()):
+            future.set_exception(WriterError("Connessione al processo scrittore interrotta"))
+        pending.clear()
+
+    def submit(self, row, durable: bool = False) -> Future:
+        return self._call("submit", row, durable)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        self._call("flush").result(timeout)
+
+    def clear(self) -> None:
+        """Cancella tutte le valutazioni (eseguito dal processo scrittore)."""
+        self._call("clear").result()
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None and self._pid == os.getpid():
+            conn.close()
+
+
+# -------------------------------------------------
+# Processo scrittore
+# -------------------------------------------------
+
+
+def _serve_client(conn: Connection) -> None:
+    from . import db
+
+    send_lock = threading.Lock()
+
+    def reply(request_id: int, ok: bool, value: Any) -> None:
+        with send_lock:
+            try:
+                conn.send((request_id, ok, value))
+            except OSError:
+                pass  # worker terminato
+
+    def resolve(request_id: int, future: Future) -> None:
+        exc = future.exception()
+        if exc is None:
+            reply(request_id, True, future.result())
+        else:
+            reply(request_id, False, f"{type(exc).__name__}: {exc}")
+
+    while True:
+        try:
+            op, request_id, *args = conn.recv()
+        except (OSError, EOFError):
+            break
+        try:
+            if op == "submit":
+                # Risposta quando il batch è scritto; intanto si leggono altre richieste
+                future = db.submit_assessment_row(*args)
+                future.add_done_callback(partial(resolve, request_id))
+                continue
+            if op == "flush":
+                db.flush_assessments()
+            elif op == "clear":
+                db.clear_all_assessments()
+            else:
+                raise ValueError(f"Operazione sconosciuta: {op}")
+            reply(request_id, True, None)
+        except Exception as exc:
+            reply(request_id, False, f"{type(exc).__name__}: {exc}")
+    conn.close()
+
+
+def serve_writer(address: str, authkey: Optional[bytes] = WRITER_AUTHKEY) -> None:
+    """
+    Esegue il processo scrittore: migrazioni, poi un thread per ogni worker
+    connesso. Termina con SIGTERM / SIGINT dopo aver scritto le righe in coda.
+    """
+    from . import db
+
+    db.use_local_writer()
+    db.init_db()
+
+    if os.path.exists(address):
+        os.unlink(address)  # socket rimasto da un'esecuzione precedente
+    listener = Listener(address, family="AF_UNIX", authkey=authkey)
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                continue  # handshake fallito (es. authkey errata)
+            threading.Thread(target=_serve_client, args=(conn,), daemon=True).start()
+    finally:
+        listener.close()
+        db.flush_assessments()
+
+
+def wait_for_writer(
+    address: str, timeout: float = 30.0, authkey: Optional[bytes] = WRITER_AUTHKEY
+) -> None:
+    """Attende che il processo scrittore accetti connessioni (migrazioni finite)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            Client(address, family="AF_UNIX", authkey=authkey).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise WriterError(f"Il processo scrittore non risponde su {address}")
+            time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    from . import db
+
+    parser = argparse.ArgumentParser(description="Processo scrittore per la modalità multi-worker.")
+    parser.add_argument("--address", default=default_writer_address(db.DB_PATH))
+    args = parser.parse_args()
+    print(f"Processo scrittore in ascolto su {args.address} (DB: {db.DB_PATH})")
+    serve_writer(args.address)
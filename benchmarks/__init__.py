@@ -0,0 +1,6 @@
+# benchmarks/__init__.py
+
+"""
+Benchmark del progetto. Ogni modulo si lancia dalla root con
+`python -m benchmarks.<nome>`.
+"""
@@ -0,0 +1,152 @@
+# benchmarks/bench_db_writers.py
+
+"""
+Throughput di scrittura con N writer concorrenti (thread), prima e dopo il
+pool di connessioni:
+
+- "before": una connessione nuova per ogni scrittura, journal di default
+  (l'implementazione originale di log_assessment)
+- "after": app.db.log_assessment (pool + WAL + busy timeout, group commit)
+- "bulk": app.db.log_assessment(durable=False) + flush_assessments()
+
+Uso:
+
+    python -m benchmarks.bench_db_writers --writers 1 4 8 16 --writes 200
+"""
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import app.db as db
+from app.scoring import compute_risk
+
+from .profiles import MEDIUM_RISK
+
+_INSERT_SQL = """
+    INSERT INTO assessments (
+        created_at, company_name, final_score, risk_class, ai_risk, gdpr_risk,
+        operational_risk, urgency_risk, answers_json, report_text
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS assessments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at TEXT NOT NULL,
+        company_name TEXT,
+        final_score REAL NOT NULL,
+        risk_class TEXT NOT NULL,
+        ai_risk REAL NOT NULL,
+        gdpr_risk REAL NOT NULL,
+        operational_risk REAL NOT NULL,
+        urgency_risk REAL NOT NULL,
+        answers_json TEXT NOT NULL,
+        report_text TEXT NOT NULL
+    );
+"""
+
+
+def _legacy_log(path, company_name, answers, result):
+    # Copia dell'implementazione originale: connect / insert / commit / close
+    conn = sqlite3.connect(path)
+    conn.execute(
+        _INSERT_SQL,
+        (
+            datetime.now().isoformat(timespec="seconds"),
+            company_name,
+            float(result.final_score),
+            str(result.risk_class),
+            float(result.ai_risk),
+            float(result.gdpr_risk),
+            float(result.operational_risk),
+            float(result.urgency_risk),
+            json.dumps(answers, ensure_ascii=False),
+            result.report,
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _run(writers, writes, log):
+    errors = []
+    barrier = threading.Barrier(writers + 1)
+
+    def worker(n):
+        barrier.wait()
+        for i in range(writes):
+            try:
+                log(f"writer-{n}", i)
+            except sqlite3.OperationalError as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    ok = writers * writes - len(errors)
+    return ok / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--writes", type=int, default=200, help="scritture per writer")
+    args = parser.parse_args()
+
+    answers = MEDIUM_RISK
+    result = compute_risk(answers)
+
+    print(
+        f"{'writers':>8} {'before (w/s)':>14} {'err':>5} "
+        f"{'after (w/s)':>13} {'err':>5} {'bulk (w/s)':>12}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for writers in args.writers:
+            legacy_path = Path(tmp) / f"legacy_{writers}.db"
+            conn = sqlite3.connect(legacy_path)
+            conn.execute(_CREATE_SQL)
+            conn.close()
+            before, before_err = _run(
+                writers,
+                args.writes,
+                lambda name, i: _legacy_log(legacy_path, name, answers, result),
+            )
+
+            db.DB_PATH = Path(tmp) / f"pooled_{writers}.db"
+            db.init_db()
+            after, after_err = _run(
+                writers,
+                args.writes,
+                lambda name, i: db.log_assessment(name, answers, result),
+            )
+
+            start = time.perf_counter()
+            _run(
+                writers,
+                args.writes,
+                lambda name, i: db.log_assessment(name, answers, result, durable=False),
+            )
+            db.flush_assessments()
+            bulk = writers * args.writes / (time.perf_counter() - start)
+            db.close_connections()
+
+            print(
+                f"{writers:>8} {before:>14.0f} {before_err:>5} "
+                f"{after:>13.0f} {after_err:>5} {bulk:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/bench_pdf_layout.py
+
+"""
+Rendering di report PDF multipagina, prima e dopo il motore di impaginazione:
+
+- "before": il ciclo originale di build_pdf_from_report (riga ricostruita e
+  rimisurata con stringWidth a ogni parola)
+- "after": app.pdf_utils.build_pdf_from_report (app.pdf_layout)
+
+Prima di misurare verifica che i due percorsi producano PDF identici
+(con rl_config.invariant, che rende deterministico l'output di ReportLab).
+
+Uso:
+
+    python -m benchmarks.bench_pdf_layout --reports 1000
+"""
+
+import argparse
+import random
+import time
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab import rl_config
+
+from app.pdf_layout import get_metrics, wrap_text
+from app.pdf_utils import build_pdf_from_report
+from app.rules import random_answers
+from app.scoring import compute_risk
+
+
+def _legacy_build_pdf(company_name, report_text):
+    # Copia dell'implementazione originale di build_pdf_from_report
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+
+    x_margin = 20 * mm
+    y_margin = 20 * mm
+    y = height - y_margin
+
+    c.setFont("Helvetica-Bold", 14)
+    title = "Valutazione Rischi AI & Dati"
+    c.drawString(x_margin, y, title)
+    y -= 12 * mm
+
+    if company_name:
+        c.setFont("Helvetica", 11)
+        c.drawString(x_margin, y, f"Azienda: {company_name}")
+        y -= 10 * mm
+
+    c.setFont("Helvetica", 10)
+    max_width = width - 2 * x_margin
+    for paragraph in report_text.split("\n"):
+        words = paragraph.split(" ")
+        line = ""
+        for word in words:
+            test_line = f"{line} {word}".strip()
+            if c.stringWidth(test_line, "Helvetica", 10) <= max_width:
+                line = test_line
+            else:
+                c.drawString(x_margin, y, line)
+                y -= 5 * mm
+                line = word
+                if y < y_margin:
+                    c.showPage()
+                    y = height - y_margin
+                    c.setFont("Helvetica", 10)
+        if line:
+            c.drawString(x_margin, y, line)
+            y -= 5 * mm
+            if y < y_margin:
+                c.showPage()
+                y = height - y_margin
+                c.setFont("Helvetica", 10)
+
+    c.showPage()
+    c.save()
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def _legacy_wrap(report_text, max_width):
+    # Solo il ciclo di a capo dell'implementazione originale
+    c = canvas.Canvas(BytesIO(), pagesize=A4)
+    lines = []
+    for paragraph in report_text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            test_line = f"{line} {word}".strip()
+            if c.stringWidth(test_line, "Helvetica", 10) <= max_width:
+                line = test_line
+            else:
+                lines.append(line)
+                line = word
+        if line:
+            lines.append(line)
+    return lines
+
+
+def make_reports(count, seed=0):
+    """
+    Report multipagina realistici: più report di compute_risk concatenati,
+    con paragrafi lunghi (motivi uniti in un'unica riga) e qualche caso
+    limite (righe vuote, spazi doppi, parole più larghe della pagina).
+    """
+    rng = random.Random(seed)
+    reports = []
+    for i in range(count):
+        parts = []
+        for _ in range(rng.randint(3, 6)):
+            result = compute_risk(random_answers(rng, missing_rate=0.1))
+            parts.append(result.report)
+            parts.append(" ".join(result.reasons))
+        if i % 10 == 0:
+            parts.append("  doppio  spazio\n\n" + "x" * 150 + " fine\t")
+        reports.append((f"Cliente {i}", "\n".join(parts)))
+    return reports
+
+
+def _throughput(fn, reports):
+    start = time.perf_counter()
+    for company_name, report_text in reports:
+        fn(company_name, report_text)
+    return len(reports) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--reports", type=int, default=1000)
+    args = parser.parse_args()
+
+    reports = make_reports(args.reports)
+    max_width = A4[0] - 2 * 20 * mm
+    metrics = get_metrics("Helvetica", 10)
+
+    rl_config.invariant = 1
+    try:
+        for company_name, report_text in reports:
+            if _legacy_build_pdf(company_name, report_text) != build_pdf_from_report(
+                company_name, report_text
+            ):
+                raise AssertionError(f"PDF diversi per {company_name}")
+    finally:
+        rl_config.invariant = 0
+
+    pages = sum(
+        build_pdf_from_report(company_name, report_text).count(b"/Type /Page\n")
+        for company_name, report_text in reports[:50]
+    ) / min(50, len(reports))
+    print(f"{len(reports)} report, ~{pages:.1f} pagine ciascuno, output identico\n")
+
+    wrap_before = _throughput(lambda _, text: _legacy_wrap(text, max_width), reports)
+    wrap_after = _throughput(lambda _, text: wrap_text(text, metrics, max_width), reports)
+    pdf_before = _throughput(_legacy_build_pdf, reports)
+    pdf_after = _throughput(build_pdf_from_report, reports)
+
+    print(f"{'':>12} {'before (rep/s)':>15} {'after (rep/s)':>14} {'speedup':>8}")
+    print(f"{'a capo':>12} {wrap_before:>15.0f} {wrap_after:>14.0f} {wrap_after / wrap_before:>7.1f}x")
+    print(f"{'PDF intero':>12} {pdf_before:>15.0f} {pdf_after:>14.0f} {pdf_after / pdf_before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
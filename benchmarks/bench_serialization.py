@@ -0,0 +1,138 @@
+# benchmarks/bench_serialization.py
+
+"""
+RiskResult e serializzazione delle risposte, prima e dopo:
+
+- "before": dataclass con __dict__ (report e motivi come campi) copiata in
+  AssessmentResponse e serializzata da JSONResponse, come faceva /assess
+- "after": RiskResult slotted e immutabile, serializzato da
+  app.serialization.result_to_json
+
+Prima di misurare verifica che i due percorsi producano gli stessi byte.
+L'allocazione è misurata con tracemalloc tenendo in vita i risultati creati.
+I questionari si estraggono da un insieme di --distinct casi (invii ripetuti,
+come nel traffico reale); con --distinct uguale a --results sono tutti diversi.
+
+Uso:
+
+    python -m benchmarks.bench_serialization --results 50000
+    python -m benchmarks.bench_serialization --results 20000 --distinct 20000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List
+
+from starlette.responses import JSONResponse
+
+from app.rules import random_answers
+from app.schemas import AssessmentResponse
+from app.scoring import RiskResult, compute_risk
+from app.serialization import result_to_json
+
+
+@dataclass
+class LegacyRiskResult:
+    # Copia del RiskResult originale
+    ai_risk: float
+    gdpr_risk: float
+    operational_risk: float
+    urgency_risk: float
+    final_score: float
+    risk_class: str
+    reasons: List[str]
+    reason_codes: List[int]
+    report: str
+
+
+def _legacy(result: RiskResult) -> LegacyRiskResult:
+    return LegacyRiskResult(
+        result.ai_risk,
+        result.gdpr_risk,
+        result.operational_risk,
+        result.urgency_risk,
+        result.final_score,
+        result.risk_class,
+        result.reasons,
+        list(result.reason_codes),
+        result.report,
+    )
+
+
+def _legacy_json(result: LegacyRiskResult) -> bytes:
+    response = AssessmentResponse(
+        ai_risk=result.ai_risk,
+        gdpr_risk=result.gdpr_risk,
+        operational_risk=result.operational_risk,
+        urgency_risk=result.urgency_risk,
+        final_score=result.final_score,
+        risk_class=result.risk_class,
+        reasons=result.reasons,
+        reason_codes=result.reason_codes,
+        report=result.report,
+    )
+    return JSONResponse(response.model_dump()).body
+
+
+def _bytes_per_result(factory, count: int) -> float:
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        kept = [factory(i) for i in range(count)]
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return (end - start) / count
+
+
+def _throughput(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--results", type=int, default=50_000)
+    parser.add_argument(
+        "--distinct", type=int, default=2000, help="questionari diversi tra cui si estrae"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = [random_answers(rng, missing_rate=0.1) for _ in range(args.distinct)]
+    results = [compute_risk(rng.choice(pool)) for _ in range(args.results)]
+    legacy = [_legacy(r) for r in results]
+    for new, old in zip(results, legacy):
+        if result_to_json(new) != _legacy_json(old):
+            raise AssertionError(f"JSON diversi per {new}")
+    print(f"{len(results)} risultati, JSON identico\n")
+
+    # Allocazione: ogni risultato costruito come nel codice, report compreso
+    # (il RiskResult originale lo generava e lo teneva per ogni istanza)
+    alloc_before = _bytes_per_result(lambda i: _legacy(results[i]), len(results))
+    alloc_after = _bytes_per_result(
+        lambda i: RiskResult(*(getattr(results[i], f) for f in RiskResult.__slots__)),
+        len(results),
+    )
+    json_before = _throughput(_legacy_json, legacy)
+    json_after = _throughput(result_to_json, results)
+
+    print(f"{'':>16} {'before':>12} {'after':>12} {'rapporto':>9}")
+    print(
+        f"{'byte/risultato':>16} {alloc_before:>12.0f} {alloc_after:>12.0f} "
+        f"{alloc_before / alloc_after:>8.1f}x"
+    )
+    print(
+        f"{'JSON (ris/s)':>16} {json_before:>12.0f} {json_after:>12.0f} "
+        f"{json_after / json_before:>8.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
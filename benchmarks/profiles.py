@@ -0,0 +1,96 @@
+# benchmarks/profiles.py
+
+"""
+Profili di risposte rappresentativi, usati dai benchmark.
+"""
+
+LOW_RISK = {
+    "company_size": "1_5",
+    "geography": "single_eu",
+    "uses_ai": "yes",
+    "ai_affects_individuals": "none",
+    "human_oversight": "always",
+    "ai_use_cases": ["chatbot"],
+    "ai_usage_clarity": "clear",
+    "processes_personal_data": "no",
+    "processes_sensitive_data": "no",
+    "data_location": "eu_only",
+    "third_party_access": "no",
+    "users_informed_ai": "not_applicable",
+    "ai_documentation": "full",
+    "policies": "full",
+    "risk_assessments": "regular",
+    "incident_response": "full",
+    "upcoming_changes": [],
+    "decision_criticality": "low",
+    "reg_issue_impact": "low",
+    "ai_training_done": "yes",
+    "ai_act_plan_status": "structured",
+}
+
+MEDIUM_RISK = {
+    "company_size": "6_20",
+    "geography": "multi_eu",
+    "uses_ai": "yes",
+    "ai_affects_individuals": "support",
+    "human_oversight": "sometimes",
+    "ai_use_cases": ["marketing", "analytics"],
+    "ai_usage_clarity": "clear",
+    "processes_personal_data": "yes",
+    "processes_sensitive_data": "no",
+    "data_location": "eu_only",
+    "third_party_access": "yes",
+    "users_informed_ai": "partial",
+    "ai_documentation": "partial",
+    "policies": "in_progress",
+    "risk_assessments": "occasional",
+    "incident_response": "partial",
+    "upcoming_changes": ["new_integrations"],
+    "decision_criticality": "medium",
+    "reg_issue_impact": "medium",
+    "ai_training_done": "planned",
+    "ai_act_plan_status": "informal",
+}
+
+HIGH_RISK = {
+    "company_size": "100_plus",
+    "geography": "eu_plus_third_countries",
+    "uses_ai": "yes",
+    "ai_affects_individuals": "direct",
+    "human_oversight": "none",
+    "ai_use_cases": ["hr", "scoring", "fraud"],
+    "ai_usage_clarity": "unknown",
+    "processes_personal_data": "yes",
+    "processes_sensitive_data": "yes",
+    "data_location": "eu_plus_third_countries",
+    "third_party_access": "yes",
+    "users_informed_ai": "no",
+    "ai_documentation": "none",
+    "policies": "none",
+    "risk_assessments": "none",
+    "incident_response": "none",
+    "upcoming_changes": ["new_ai_feature", "new_countries", "new_integrations"],
+    "decision_criticality": "high",
+    "reg_issue_impact": "high",
+    "ai_training_done": "no",
+    "ai_act_plan_status": "none",
+}
+
+# Profilo PIM + AI (attiva anche le regole specifiche del PIM)
+PIM_HEAVY = {
+    **MEDIUM_RISK,
+    "pim_ai_features": ["product_descriptions", "dynamic_pricing", "categorization"],
+    "pim_ai_transparency": "no",
+    "pim_ai_impact": "high",
+    "pim_ai_supervision_level": "limited",
+    "pim_training_data_source": ["web_scraped", "customer_data"],
+    "pim_copyright_policy": "none",
+    "pim_third_party_models": "extensive",
+}
+
+PROFILES = {
+    "low": LOW_RISK,
+    "medium": MEDIUM_RISK,
+    "high": HIGH_RISK,
+    "pim_heavy": PIM_HEAVY,
+}
@@ -0,0 +1,320 @@
+# benchmarks/suite.py
+
+"""
+Suite di benchmark di latenza e throughput, con confronto su una baseline.
+
+Misura:
+
+- compute_risk e compute_risk_fast sui profili rappresentativi (benchmarks.profiles)
+- build_pdf_from_report sui report di quei profili
+- log_assessment e get_recent_assessments su DB con 10k / 100k / 1M righe
+- un test di carico in-process di POST /assess (client ASGI, richieste
+  concorrenti)
+
+Per ogni caso riporta throughput (op/s) e latenze p50 / p95 / p99 (ms).
+I risultati si possono salvare come baseline JSON; nelle esecuzioni
+successive un caso con throughput inferiore o p95 superiore alla baseline
+oltre la soglia fa fallire la suite (exit code 1). Le baseline dipendono
+dalla macchina: vanno registrate sullo stesso hardware su cui si confronta.
+
+Uso:
+
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --threshold 0.2
+    python -m benchmarks.suite --only scoring pdf --rows 10000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import app.db as db
+from app.pdf_utils import build_pdf_from_report
+from app.lookup import compute_risk_fast
+from app.scoring import compute_risk
+from app.scoring_cache import answers_key
+
+from .profiles import PROFILES
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# Peggioramento relativo tollerato rispetto alla baseline
+DEFAULT_THRESHOLD = 0.25
+
+SECTIONS = ("scoring", "pdf", "db", "api")
+
+
+@dataclass
+class BenchResult:
+    name: str
+    ops: int
+    ops_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def _percentile(sorted_samples: List[float], q: float) -> float:
+    # Nearest-rank sui campioni ordinati
+    index = min(len(sorted_samples) - 1, max(0, round(q * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(name: str, samples: List[float], elapsed: Optional[float] = None) -> BenchResult:
+    """Riassume le latenze (secondi) di un caso; elapsed: durata totale se concorrente."""
+    ordered = sorted(samples)
+    total = elapsed if elapsed is not None else sum(samples)
+    return BenchResult(
+        name=name,
+        ops=len(samples),
+        ops_per_sec=len(samples) / total if total else 0.0,
+        p50_ms=_percentile(ordered, 0.50) * 1000,
+        p95_ms=_percentile(ordered, 0.95) * 1000,
+        p99_ms=_percentile(ordered, 0.99) * 1000,
+    )
+
+
+def timed(name: str, fn: Callable[[], object], repeat: int, warmup: int = 10) -> BenchResult:
+    """Esegue fn `repeat` volte in sequenza, misurando ogni chiamata."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        start = clock()
+        fn()
+        samples.append(clock() - start)
+    return summarize(name, samples)
+
+
+# -------------------------------------------------
+# Casi
+# -------------------------------------------------
+
+
+def bench_scoring(repeat: int) -> List[BenchResult]:
+    results = [
+        timed(f"compute_risk[{name}]", lambda answers=answers: compute_risk(answers), repeat)
+        for name, answers in PROFILES.items()
+    ]
+    # Percorso delle richieste: la answers_key arriva già dalla validazione
+    results.extend(
+        timed(f"compute_risk_fast[{name}]", lambda key=key: compute_risk_fast(key), repeat)
+        for name, key in ((name, answers_key(answers)) for name, answers in PROFILES.items())
+    )
+    return results
+
+
+def bench_pdf(repeat: int) -> List[BenchResult]:
+    results = []
+    for name, answers in PROFILES.items():
+        report = compute_risk(answers).report
+        results.append(
+            timed(
+                f"build_pdf[{name}]",
+                lambda report=report: build_pdf_from_report("Cliente benchmark", report),
+                repeat,
+                warmup=3,
+            )
+        )
+    return results
+
+
+def _seed(target_rows: int, rng: random.Random) -> None:
+    # Porta il DB a target_rows valutazioni con lo scrittore in modalità bulk
+    with db.pooled_connection() as conn:
+        current = conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+    prepared = [(answers, compute_risk(answers)) for answers in PROFILES.values()]
+    for i in range(current, target_rows):
+        answers, result = prepared[i % len(prepared)]
+        db.log_assessment(f"Cliente {rng.randrange(1000)}", answers, result, durable=False)
+    db.flush_assessments()
+
+
+def bench_db(rows: List[int], repeat: int) -> List[BenchResult]:
+    results = []
+    rng = random.Random(0)
+    answers = PROFILES["medium"]
+    result = compute_risk(answers)
+    previous_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        try:
+            db.init_db()
+            # Le dimensioni crescono sullo stesso DB: si aggiungono solo le righe mancanti
+            for size in sorted(rows):
+                start = time.perf_counter()
+                _seed(size, rng)
+                elapsed = time.perf_counter() - start
+                print(f"  DB con {size} righe pronto in {elapsed:.1f}s", file=sys.stderr)
+                label = f"{size // 1000}k" if size < 1_000_000 else f"{size // 1_000_000}M"
+                results.append(
+                    timed(
+                        f"log_assessment[{label}]",
+                        lambda: db.log_assessment("Cliente benchmark", answers, result),
+                        repeat,
+                    )
+                )
+                results.append(
+                    timed(
+                        f"get_recent_assessments[{label}]",
+                        lambda: db.get_recent_assessments(limit=50),
+                        repeat,
+                    )
+                )
+        finally:
+            db.flush_assessments()
+            db.close_connections()
+            db.DB_PATH = previous_path
+    return results
+
+
+def bench_api(requests: int, concurrency: int) -> List[BenchResult]:
+    import httpx
+    from pydantic import ValidationError
+
+    from app.main import app
+    from app.schemas import AssessmentRequest
+
+    # Solo i profili accettati dallo schema dell'API (es. "low" usa
+    # users_informed_ai="not_applicable", valido per lo scoring ma non per /assess)
+    payloads = []
+    for answers in PROFILES.values():
+        try:
+            AssessmentRequest(**answers)
+        except ValidationError:
+            continue
+        payloads.append(answers)
+
+    async def run() -> BenchResult:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for payload in payloads:
+                (await client.post("/assess", json=payload)).raise_for_status()
+
+            samples: List[float] = []
+            limit = asyncio.Semaphore(concurrency)
+
+            async def one(i: int) -> None:
+                async with limit:
+                    start = time.perf_counter()
+                    response = await client.post("/assess", json=payloads[i % len(payloads)])
+                    samples.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests)))
+            elapsed = time.perf_counter() - start
+        return summarize(f"POST /assess[c={concurrency}]", samples, elapsed)
+
+    return [asyncio.run(run())]
+
+
+# -------------------------------------------------
+# Baseline e regressioni
+# -------------------------------------------------
+
+
+def load_baseline(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["results"]
+
+
+def save_baseline(path: Path, results: List[BenchResult]) -> None:
+    data = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {r.name: asdict(r) for r in results},
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+def find_regressions(
+    results: List[BenchResult], baseline: Dict[str, dict], threshold: float
+) -> List[str]:
+    """Casi peggiorati oltre la soglia (throughput o p95) rispetto alla baseline."""
+    regressions = []
+    for r in results:
+        base = baseline.get(r.name)
+        if base is None:
+            continue
+        if r.ops_per_sec < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{r.name}: throughput {r.ops_per_sec:.0f} op/s (baseline {base['ops_per_sec']:.0f})"
+            )
+        if r.p95_ms > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{r.name}: p95 {r.p95_ms:.3f} ms (baseline {base['p95_ms']:.3f})")
+    return regressions
+
+
+def _print_table(results: List[BenchResult], baseline: Dict[str, dict]) -> None:
+    print(
+        f"{'caso':<34} {'op/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'vs base':>8}"
+    )
+    for r in results:
+        base = baseline.get(r.name)
+        delta = f"{r.ops_per_sec / base['ops_per_sec'] - 1:+.0%}" if base else "-"
+        print(
+            f"{r.name:<34} {r.ops_per_sec:>10.0f} {r.p50_ms:>9.3f} "
+            f"{r.p95_ms:>9.3f} {r.p99_ms:>9.3f} {delta:>8}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=1000, help="chiamate per caso (scoring, DB)")
+    parser.add_argument("--pdf-repeat", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000, help="richieste del test di carico")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, help="salva anche i risultati di questa esecuzione")
+    args = parser.parse_args()
+
+    results: List[BenchResult] = []
+    if "scoring" in args.only:
+        results += bench_scoring(args.repeat)
+    if "pdf" in args.only:
+        results += bench_pdf(args.pdf_repeat)
+    if "db" in args.only:
+        results += bench_db(args.rows, min(args.repeat, 200))
+    if "api" in args.only:
+        results += bench_api(args.requests, args.concurrency)
+
+    baseline = load_baseline(args.baseline)
+    _print_table(results, baseline)
+    if args.json:
+        save_baseline(args.json, results)
+
+    if args.save_baseline:
+        # Aggiorna solo i casi eseguiti, conservando gli altri
+        merged = {**baseline, **{r.name: asdict(r) for r in results}}
+        save_baseline(args.baseline, [BenchResult(**r) for r in merged.values()])
+        print(f"\nBaseline salvata in {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressioni oltre il {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    if baseline:
+        print(f"\nNessuna regressione oltre il {args.threshold:.0%}.")
+    else:
+        print(f"\nNessuna baseline in {args.baseline} (usa --save-baseline).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
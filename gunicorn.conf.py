@@ -0,0 +1,53 @@
+# gunicorn.conf.py
+
+"""
+Configurazione gunicorn per la modalità multi-worker (vedi app.writer_service):
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Il master avvia il processo scrittore e carica l'app prima del fork
+(preload_app), così i worker ne condividono lo stato; ogni worker
+invia le scritture al processo scrittore e legge il DB in sola lettura.
+"""
+
+import gc
+import multiprocessing
+import os
+
+# Va impostata prima di importare app.db (anche tramite preload_app)
+os.environ.setdefault(
+    "APP_WRITER_ADDRESS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "assessments.db.writer.sock"),
+)
+
+bind = os.environ.get("APP_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("APP_WEB_WORKERS", "0")) or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+_writer_process = None
+
+
+def on_starting(server):
+    global _writer_process
+    from app.writer_service import serve_writer, wait_for_writer
+
+    address = os.environ["APP_WRITER_ADDRESS"]
+    # spawn: il processo scrittore non eredita lo stato (e i thread) del master
+    context = multiprocessing.get_context("spawn")
+    _writer_process = context.Process(
+        target=serve_writer, args=(address,), name="assessment-writer", daemon=True
+    )
+    _writer_process.start()
+    # L'app è già importata (preload_app, incluse le tabelle di app.lookup):
+    # fuori dalle generazioni del GC, le sue pagine restano condivise con i
+    # worker invece di essere copiate alla prima raccolta
+    gc.freeze()
+    # I worker chiamano init_db all'avvio: lo scrittore deve essere già pronto
+    wait_for_writer(address)
+
+
+def on_exit(server):
+    if _writer_process is not None and _writer_process.is_alive():
+        _writer_process.terminate()  # SIGTERM: scrive le righe in coda ed esce
+        _writer_process.join(timeout=30)
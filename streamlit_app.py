@@ -4,12 +4,19 @@ import streamlit as st
 import pandas as pd
 
 from app.scoring import compute_risk
-from app.pdf_utils import build_pdf_from_report
+from app.aggregates import AGG_METRICS
+from app.report_cache import get_report_pdf
+from app.similarity import similar_high_risk
+from app.storage import STORAGE_BACKEND
 from app.db import (
     init_db,
     log_assessment,
-    get_recent_assessments,
     get_last_assessment,
+    get_assessment_history,
+    get_daily_stats,
+    get_stats,
+    get_drift_alerts,
+    data_version,
 )
 from app.config_pmi import (
     PMI_AI_FEATURES,
@@ -27,6 +34,18 @@ st.set_page_config(
     page_icon="🛡️",
 )
 
+# Aggregati, drift e Decision Memory leggono tabelle che esistono solo nel
+# file SQLite (vedi app.storage): con un altro backend le sezioni mostrano
+# un avviso al posto del contenuto
+SQLITE_FEATURES = STORAGE_BACKEND == "sqlite"
+
+
+def show_sqlite_only_notice(feature):
+    st.info(
+        f"{feature}: disponibile solo con il backend SQLite "
+        f"(APP_STORAGE={STORAGE_BACKEND})."
+    )
+
 
 def inject_css():
     st.markdown(
@@ -131,6 +150,115 @@ def show_risk_banner(result):
     )
 
 
+# -------------------------------------------------
+# Dati (cache)
+# -------------------------------------------------
+# Le funzioni ricevono la versione dei dati come primo argomento: finché
+# nessuno scrive nel DB, i rerun leggono dalla cache senza query né
+# costruzione di DataFrame. log_assessment / clear_all_assessments cambiano
+# la versione e quindi la chiave.
+HISTORY_COLUMNS = [
+    "ID",
+    "Data",
+    "Azienda",
+    "Punteggio",
+    "Classe",
+    "AI Act",
+    "GDPR / dati",
+    "Operativo / governance",
+    "Urgenza decisioni",
+]
+
+
+DRIFT_DOMAIN_LABELS = {
+    "ai_risk": "AI Act",
+    "gdpr_risk": "GDPR / dati",
+    "operational_risk": "Operativo / governance",
+    "urgency_risk": "Urgenza decisioni",
+}
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_dashboard_data(version, days=90):
+    """
+    Dati della dashboard: (ultima valutazione o None, punteggi per ambito
+    dell'ultima valutazione, DataFrame dell'andamento giornaliero indicizzato
+    per data, aggregati totali). L'andamento e i KPI vengono dagli aggregati
+    materializzati, non dalle righe dello storico.
+    """
+    last = get_last_assessment()
+    if last is None:
+        return None, None, None, None
+
+    domain_scores = pd.DataFrame(
+        {
+            "Ambito": [
+                "AI Act",
+                "GDPR / dati",
+                "Operativo / governance",
+                "Urgenza decisioni",
+            ],
+            "Punteggio": list(last[5:9]),
+        }
+    ).set_index("Ambito")
+    if not SQLITE_FEATURES:
+        return last, domain_scores, None, None
+
+    daily = get_daily_stats(days=days)
+    chart_df = pd.DataFrame(
+        [
+            [bucket.key, *(bucket.averages[m] for m in AGG_METRICS)]
+            for bucket in daily
+        ],
+        columns=[
+            "Data",
+            "Punteggio",
+            "AI Act",
+            "GDPR / dati",
+            "Operativo / governance",
+            "Urgenza decisioni",
+        ],
+    )
+    chart_df["Data"] = pd.to_datetime(chart_df["Data"])
+    return last, domain_scores, chart_df.set_index("Data"), get_stats()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_history_page(version, limit, cursor, filters):
+    """Una pagina dello storico: (DataFrame, cursore della pagina successiva)."""
+    rows, next_cursor = get_assessment_history(limit=limit, cursor=cursor, **filters)
+    return pd.DataFrame(rows, columns=HISTORY_COLUMNS), next_cursor
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_drift_alerts(version, limit=20):
+    """Aziende in drift (stato incrementale per azienda, senza rileggere lo storico)."""
+    alerts = get_drift_alerts(limit=limit)
+    return pd.DataFrame(
+        [
+            (
+                a.company_name,
+                a.assessments,
+                a.final_score,
+                a.slope,
+                a.rising_streak,
+                DRIFT_DOMAIN_LABELS.get(a.domain, a.domain),
+                a.domain_slope,
+            )
+            for a in alerts
+        ],
+        columns=[
+            "Azienda",
+            "Valutazioni",
+            "Ultimo punteggio",
+            "Pendenza",
+            "Aumenti consecutivi",
+            "Ambito in crescita",
+            "Pendenza ambito",
+        ],
+    )
+
+
 # -------------------------------------------------
 # Sidebar
 # -------------------------------------------------
@@ -170,8 +298,9 @@ if page == "🏠 Dashboard":
             """
         )
 
+    last, last_domain_scores, chart_df, totals = load_dashboard_data(data_version())
+
     with col_right:
-        last = get_last_assessment()
 
         st.markdown("### 📊 Ultima valutazione")
         if last is None:
@@ -186,10 +315,7 @@ if page == "🏠 Dashboard":
                 company_name,
                 final_score,
                 risk_class,
-                ai_risk,
-                gdpr_risk,
-                operational_risk,
-                urgency_risk,
+                *_,
             ) = last
 
             # KPI cards
@@ -227,59 +353,47 @@ if page == "🏠 Dashboard":
                     )
 
             st.markdown("#### Distribuzione per ambito (ultima valutazione)")
-
-            domain_scores = pd.DataFrame(
-                {
-                    "Ambito": [
-                        "AI Act",
-                        "GDPR / dati",
-                        "Operativo / governance",
-                        "Urgenza decisioni",
-                    ],
-                    "Punteggio": [
-                        ai_risk,
-                        gdpr_risk,
-                        operational_risk,
-                        urgency_risk,
-                    ],
-                }
-            )
-            st.bar_chart(domain_scores.set_index("Ambito"))
+            st.bar_chart(last_domain_scores)
+
+    # KPI complessivi (aggregati materializzati)
+    if not SQLITE_FEATURES:
+        st.markdown("### 🧮 Tutte le valutazioni")
+        show_sqlite_only_notice("KPI aggregati")
+    elif totals is not None:
+        st.markdown("### 🧮 Tutte le valutazioni")
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Valutazioni", f"{totals.assessments}")
+        k2.metric("Punteggio medio", f"{totals.averages['final_score']:.1f}")
+        k3.metric("High", f"{totals.risk_classes['High']}")
+        k4.metric("Critical", f"{totals.risk_classes['Critical']}")
 
     # Grafico storico
     st.markdown("### 📈 Andamento del rischio nel tempo")
 
-    rows_all = get_recent_assessments(limit=50)
-    if not rows_all:
+    if not SQLITE_FEATURES:
+        show_sqlite_only_notice("Andamento nel tempo")
+    elif chart_df is None:
         st.info("Non ci sono ancora abbastanza dati per mostrare l'andamento nel tempo.")
     else:
-        df_hist = pd.DataFrame(
-            rows_all,
-            columns=[
-                "ID",
-                "Data",
-                "Azienda",
-                "Punteggio",
-                "Classe",
-                "AI Act",
-                "GDPR / dati",
-                "Operativo / governance",
-                "Urgenza decisioni",
-            ],
-        )
-        df_hist["Data"] = pd.to_datetime(df_hist["Data"])
-        df_hist = df_hist.sort_values("Data")
-
-        chart_df = df_hist.set_index("Data")[
-            ["Punteggio", "AI Act", "GDPR / dati", "Operativo / governance", "Urgenza decisioni"]
-        ]
-
         st.line_chart(chart_df)
         st.caption(
-            "Ogni punto rappresenta una valutazione eseguita. "
+            "Ogni punto è la media delle valutazioni di un giorno. "
             "Puoi usare questo grafico per mostrare miglioramenti o peggioramenti nel tempo."
         )
 
+    st.markdown("### 📉 Drift di conformità")
+    drift_df = load_drift_alerts(data_version()) if SQLITE_FEATURES else None
+    if drift_df is None:
+        show_sqlite_only_notice("Drift di conformità")
+    elif drift_df.empty:
+        st.success("Nessuna azienda con punteggi in crescita su valutazioni successive.")
+    else:
+        st.dataframe(drift_df, hide_index=True, use_container_width=True)
+        st.caption(
+            "Aziende il cui punteggio è salito in più valutazioni consecutive. "
+            "La pendenza è la variazione media (pesata sulle più recenti) per valutazione."
+        )
+
     st.markdown("---")
     st.caption(
         "Suggerimento: usa questa dashboard in call per mostrare in 30 secondi "
@@ -798,8 +912,9 @@ elif page == "📝 Nuova valutazione":
             st.write("Nessun driver di rischio rilevante identificato.")
 
         # Log nel DB
+        assessment_id = None
         try:
-            log_assessment(
+            assessment_id = log_assessment(
                 company_name=company_name_input or None,
                 answers=answers,
                 result=result,
@@ -808,17 +923,39 @@ elif page == "📝 Nuova valutazione":
         except Exception as e:
             st.warning(f"⚠️ Non è stato possibile salvare la valutazione: {e}")
 
-        # PDF
-        pdf_bytes = build_pdf_from_report(
-            company_name=company_name_input or None,
-            report_text=result.report,
-        )
-        st.download_button(
-            label="📄 Scarica report in PDF",
-            data=pdf_bytes,
-            file_name="valutazione_rischi_ai_dati.pdf",
-            mime="application/pdf",
-        )
+        # Decision Memory: schemi di risposta già visti in casi ad alto rischio
+        if SQLITE_FEATURES:
+            similar = similar_high_risk(answers, exclude_id=assessment_id)
+        else:
+            show_sqlite_only_notice("Decision Memory")
+            similar = []
+        if similar:
+            best = similar[0]
+            st.warning(
+                f"🧠 Schema simile a {len(similar)} valutazion{'e' if len(similar) == 1 else 'i'} "
+                f"passat{'a' if len(similar) == 1 else 'e'} ad alto rischio "
+                f"(la più vicina: #{best.assessment_id}, classe {best.risk_class}, "
+                f"similarità {best.similarity:.0%})."
+            )
+
+        # PDF: viene generato solo se richiesto (vedi sotto)
+        st.session_state["pdf_report"] = (company_name_input or None, result.report)
+        st.session_state.pop("pdf_bytes", None)
+
+    # Il report resta disponibile anche dopo i rerun; il PDF viene creato al
+    # primo click e riusato dalla cache se lo stesso report è già stato reso
+    pdf_report = st.session_state.get("pdf_report")
+    if pdf_report is not None:
+        if "pdf_bytes" not in st.session_state:
+            if st.button("📄 Prepara report PDF"):
+                st.session_state["pdf_bytes"] = get_report_pdf(*pdf_report)
+        if "pdf_bytes" in st.session_state:
+            st.download_button(
+                label="📄 Scarica report in PDF",
+                data=st.session_state["pdf_bytes"],
+                file_name="valutazione_rischi_ai_dati.pdf",
+                mime="application/pdf",
+            )
 
 
 # -------------------------------------------------
@@ -827,28 +964,61 @@ elif page == "📝 Nuova valutazione":
 elif page == "📄 Storico & report":
     st.markdown("## 📄 Storico valutazioni")
 
-    rows = get_recent_assessments(limit=50)
-    if not rows:
-        st.info("Non ci sono ancora valutazioni salvate.")
-    else:
-        df = pd.DataFrame(
-            rows,
-            columns=[
-                "ID",
-                "Data",
-                "Azienda",
-                "Punteggio",
-                "Classe",
-                "AI Act",
-                "GDPR / dati",
-                "Operativo / governance",
-                "Urgenza decisioni",
-            ],
+    HISTORY_PAGE_SIZE = 50
+
+    col_f1, col_f2, col_f3 = st.columns(3)
+    with col_f1:
+        filter_company = st.text_input("Azienda (nome esatto)", value="").strip()
+    with col_f2:
+        filter_class = st.selectbox(
+            "Classe di rischio",
+            ["Tutte", "Low", "Medium", "High", "Critical"],
         )
+    with col_f3:
+        filter_dates = st.date_input("Intervallo di date", value=())
+
+    date_from = date_to = None
+    if len(filter_dates) == 2:
+        date_from, date_to = filter_dates
+    elif len(filter_dates) == 1:
+        date_from = filter_dates[0]
+
+    filters = {
+        "company_name": filter_company or None,
+        "risk_class": None if filter_class == "Tutte" else filter_class,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+    # Pila dei cursori delle pagine già visitate: se cambiano i filtri si
+    # riparte dalla prima pagina.
+    if st.session_state.get("history_filters") != filters:
+        st.session_state["history_filters"] = filters
+        st.session_state["history_cursors"] = [None]
+    cursors = st.session_state["history_cursors"]
+
+    df, next_cursor = load_history_page(
+        data_version(), HISTORY_PAGE_SIZE, cursors[-1], filters
+    )
+    if df.empty:
+        st.info("Non ci sono valutazioni salvate per questi filtri.")
+    else:
         st.dataframe(df, use_container_width=True)
-        st.caption(
-            "Usa questo storico per mostrare come evolve il profilo di rischio AI della PMI nel tempo."
-        )
+        st.caption(f"Pagina {len(cursors)} · {len(df)} valutazioni")
+
+    col_p1, col_p2 = st.columns(2)
+    with col_p1:
+        if len(cursors) > 1 and st.button("⏮ Torna all'inizio"):
+            st.session_state["history_cursors"] = [None]
+            st.rerun()
+    with col_p2:
+        if next_cursor is not None and st.button("Pagina successiva ➡"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    st.caption(
+        "Usa questo storico per mostrare come evolve il profilo di rischio AI della PMI nel tempo."
+    )
 
 
 # -------------------------------------------------
@@ -0,0 +1,83 @@
+# tests/conftest.py
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app.db as db
+from app.rules import random_answers
+from app.scoring import compute_risk
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """DB SQLite vuoto in una cartella temporanea (mai il DB del progetto)."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "assessments.db")
+    db.init_db()
+    yield db
+    db.flush_assessments()
+    db.close_connections()
+
+
+@pytest.fixture
+def store_contract():
+    """Verifica di un backend sul contratto di app.storage.AssessmentStore."""
+    return check_store
+
+
+def check_store(store, rows=300):
+    # Ordine, cursori, filtri, streaming, cancellazione; svuota il database
+    rng = random.Random(0)
+    store.init()
+    store.clear()
+    assert store.recent() == [] and store.last() is None
+
+    first = store.log("Acme", {"uses_ai": "yes"}, compute_risk({"uses_ai": "yes"}))
+    items = []
+    for i in range(rows):
+        answers = random_answers(rng)
+        items.append((f"Cliente {i % 7}", answers, compute_risk(answers)))
+    assert store.bulk_insert(items) == rows
+
+    recent = store.recent(limit=rows + 10)
+    assert len(recent) == rows + 1
+    assert tuple(store.last()) == tuple(recent[0])
+    ids = [row[0] for row in recent]
+    assert len(set(ids)) == len(ids) and first in ids
+    keys = [(row[1], row[0]) for row in recent]
+    assert keys == sorted(keys, reverse=True), "recent non è in ordine decrescente"
+    assert store.report(first) == ("Acme", compute_risk({"uses_ai": "yes"}).report)
+    assert store.report(max(ids) + 1000) is None
+
+    # Pagine dello storico == lista completa filtrata
+    for filters in (
+        {},
+        {"company_name": "Cliente 3"},
+        {"risk_class": "High"},
+        {"date_from": date.today(), "date_to": date.today()},
+        {"date_to": date.today() - timedelta(days=1)},
+    ):
+        expected = [row for row in recent if _matches(row, **filters)]
+        pages, cursor = [], None
+        while True:
+            page, cursor = store.history(limit=17, cursor=cursor, **filters)
+            pages.extend(page)
+            if cursor is None:
+                break
+        assert [tuple(r) for r in pages] == [tuple(r) for r in expected], filters
+        streamed = list(store.iter_reports(batch_size=23, **filters))
+        assert [r[0] for r in streamed] == [r[0] for r in expected], filters
+
+    store.clear()
+    assert store.recent() == [] and list(store.iter_reports()) == []
+
+
+def _matches(row, company_name=None, risk_class=None, date_from=None, date_to=None):
+    created = datetime.fromisoformat(row[1]).date()
+    return (
+        (company_name is None or row[2] == company_name)
+        and (risk_class is None or row[4] == risk_class)
+        and (date_from is None or created >= date_from)
+        and (date_to is None or created <= date_to)
+    )
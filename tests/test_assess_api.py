@@ -0,0 +1,75 @@
+# tests/test_assess_api.py
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import app.main as main
+from app.schemas import AssessmentRequest
+from app.scoring import compute_risk
+from benchmarks.profiles import PROFILES
+
+PAYLOAD = AssessmentRequest(**PROFILES["high"]).model_dump()
+
+
+def _post(path, payloads, **params):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post(path, json=payload, params=params) for payload in payloads)
+            )
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "path, payload, status",
+    [("/assess", PAYLOAD, 200), ("/assessments", {**PAYLOAD, "company_name": "Acme"}, 201)],
+)
+def test_slow_scoring_does_not_block_the_event_loop(monkeypatch, temp_db, path, payload, status):
+    scoring = main.compute_risk_cached
+
+    def slow_scoring(answers, key=None):
+        time.sleep(0.3)
+        return scoring(answers, key)
+
+    monkeypatch.setattr(main, "compute_risk_cached", slow_scoring)
+
+    start = time.perf_counter()
+    responses = _post(path, [payload] * 4)
+    elapsed = time.perf_counter() - start
+    assert [r.status_code for r in responses] == [status] * 4
+    # In serie (sul loop) sarebbero almeno 1.2 s
+    assert elapsed < 0.9
+
+
+def test_create_assessment_returns_the_saved_id(temp_db):
+    (response,) = _post("/assessments", [{**PAYLOAD, "company_name": "Acme"}])
+
+    assert response.status_code == 201
+    body = response.json()
+    expected = compute_risk(PAYLOAD)
+    assert body["final_score"] == expected.final_score
+    assert temp_db.get_assessment_report(body["assessment_id"]) == ("Acme", expected.report)
+
+
+def test_create_assessment_without_wait_queues_the_write(temp_db):
+    payloads = [{**PAYLOAD, "company_name": f"Cliente {i}"} for i in range(3)]
+    responses = _post("/assessments", payloads, wait="false")
+
+    assert [r.status_code for r in responses] == [201] * 3
+    assert all(r.json()["assessment_id"] is None for r in responses)
+    temp_db.flush_assessments()
+    saved = {row[2] for row in temp_db.get_recent_assessments()}
+    assert saved == {"Cliente 0", "Cliente 1", "Cliente 2"}
+
+
+def test_create_assessment_rejects_invalid_bodies(temp_db):
+    (response,) = _post("/assessments", [{**PAYLOAD, "uses_ai": "forse"}])
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "uses_ai"]
+    assert temp_db.get_recent_assessments() == []
@@ -0,0 +1,83 @@
+# tests/test_batch.py
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app import batch
+from app.batch import BatchFormatError, open_batch, stream_batch_results
+from app.schemas import AssessmentRequest
+from app.scoring_cache import compute_risk_cached
+from app.serialization import result_to_json
+from benchmarks.profiles import PROFILES
+
+ITEMS = [
+    AssessmentRequest(**PROFILES[name]).model_dump() for name in ("medium", "high", "pim_heavy")
+]
+
+
+async def _chunks(body: bytes, size: int = 7):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def _run(body: bytes, parallel: bool = False) -> list:
+    async def run():
+        items = await open_batch(_chunks(body))
+        return b"".join([line async for line in stream_batch_results(items, parallel=parallel)])
+
+    return asyncio.run(run()).splitlines()
+
+
+def _expected(items) -> list:
+    return [result_to_json(compute_risk_cached(item)) for item in items]
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_array_and_ndjson_give_the_same_results(monkeypatch, parallel):
+    monkeypatch.setattr(batch, "BATCH_CHUNK_SIZE", 2)
+    items = ITEMS * 3
+    array = b"  \n" + json.dumps(items).encode()
+    ndjson = b"\n\n".join(json.dumps(item).encode() for item in items) + b"\n"
+    assert _run(array, parallel) == _expected(items)
+    assert _run(ndjson, parallel) == _expected(items)
+
+
+def test_invalid_items_become_error_lines_with_their_index(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_CHUNK_SIZE", 2)
+    good = json.dumps(ITEMS[0]).encode()
+    body = b"\n".join([good, b"{non json", b"5", json.dumps({"uses_ai": "forse"}).encode(), good])
+
+    lines = _run(body)
+
+    assert lines[0] == lines[4] == _expected(ITEMS[:1])[0]
+    errors = {json.loads(line)["index"]: json.loads(line)["errors"] for line in lines[1:4]}
+    assert errors[1][0]["msg"].startswith("Riga NDJSON non valida")
+    assert errors[2] == [{"msg": "Ogni elemento deve essere un oggetto JSON."}]
+    assert {error["loc"][0] for error in errors[3]} >= {"uses_ai"}
+
+
+@pytest.mark.parametrize("body", [b"[1,", b'[{"a": 1}', b"[1] [2]"])
+def test_malformed_array_is_rejected_before_streaming(body):
+    with pytest.raises(BatchFormatError):
+        _run(body)
+
+
+def test_parsing_and_validation_stay_off_the_event_loop(monkeypatch):
+    threads = set()
+    loads, validate = batch.json.loads, batch.assessment_validator.validate
+
+    def record(fn):
+        def wrapper(*args, **kwargs):
+            threads.add(threading.current_thread() is threading.main_thread())
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(batch.json, "loads", record(loads))
+    monkeypatch.setattr(batch.assessment_validator, "validate", record(validate))
+    _run(json.dumps(ITEMS).encode())
+    _run(b"\n".join(json.dumps(item).encode() for item in ITEMS))
+    assert threads == {False}
@@ -0,0 +1,41 @@
+# tests/test_bulk_export.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import bulk_export
+from app.main import app
+from app.scoring import compute_risk
+from benchmarks.profiles import PROFILES
+
+
+@pytest.fixture
+def four_assessments(temp_db, monkeypatch):
+    monkeypatch.setattr(bulk_export, "EXPORT_PDF_MAX_REPORTS", 3)
+    answers = PROFILES["high"]
+    for i in range(4):
+        temp_db.log_assessment(f"Cliente {i % 2}", answers, compute_risk(answers))
+
+
+def test_combined_pdf_within_limit(four_assessments):
+    pdf = b"".join(bulk_export.export_reports("pdf", company_name="Cliente 0"))
+    assert pdf.startswith(b"%PDF") and pdf.rstrip().endswith(b"%%EOF")
+
+
+def test_combined_pdf_over_limit_fails_before_streaming(four_assessments):
+    with pytest.raises(bulk_export.ExportTooLargeError):
+        bulk_export.export_reports("pdf")
+    # Lo ZIP non ha limiti
+    assert b"".join(bulk_export.export_reports("zip")).startswith(b"PK")
+
+
+def test_api_returns_413_over_limit(four_assessments):
+    with TestClient(app) as client:
+        response = client.get("/assessments/export", params={"format": "pdf"})
+        assert response.status_code == 413
+        assert "zip" in response.json()["detail"]
+        response = client.get(
+            "/assessments/export", params={"format": "pdf", "company_name": "Cliente 1"}
+        )
+        assert response.status_code == 200
+        assert response.content.startswith(b"%PDF")
@@ -0,0 +1,36 @@
+# tests/test_db_history.py
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.db import _history_filters, to_timestamp
+from app.scoring import compute_risk
+from benchmarks.profiles import PROFILES
+
+
+def test_date_only_string_covers_the_whole_day():
+    where, params = _history_filters(date_to="2025-01-31")
+    assert where == ["created_ts < ?"]
+    assert params == [to_timestamp(date(2025, 2, 1))]
+    assert _history_filters(date_to=date(2025, 1, 31)) == (where, params)
+
+
+def test_datetime_string_is_an_inclusive_instant():
+    where, params = _history_filters(date_to="2025-01-31T12:30:00")
+    assert where == ["created_ts <= ?"]
+    assert params == [to_timestamp(datetime(2025, 1, 31, 12, 30))]
+
+
+@pytest.mark.parametrize("as_string", [False, True])
+def test_history_date_to_includes_that_day(temp_db, as_string):
+    answers = PROFILES["medium"]
+    assessment_id = temp_db.log_assessment("Cliente", answers, compute_risk(answers))
+    created = datetime.fromisoformat(temp_db.get_recent_assessments(limit=1)[0][1]).date()
+
+    def history(day):
+        rows, _ = temp_db.get_assessment_history(date_to=day.isoformat() if as_string else day)
+        return [row[0] for row in rows]
+
+    assert history(created) == [assessment_id]
+    assert history(created - timedelta(days=1)) == []
@@ -0,0 +1,26 @@
+# tests/test_lookup.py
+
+import random
+
+from app.lookup import TABLES, compute_risk_fast
+from app.rules import FIELD_VALUES, random_answers
+from app.scoring import compute_risk
+from app.scoring_cache import answers_key
+
+
+def test_compute_risk_fast_matches_compute_risk():
+    rng = random.Random(0)
+    for _ in range(50_000):
+        answers = random_answers(rng, missing_rate=0.1)
+        assert compute_risk_fast(answers_key(answers)) == compute_risk(answers), answers
+
+
+def test_unknown_values_score_like_missing_ones():
+    answers = random_answers(random.Random(1))
+    for field in FIELD_VALUES:
+        changed = dict(answers, **{field: "sconosciuto"})
+        assert compute_risk_fast(answers_key(changed)) == compute_risk(changed), field
+
+
+def test_tables_stay_compact():
+    assert TABLES.nbytes < 256 * 1024
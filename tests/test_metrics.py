@@ -0,0 +1,50 @@
+# tests/test_metrics.py
+
+from app import scoring_cache as sc
+from app.metrics import RULE_HITS_TOTAL, record_scoring
+from app.rules import RULES_BY_CODE
+from app.scoring import compute_risk
+from benchmarks.profiles import PROFILES
+
+
+def _rule_hits():
+    return dict(RULE_HITS_TOTAL._values)
+
+
+def _recorded(before, after):
+    # Incrementi per etichette (rule, domain) tra due letture del contatore
+    return {
+        labels: value - before.get(labels, 0)
+        for labels, value in after.items()
+        if value != before.get(labels, 0)
+    }
+
+
+def test_record_scoring_counts_the_rules_the_scorer_fired():
+    result = compute_risk(PROFILES["pim_heavy"])
+    # Anche le regole senza motivo (es. la presenza di AI nel PIM)
+    assert any(RULES_BY_CODE[code].reason is None for code in result.rule_codes)
+
+    before = _rule_hits()
+    record_scoring(result)
+    assert _recorded(before, _rule_hits()) == {
+        (str(code), RULES_BY_CODE[code].domain): 1 for code in result.rule_codes
+    }
+
+
+def test_cache_hits_are_counted_without_scoring_again(monkeypatch):
+    monkeypatch.setattr(sc, "scoring_cache", sc.ScoringCache(max_entries=10, ttl=3600))
+    monkeypatch.setattr(sc, "METRICS_ENABLED", True)
+    answers = PROFILES["high"]
+    result = sc.compute_risk_cached(answers)
+
+    def fail(*args):
+        raise AssertionError("scoring ripetuto su un hit della cache")
+
+    monkeypatch.setattr(sc, "compute_risk", fail)
+    monkeypatch.setattr(sc, "compute_risk_fast", fail)
+    before = _rule_hits()
+    assert sc.compute_risk_cached(answers) is result
+    assert _recorded(before, _rule_hits()) == {
+        (str(code), RULES_BY_CODE[code].domain): 1 for code in result.rule_codes
+    }
@@ -0,0 +1,40 @@
+# tests/test_rules.py
+
+import random
+
+import pytest
+
+from app import scoring
+from app.rules import REASON_TEXTS, RULES_BY_CODE, random_answers, rule_code
+
+# Funzione di scoring -> dominio delle regole che può emettere
+_SCORERS = {
+    scoring._compute_ai_risk: "ai",
+    scoring._compute_gdpr_risk: "gdpr",
+    scoring._compute_operational_risk: "operational",
+    scoring._compute_urgency_risk: "urgency",
+}
+
+
+def test_every_fired_rule_is_a_rule_of_the_same_domain():
+    rng = random.Random(0)
+    for _ in range(5_000):
+        answers = random_answers(rng, missing_rate=0.1)
+        fired = []
+        for scorer, domain in _SCORERS.items():
+            codes = []
+            scorer(answers, codes)
+            for code in codes:
+                rule = RULES_BY_CODE[code]
+                assert rule.domain == domain, (code, domain)
+                assert REASON_TEXTS.get(code) == rule.reason
+            fired.extend(codes)
+        result = scoring.compute_risk(answers)
+        assert result.rule_codes == tuple(fired)
+        assert result.reason_codes == tuple(c for c in fired if c in REASON_TEXTS)[:5]
+
+
+def test_rule_code_requires_the_exact_condition():
+    assert rule_code("uses_ai", "yes") == 1
+    with pytest.raises(KeyError):
+        rule_code("users_informed_ai", "no")
@@ -0,0 +1,61 @@
+# tests/test_scoring_cache.py
+
+import random
+
+import pytest
+
+from app import scoring_cache as sc
+from app.rules import random_answers
+from app.scoring import compute_risk
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = sc.ScoringCache(max_entries=1000, ttl=3600)
+    monkeypatch.setattr(sc, "scoring_cache", cache)
+    return cache
+
+
+def _shuffled(answers, rng):
+    # Stesso questionario: chiavi e scelte multiple in altro ordine, campi estranei
+    items = list(answers.items())
+    rng.shuffle(items)
+    shuffled = {
+        field: rng.sample(value, len(value)) if isinstance(value, list) else value
+        for field, value in items
+    }
+    shuffled["company_name"] = f"Cliente {rng.randrange(100)}"
+    return shuffled
+
+
+def test_cached_results_match_compute_risk(cache):
+    rng = random.Random(0)
+    pool = [random_answers(rng, missing_rate=0.1) for _ in range(500)]
+    for _ in range(20_000):
+        answers = rng.choice(pool)
+        assert sc.compute_risk_cached(_shuffled(answers, rng)) == compute_risk(answers)
+    stats = cache.stats()
+    assert stats.size <= len(pool)
+    assert stats.hit_ratio > 0.9
+
+
+def test_fingerprint_is_canonical():
+    rng = random.Random(1)
+    answers = random_answers(rng)
+    assert sc.answers_fingerprint(_shuffled(answers, rng)) == sc.answers_fingerprint(answers)
+    assert sc.answers_fingerprint({**answers, "uses_ai": ["yes"]}) is None
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(sc.time, "monotonic", lambda: now[0])
+    cache = sc.ScoringCache(max_entries=2, ttl=10)
+    result = compute_risk({})
+    cache.put((1,), result)
+    cache.put((2,), result)
+    assert cache.get((1,)) is result
+    cache.put((3,), result)  # esce (2,), il meno usato di recente
+    assert cache.get((2,)) is None
+    now[0] = 11
+    assert cache.get((1,)) is None
+    assert cache.stats().expired == 1
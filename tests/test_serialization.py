@@ -0,0 +1,97 @@
+# tests/test_serialization.py
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import JSONResponse
+
+import app.serialization as serialization
+from app.main import app
+from app.rules import random_answers
+from app.schemas import AssessmentRequest, AssessmentResponse, PersistedAssessmentResponse
+from app.scoring import compute_risk
+from app.serialization import (
+    JSON_CONTENT_TYPE,
+    MSGPACK_CONTENT_TYPE,
+    negotiate_media_type,
+    result_to_json,
+)
+from benchmarks.profiles import PROFILES
+
+PAYLOAD = AssessmentRequest(**PROFILES["high"]).model_dump()
+
+
+def _fields(result):
+    return {
+        "ai_risk": result.ai_risk,
+        "gdpr_risk": result.gdpr_risk,
+        "operational_risk": result.operational_risk,
+        "urgency_risk": result.urgency_risk,
+        "final_score": result.final_score,
+        "risk_class": result.risk_class,
+        "reasons": result.reasons,
+        "reason_codes": list(result.reason_codes),
+        "report": result.report,
+    }
+
+
+def test_json_bytes_match_pydantic_responses():
+    rng = random.Random(0)
+    for i in range(2000):
+        result = compute_risk(random_answers(rng, missing_rate=0.1))
+        expected = JSONResponse(AssessmentResponse(**_fields(result)).model_dump()).body
+        assert result_to_json(result) == expected
+        assessment_id = i if i % 2 else None
+        persisted = PersistedAssessmentResponse(**_fields(result), assessment_id=assessment_id)
+        assert result_to_json(result, assessment_id) == JSONResponse(persisted.model_dump()).body
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, JSON_CONTENT_TYPE),
+        ("*/*", JSON_CONTENT_TYPE),
+        ("application/json", JSON_CONTENT_TYPE),
+        ("application/msgpack", MSGPACK_CONTENT_TYPE),
+        ("application/msgpack;q=0, application/json", JSON_CONTENT_TYPE),
+        ("application/msgpack;q=0", JSON_CONTENT_TYPE),
+        ("application/json, application/msgpack;q=0.5", JSON_CONTENT_TYPE),
+        ("application/json;q=0.5, application/msgpack", MSGPACK_CONTENT_TYPE),
+        ("application/*, application/msgpack;q=0.1", JSON_CONTENT_TYPE),
+        ("text/html", JSON_CONTENT_TYPE),
+    ],
+)
+def test_negotiation_with_msgpack(monkeypatch, accept, expected):
+    monkeypatch.setattr(serialization, "MSGPACK_AVAILABLE", True)
+    assert negotiate_media_type(accept) == expected
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("application/msgpack", None),
+        ("application/msgpack, application/json;q=0.1", JSON_CONTENT_TYPE),
+        ("application/msgpack, */*;q=0.1", JSON_CONTENT_TYPE),
+        ("application/msgpack, application/json;q=0", None),
+    ],
+)
+def test_negotiation_without_msgpack(monkeypatch, accept, expected):
+    monkeypatch.setattr(serialization, "MSGPACK_AVAILABLE", False)
+    assert negotiate_media_type(accept) == expected
+
+
+def test_api_falls_back_to_json_without_msgpack(monkeypatch):
+    monkeypatch.setattr(serialization, "MSGPACK_AVAILABLE", False)
+    client = TestClient(app)
+
+    response = client.post(
+        "/assess", json=PAYLOAD, headers={"Accept": "application/msgpack, application/json;q=0.5"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == JSON_CONTENT_TYPE
+    assert response.json()["risk_class"] == compute_risk(PAYLOAD).risk_class
+    assert response.headers["vary"] == "Accept"
+
+    response = client.post("/assess", json=PAYLOAD, headers={"Accept": "application/msgpack"})
+    assert response.status_code == 406
@@ -0,0 +1,22 @@
+# tests/test_similar_api.py
+
+import warnings
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas import AssessmentRequest
+from app.scoring import compute_risk
+from benchmarks.profiles import PROFILES
+
+
+def test_similar_assessments_without_deprecation_warnings(temp_db):
+    # Solo i campi del questionario dell'API: stesso vettore della richiesta
+    answers = AssessmentRequest(**PROFILES["high"]).model_dump()
+    assessment_id = temp_db.log_assessment("Cliente", answers, compute_risk(answers))
+    with TestClient(app) as client, warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        response = client.post("/assess/similar", json=answers, params={"k": 1})
+    assert response.status_code == 200
+    assert response.json()[0]["assessment_id"] == assessment_id
+    assert response.json()[0]["distance"] == 0
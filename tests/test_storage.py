@@ -0,0 +1,106 @@
+# tests/test_storage.py
+
+import asyncio
+import threading
+
+import httpx
+
+import app.db as db
+import app.main as main
+from app.schemas import AssessmentRequest, PersistedAssessmentRequest
+from app.scoring import compute_risk
+from app.storage import SQLiteStore
+from benchmarks.profiles import PROFILES
+
+
+def test_sqlite_store_respects_the_contract(temp_db, store_contract):
+    store_contract(SQLiteStore())
+
+
+def test_last_assessment_is_the_most_recent(temp_db):
+    assert temp_db.get_last_assessment() is None
+    for name in ("Acme", "Beta"):
+        temp_db.log_assessment(name, {"uses_ai": "yes"}, compute_risk({"uses_ai": "yes"}))
+    temp_db.flush_assessments()
+    last = temp_db.get_last_assessment()
+    assert last == temp_db.get_recent_assessments(limit=1)[0] and last[2] == "Beta"
+
+
+def test_sqlite_only_endpoints_answer_501_with_another_backend(monkeypatch):
+    # Nessuna richiesta arriva al DB: la dipendenza risponde prima
+    monkeypatch.setattr(main, "STORAGE_BACKEND", "postgres")
+    payload = AssessmentRequest(**PROFILES["high"]).model_dump()
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                await client.get("/stats"),
+                await client.get("/drift/alerts"),
+                await client.post("/assess/similar", json=payload),
+            ]
+
+    for response in asyncio.run(run()):
+        assert response.status_code == 501
+        assert "APP_STORAGE=postgres" in response.json()["detail"]
+
+
+class BlockingStore:
+    """Store esterno finto: log resta bloccato finché il test non lo sblocca."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.threads = []
+
+    def log(self, company_name, answers, result):
+        self.threads.append(threading.current_thread().name)
+        assert self.release.wait(5)
+        return len(self.threads)
+
+    def last(self):
+        return None
+
+
+def test_queued_writes_to_an_external_store_leave_the_loop_free(monkeypatch):
+    store = BlockingStore()
+    monkeypatch.setattr(db, "_store", store)
+    payload = PersistedAssessmentRequest(company_name="Acme", **PROFILES["high"]).model_dump()
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/assessments", params={"wait": "false"}, json=payload)
+
+    # Con la scrittura ancora bloccata la risposta arriva lo stesso
+    response = asyncio.run(run())
+    assert response.status_code == 201 and response.json()["assessment_id"] is None
+
+    version = db.data_version()
+    store.release.set()
+    db.flush_assessments(timeout=5)
+    assert store.threads == ["store-writer_0"]
+    assert db.data_version() != version
+
+
+class RowsStore:
+    """Store esterno finto: le valutazioni sono scritte da un altro processo."""
+
+    def __init__(self):
+        self.rows = []
+
+    def last(self):
+        return self.rows[-1] if self.rows else None
+
+
+def test_data_version_follows_writes_from_other_processes(monkeypatch):
+    store = RowsStore()
+    monkeypatch.setattr(db, "_store", store)
+
+    empty = db.data_version()
+    assert db.data_version() == empty
+    store.rows.append((1, "2026-10-17T10:00:00"))
+    first = db.data_version()
+    store.rows.append((2, "2026-10-17T10:00:01"))
+    assert len({empty, first, db.data_version()}) == 3
+    store.rows.clear()
+    assert db.data_version() == empty
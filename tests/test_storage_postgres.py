@@ -0,0 +1,195 @@
+# tests/test_storage_postgres.py
+
+"""
+PostgresStore su un pool finto: niente server né psycopg, solo le chiamate
+che il backend fa (SQL, parametri, COPY, cursore lato server) e le righe
+che PostgreSQL restituirebbe. Il contratto completo (fixture
+store_contract) richiede un server vero, quindi non gira qui.
+"""
+
+import random
+from contextlib import contextmanager
+
+import pytest
+
+from app import db
+from app.rules import random_answers
+from app.scoring import compute_risk
+from app.storage_postgres import _COLUMNS, PostgresStore
+
+
+class FakeCopy:
+    def __init__(self, sql):
+        self.sql = sql
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_row(self, row):
+        self.rows.append(tuple(row))
+
+
+class FakeCursor:
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.itersize = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params, self.name))
+        self._rows = list(self.conn.results.pop(0)) if self.conn.results else []
+        return self
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def __iter__(self):
+        # Come un cursore con nome: le righe arrivano a blocchi di itersize
+        assert self.itersize
+        for start in range(0, len(self._rows), self.itersize):
+            self.conn.fetches.append(len(self._rows[start:start + self.itersize]))
+            yield from self._rows[start:start + self.itersize]
+
+    def copy(self, sql):
+        copy = FakeCopy(sql)
+        self.conn.copies.append(copy)
+        return copy
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.results = []
+        self.copies = []
+        self.fetches = []
+        self.commits = 0
+
+    def execute(self, sql, params=None):
+        return FakeCursor(self).execute(sql, params)
+
+    def cursor(self, name=None):
+        return FakeCursor(self, name)
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.closed = False
+
+    @contextmanager
+    def connection(self):
+        # psycopg_pool: commit all'uscita senza eccezioni
+        yield self.conn
+        self.conn.commits += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def store():
+    store = PostgresStore("postgresql://fake")
+    store._pool = FakePool()
+    yield store
+    store.close()
+
+
+def test_bulk_insert_copies_the_sqlite_rows(store):
+    answers = [random_answers(random.Random(i)) for i in range(5)]
+    items = [(f"Cliente {i}", a, compute_risk(a)) for i, a in enumerate(answers)]
+
+    assert store.bulk_insert(iter(items)) == 5
+
+    conn = store._pool.conn
+    (copy,) = conn.copies
+    assert copy.sql == f"COPY assessments ({', '.join(_COLUMNS)}) FROM STDIN"
+    assert len(copy.rows) == 5 and conn.commits == 1
+    for row, (name, a, result) in zip(copy.rows, items):
+        assert len(row) == len(_COLUMNS)
+        values = dict(zip(_COLUMNS, row))
+        assert values["company_name"] == name
+        assert values["risk_class"] == result.risk_class
+        assert isinstance(values["reason_codes"], bytes)
+        assert tuple(values["reason_codes"]) == result.reason_codes
+
+
+def test_iter_reports_streams_from_a_named_cursor(store):
+    result = compute_risk({"uses_ai": "yes", "human_oversight": "none"})
+    scores = (
+        result.final_score, result.risk_class, result.ai_risk,
+        result.gdpr_risk, result.operational_risk, result.urgency_risk,
+    )
+    rows = [
+        (i, "2026-10-17T10:00:00", "Acme", *scores, bytes(result.reason_codes), "")
+        for i in range(10, 0, -1)
+    ]
+    # Riga con motivi fuori catalogo: reason_codes NULL, vale il testo salvato
+    rows.append((0, "2026-10-17T09:00:00", "Acme", *scores, None, "report salvato"))
+    conn = store._pool.conn
+    conn.results.append(rows)
+
+    streamed = list(store.iter_reports(batch_size=4, company_name="Acme", risk_class="High"))
+
+    ((sql, params, name),) = conn.statements
+    assert name == "iter_assessment_reports"
+    assert "WHERE" in sql and "?" not in sql and sql.count("%s") == len(params) == 2
+    assert sql.endswith("ORDER BY created_ts DESC, id DESC")
+    assert conn.fetches == [4, 4, 3]
+    assert [r[0] for r in streamed] == list(range(10, -1, -1))
+    assert streamed[0][3] == result.report
+    assert streamed[-1][3] == "report salvato"
+
+
+def test_history_pages_by_created_ts_and_id(store):
+    conn = store._pool.conn
+    summary = ("2026-10-17T10:00:00", "Acme", 50.0, "Medium", 1.0, 2.0, 3.0, 4.0)
+    conn.results.append([(3, *summary, 300), (2, *summary, 200)])
+
+    rows, cursor = store.history(limit=2, cursor=(400, 4), company_name="Acme")
+
+    sql, params, _ = conn.statements[0]
+    assert "(created_ts, id) < (%s, %s)" in sql
+    assert params == ["Acme", 400, 4, 2]
+    assert rows == [(3, *summary), (2, *summary)] and cursor == (200, 2)
+
+    conn.results.append([(1, *summary, 100)])
+    rows, cursor = store.history(limit=2, cursor=cursor)
+    assert len(rows) == 1 and cursor is None
+
+
+def test_last_and_report(store):
+    conn = store._pool.conn
+    result = compute_risk({"uses_ai": "yes"})
+    summary = (7, "2026-10-17T10:00:00", "Acme", 50.0, "Medium", 1.0, 2.0, 3.0, 4.0)
+    conn.results.append([summary])
+    assert store.last() == summary
+    assert conn.statements[-1][0].endswith("ORDER BY created_ts DESC, id DESC LIMIT 1")
+
+    assert store.last() is None
+
+    row = db._assessment_row("Acme", {"uses_ai": "yes"}, result)[0]
+    values = dict(zip(_COLUMNS, row))
+    conn.results.append([("Acme", *(values[c.strip()] for c in db.REPORT_COLUMNS.split(",")))])
+    assert store.report(7) == ("Acme", result.report)
+    assert conn.statements[-1][1] == (7,)
+    assert store.report(8) is None
+
+
+def test_close_releases_the_pool(store):
+    pool = store._pool
+    store.close()
+    assert pool.closed and store._pool is None
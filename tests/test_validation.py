@@ -0,0 +1,60 @@
+# tests/test_validation.py
+
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from app.rules import random_answers
+from app.scoring_cache import answers_key
+from app.validation import assessment_validator, persisted_assessment_validator
+
+VALIDATORS = [assessment_validator, persisted_assessment_validator]
+
+
+def _cases(count: int):
+    # Questionari validi, con campi omessi, valori fuori vocabolario e tipi sbagliati
+    rng = random.Random(0)
+    for _ in range(count):
+        data = random_answers(rng, missing_rate=0.02)
+        if rng.random() < 0.05:
+            data[rng.choice(list(data) or ["uses_ai"])] = rng.choice([None, 1, ["yes"], "x"])
+        if rng.random() < 0.3:
+            data["company_name"] = rng.choice([None, "Cliente", "x" * 201, 7])
+        yield data
+
+
+@pytest.mark.parametrize("validator", VALIDATORS, ids=lambda v: v.model.__name__)
+def test_same_outcome_as_pydantic(validator):
+    accepted = 0
+    for data in _cases(10_000):
+        try:
+            expected = validator.model.model_validate(data).model_dump()
+        except ValidationError as exc:
+            with pytest.raises(ValidationError) as raised:
+                validator.validate(data)
+            assert raised.value.errors() == exc.errors()
+            continue
+        got = validator.validate(data)
+        assert got.answers == expected
+        assert list(got.answers) == list(expected)
+        assert got.key == answers_key(expected)
+        accepted += 1
+    # Il campione copre entrambi gli esiti
+    assert 1000 < accepted < 9000
+
+
+def test_defaults_and_copies():
+    data = random_answers(random.Random(1))
+    data["users_informed_ai"] = "yes"
+    del data["ai_usage_clarity"], data["ai_use_cases"]
+    validated = assessment_validator.validate(data)
+    assert validated.answers["ai_usage_clarity"] == "clear"
+    assert validated.answers["ai_use_cases"] == []
+    assert validated.answers["upcoming_changes"] is not data["upcoming_changes"]
+
+
+@pytest.mark.parametrize("data", [[], "x", None])
+def test_non_objects_are_rejected(data):
+    with pytest.raises(ValidationError):
+        assessment_validator.validate(data)
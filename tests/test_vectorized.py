@@ -0,0 +1,88 @@
+# tests/test_vectorized.py
+
+import itertools
+import random
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pytest
+
+from app.rules import DOMAINS, FIELD_VALUES, GATES, MULTI_FIELDS, RULES, random_answers
+from app.scoring import (
+    _compute_ai_risk,
+    _compute_gdpr_risk,
+    _compute_operational_risk,
+    _compute_urgency_risk,
+    compute_risk,
+)
+from app.vectorized import score_answers
+
+# Funzioni di dominio di compute_risk: (risposte, codici dei motivi) -> punteggio
+_DOMAIN_FUNCTIONS: Dict[str, Callable[[Dict[str, Any], List[int]], float]] = {
+    "ai": _compute_ai_risk,
+    "gdpr": _compute_gdpr_risk,
+    "operational": _compute_operational_risk,
+    "urgency": _compute_urgency_risk,
+}
+
+
+def _field_options(field: str) -> List[Any]:
+    if field in MULTI_FIELDS:
+        values = MULTI_FIELDS[field]
+        return [
+            list(combo)
+            for size in range(len(values) + 1)
+            for combo in itertools.combinations(values, size)
+        ]
+    return list(FIELD_VALUES[field])
+
+
+def _domain_fields(domain: str) -> List[str]:
+    # Campi da cui dipende il dominio, inclusi quelli delle condizioni di attivazione
+    fields: List[str] = []
+    for rule in RULES:
+        if rule.domain != domain:
+            continue
+        for field in [rule.field] + ([GATES[rule.gate][0]] if rule.gate else []):
+            if field not in fields:
+                fields.append(field)
+    return fields
+
+
+@pytest.mark.parametrize("domain", DOMAINS)
+def test_domain_score_matches_compute_risk_on_whole_answer_space(domain):
+    # Tutte le combinazioni dei campi da cui dipende il dominio
+    fields = _domain_fields(domain)
+    answers_list = [
+        dict(zip(fields, combo))
+        for combo in itertools.product(*(_field_options(field) for field in fields))
+    ]
+    reference = _DOMAIN_FUNCTIONS[domain]
+    expected = np.fromiter(
+        (reference(answers, []) for answers in answers_list),
+        dtype=np.float64,
+        count=len(answers_list),
+    )
+    got = score_answers(answers_list)[f"{domain}_risk"]
+    mismatches = np.flatnonzero(got != expected)
+    assert mismatches.size == 0, answers_list[mismatches[0]]
+
+
+def test_final_score_and_class_match_compute_risk():
+    # final_score e risk_class dipendono dai punteggi di dominio e dai
+    # moltiplicatori: campione per ogni dimensione × geografia
+    rng = random.Random(0)
+    answers_list = []
+    for size, geo in itertools.product(FIELD_VALUES["company_size"], FIELD_VALUES["geography"]):
+        for _ in range(500):
+            answers = random_answers(rng, missing_rate=0.05)
+            answers["company_size"] = size
+            answers["geography"] = geo
+            answers_list.append(answers)
+
+    got = score_answers(answers_list)
+    for i, answers in enumerate(answers_list):
+        expected = compute_risk(answers)
+        for key in ("ai_risk", "gdpr_risk", "operational_risk", "urgency_risk", "final_score"):
+            assert got[key][i] == getattr(expected, key), answers
+        assert got["risk_class"][i] == expected.risk_class, answers
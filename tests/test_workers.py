@@ -0,0 +1,50 @@
+# tests/test_workers.py
+
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app import workers
+
+
+def _crash_once(marker: str) -> int:
+    # Il primo worker che lo esegue muore, come per un OOM
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return 42
+
+
+def _crash_always() -> None:
+    os._exit(1)
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(workers, "WORKER_PROCESSES", 1)
+    workers.shutdown_process_pool()
+    yield
+    workers.shutdown_process_pool()
+
+
+def test_broken_pool_is_replaced_and_task_retried(tmp_path):
+    first = workers.get_process_pool()
+    future = workers.submit_to_pool(_crash_once, str(tmp_path / "crashed"))
+    assert future.result(timeout=30) == 42
+    assert workers.get_process_pool() is not first
+    # Il pool nuovo funziona anche per i task successivi
+    assert workers.submit_to_pool(abs, -3).result(timeout=30) == 3
+
+
+def test_task_crashing_twice_raises():
+    with pytest.raises(BrokenProcessPool):
+        workers.submit_to_pool(_crash_always).result(timeout=30)
+    assert workers.submit_to_pool(abs, -1).result(timeout=30) == 1
+
+
+def test_pool_broken_before_submit_is_recreated(tmp_path):
+    with pytest.raises(BrokenProcessPool):
+        workers.get_process_pool().submit(_crash_always).result(timeout=30)
+    # Il pool condiviso è rotto: submit_to_pool lo sostituisce senza errori
+    assert workers.submit_to_pool(abs, -2).result(timeout=30) == 2
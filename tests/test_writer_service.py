@@ -0,0 +1,86 @@
+# tests/test_writer_service.py
+
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from app.scoring import compute_risk
+from app.writer_service import RemoteWriter, WriterError, serve_writer, wait_for_writer
+
+ANSWERS = {"uses_ai": "yes", "human_oversight": "none"}
+
+
+def _run_writer(db_path: str, address: str) -> None:
+    # Processo scrittore sul DB del test, mai su quello del progetto
+    import app.db as db
+
+    db.DB_PATH = Path(db_path)
+    serve_writer(address)
+
+
+def _start_writer(db_path, address):
+    # spawn come in gunicorn.conf.py
+    process = multiprocessing.get_context("spawn").Process(
+        target=_run_writer, args=(str(db_path), address), daemon=True
+    )
+    process.start()
+    wait_for_writer(address, timeout=60)
+    return process
+
+
+def _stop_writer(process):
+    process.terminate()  # SIGTERM: scrive le righe in coda ed esce
+    process.join(timeout=30)
+    assert process.exitcode == 0
+
+
+@pytest.fixture
+def address(tmp_path):
+    return str(tmp_path / "writer.sock")
+
+
+def _row(temp_db, company_name):
+    return temp_db._assessment_row(company_name, ANSWERS, compute_risk(ANSWERS))
+
+
+def test_remote_writer_round_trip(temp_db, address):
+    process = _start_writer(temp_db.DB_PATH, address)
+    written = []
+    writer = RemoteWriter(address, on_written=lambda: written.append(1))
+    try:
+        futures = [writer.submit(_row(temp_db, f"Cliente {i}")) for i in range(5)]
+        futures.append(writer.submit(_row(temp_db, "Durable"), durable=True))
+        ids = [future.result(timeout=10) for future in futures]
+        assert ids == sorted(ids) and len(set(ids)) == 6 and len(written) == 6
+        writer.flush(timeout=10)
+
+        rows = temp_db.get_recent_assessments()
+        assert sorted(row[0] for row in rows) == ids
+        assert temp_db.get_assessment_report(ids[-1]) == ("Durable", compute_risk(ANSWERS).report)
+
+        writer.clear()
+        assert temp_db.get_recent_assessments() == []
+    finally:
+        writer.close()
+        _stop_writer(process)
+
+
+def test_remote_writer_fails_pending_requests_and_reconnects(temp_db, address):
+    process = _start_writer(temp_db.DB_PATH, address)
+    writer = RemoteWriter(address)
+    try:
+        assert writer.submit(_row(temp_db, "Prima")).result(timeout=10) > 0
+        _stop_writer(process)
+
+        # Scrittore fermo: la richiesta fallisce invece di restare in attesa
+        with pytest.raises(WriterError):
+            writer.submit(_row(temp_db, "Persa")).result(timeout=10)
+
+        process = _start_writer(temp_db.DB_PATH, address)
+        assert writer.submit(_row(temp_db, "Dopo"), durable=True).result(timeout=10) > 0
+        assert [row[2] for row in temp_db.get_recent_assessments()] == ["Dopo", "Prima"]
+    finally:
+        writer.close()
+        if process.is_alive():
+            _stop_writer(process)